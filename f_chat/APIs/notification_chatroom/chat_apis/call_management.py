@@ -1,15 +1,21 @@
 # f_chat/APIs/notification_chatroom/chat_apis/call_management.py
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, time_diff_in_seconds
+from frappe.utils import now_datetime, cint, get_datetime
 import json
-import uuid
+
+from f_chat.APIs.notification_chatroom.chat_apis import call_registry
+from f_chat.APIs.notification_chatroom.chat_apis.call_signaling import relay_signal
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import get_room_members, is_member
 
 @frappe.whitelist()
 def initiate_call(room_id, call_type="Audio", participants=None):
     """
     Initiate a call in a chat room
 
+    Live call state is kept in the call registry (Redis) and written to
+    Chat Call Session once the call ends.
+
     Args:
         room_id (str): Chat Room ID
         call_type (str): Type of call (Audio/Video)
@@ -26,71 +32,22 @@ def initiate_call(room_id, call_type="Audio", participants=None):
             participants = json.loads(participants) if participants else []
 
         # Verify user is member of the room
-        room = frappe.get_doc("Chat Room", room_id)
-        permissions = room.get_member_permissions(current_user)
-
-        if not permissions["is_member"]:
+        if not is_member(room_id, current_user):
             frappe.throw("You are not a member of this chat room")
 
-        # Check if there's already an active call
-        active_calls = frappe.get_all(
-            "Chat Call Session",
-            filters={
-                "chat_room": room_id,
-                "call_status": ["in", ["Initiated", "Ringing", "Connected"]]
-            },
-            limit=1
-        )
-
-        if active_calls:
-            frappe.throw("There is already an active call in this room")
-
-        # Create call session
-        call_session = frappe.new_doc("Chat Call Session")
-        call_session.chat_room = room_id
-        call_session.call_type = call_type
-        call_session.call_status = "Initiated"
-        call_session.initiated_by = current_user
-        call_session.start_time = now_datetime()
-        call_session.session_id = str(uuid.uuid4())
+        # Add invited participants or all room members
+        if not participants:
+            participants = [user for user in get_room_members(room_id) if user != current_user]
+        participants = [user_id for user_id in participants if user_id != current_user]
 
         # Set ICE servers configuration (can be customized)
         ice_servers = [
             {"urls": "stun:stun.l.google.com:19302"},
             {"urls": "stun:stun1.l.google.com:19302"}
         ]
-        call_session.ice_servers_config = json.dumps(ice_servers)
 
-        # Add initiator as first participant
-        call_session.append("participants", {
-            "user": current_user,
-            "status": "Joined",
-            "joined_time": now_datetime()
-        })
-
-        # Add invited participants or all room members
-        if not participants:
-            # Invite all room members
-            room_members = frappe.get_all(
-                "Chat Room Member",
-                filters={"parent": room_id},
-                fields=["user"]
-            )
-            participants = [m.user for m in room_members if m.user != current_user]
-
-        for user_id in participants:
-            if user_id != current_user:
-                call_session.append("participants", {
-                    "user": user_id,
-                    "status": "Invited",
-                    "joined_time": None
-                })
-
-        call_session.insert(ignore_permissions=True)
-
-        # Update status to Ringing after insertion
-        call_session.call_status = "Ringing"
-        call_session.save(ignore_permissions=True)
+        # Fails if the room already has an active call
+        call = call_registry.create_call(room_id, call_type, current_user, participants, ice_servers)
 
         # Create system message in chat
         system_message = frappe.new_doc("Chat Message")
@@ -105,8 +62,8 @@ def initiate_call(room_id, call_type="Audio", participants=None):
         frappe.publish_realtime(
             event="call_initiated",
             message={
-                "call_session_id": call_session.name,
-                "session_id": call_session.session_id,
+                "call_session_id": call["name"],
+                "session_id": call["session_id"],
                 "room_id": room_id,
                 "call_type": call_type,
                 "initiated_by": current_user,
@@ -120,8 +77,8 @@ def initiate_call(room_id, call_type="Audio", participants=None):
             "success": True,
             "message": "Call initiated successfully",
             "data": {
-                "call_session_id": call_session.name,
-                "session_id": call_session.session_id,
+                "call_session_id": call["name"],
+                "session_id": call["session_id"],
                 "room_id": room_id,
                 "call_type": call_type,
                 "ice_servers": ice_servers,
@@ -153,67 +110,43 @@ def join_call(call_session_id):
     try:
         current_user = frappe.session.user
 
-        # Get call session
-        call_session = frappe.get_doc("Chat Call Session", call_session_id)
+        call = call_registry.get_call(call_session_id)
+        if not call:
+            frappe.throw("This call is no longer active")
 
         # Verify user is member of the room
-        room = frappe.get_doc("Chat Room", call_session.chat_room)
-        permissions = room.get_member_permissions(current_user)
-
-        if not permissions["is_member"]:
+        if not is_member(call["room_id"], current_user):
             frappe.throw("You are not a member of this chat room")
 
-        # Check if call is still active
-        if call_session.call_status not in ["Initiated", "Ringing", "Connected"]:
-            frappe.throw("This call is no longer active")
-
-        # Update participant status
-        participant_found = False
-        for participant in call_session.participants:
-            if participant.user == current_user:
-                participant.status = "Joined"
-                participant.joined_time = now_datetime()
-                participant_found = True
-                break
-
-        # If not in participant list, add them
-        if not participant_found:
-            call_session.append("participants", {
-                "user": current_user,
-                "status": "Joined",
-                "joined_time": now_datetime()
-            })
-
-        # Update call status to Connected if it was Initiated
-        if call_session.call_status == "Initiated":
-            call_session.call_status = "Connected"
-
-        call_session.save(ignore_permissions=True)
+        # Only this user's participant row is updated
+        call = call_registry.join(call_session_id, current_user)
 
         # Broadcast participant joined
         frappe.publish_realtime(
             event="call_participant_joined",
             message={
-                "call_session_id": call_session.name,
-                "session_id": call_session.session_id,
+                "call_session_id": call_session_id,
+                "session_id": call["session_id"],
                 "user": current_user,
-                "room_id": call_session.chat_room
+                "room_id": call["room_id"]
             },
-            room=f"chat_room_{call_session.chat_room}"
+            room=f"chat_room_{call['room_id']}"
         )
 
         # Get ICE servers
-        ice_servers = json.loads(call_session.ice_servers_config) if call_session.ice_servers_config else []
+        ice_servers = json.loads(call["ice_servers_config"]) if call.get("ice_servers_config") else []
 
         return {
             "success": True,
             "message": "Joined call successfully",
             "data": {
-                "call_session_id": call_session.name,
-                "session_id": call_session.session_id,
-                "call_type": call_session.call_type,
+                "call_session_id": call_session_id,
+                "session_id": call["session_id"],
+                "call_type": call["call_type"],
                 "ice_servers": ice_servers,
-                "active_participants": call_session.get_active_participants()
+                "active_participants": [
+                    row["user"] for row in call["participants"] if row["status"] == "Joined"
+                ]
             }
         }
 
@@ -232,6 +165,9 @@ def leave_call(call_session_id):
     """
     Leave an ongoing call
 
+    The last participant to leave ends the call, which writes it to
+    Chat Call Session.
+
     Args:
         call_session_id (str): Call Session ID
 
@@ -241,57 +177,34 @@ def leave_call(call_session_id):
     try:
         current_user = frappe.session.user
 
-        # Get call session
-        call_session = frappe.get_doc("Chat Call Session", call_session_id)
-
-        # Update participant status
-        for participant in call_session.participants:
-            if participant.user == current_user:
-                participant.status = "Left"
-                participant.left_time = now_datetime()
-
-                # Calculate duration
-                if participant.joined_time:
-                    participant.duration = time_diff_in_seconds(
-                        now_datetime(),
-                        participant.joined_time
-                    )
-                break
-
-        # Check if all participants have left
-        all_left = True
-        for participant in call_session.participants:
-            if participant.status == "Joined":
-                all_left = False
-                break
-
-        # If all left or only initiator remains, end the call
-        if all_left:
-            call_session.call_status = "Ended"
-            call_session.end_time = now_datetime()
-
-        call_session.save(ignore_permissions=True)
+        call = call_registry.get_call(call_session_id)
+        if not call:
+            frappe.throw("This call is no longer active")
+
+        call_ended = call_registry.leave(call_session_id, current_user)
 
         # Broadcast participant left
         frappe.publish_realtime(
             event="call_participant_left",
             message={
-                "call_session_id": call_session.name,
-                "session_id": call_session.session_id,
+                "call_session_id": call_session_id,
+                "session_id": call["session_id"],
                 "user": current_user,
-                "room_id": call_session.chat_room,
-                "call_ended": call_session.call_status == "Ended"
+                "room_id": call["room_id"],
+                "call_ended": call_ended
             },
-            room=f"chat_room_{call_session.chat_room}"
+            room=f"chat_room_{call['room_id']}"
         )
 
         # If call ended, create system message
-        if call_session.call_status == "Ended":
+        if call_ended:
+            total_duration = frappe.db.get_value("Chat Call Session", call_session_id, "total_duration")
+
             system_message = frappe.new_doc("Chat Message")
-            system_message.chat_room = call_session.chat_room
+            system_message.chat_room = call["room_id"]
             system_message.sender = current_user
             system_message.message_type = "System"
-            system_message.message_content = f"Call ended (Duration: {call_session.total_duration}s)"
+            system_message.message_content = f"Call ended (Duration: {total_duration}s)"
             system_message.timestamp = now_datetime()
             system_message.insert(ignore_permissions=True)
 
@@ -299,7 +212,7 @@ def leave_call(call_session_id):
             "success": True,
             "message": "Left call successfully",
             "data": {
-                "call_ended": call_session.call_status == "Ended"
+                "call_ended": call_ended
             }
         }
 
@@ -318,6 +231,9 @@ def reject_call(call_session_id):
     """
     Reject a call invitation
 
+    Only invited room members can reject. When the last invitee of a
+    ringing call rejects it, the call ends as Rejected.
+
     Args:
         call_session_id (str): Call Session ID
 
@@ -327,32 +243,36 @@ def reject_call(call_session_id):
     try:
         current_user = frappe.session.user
 
-        # Get call session
-        call_session = frappe.get_doc("Chat Call Session", call_session_id)
+        call = call_registry.get_call(call_session_id)
+        if not call:
+            frappe.throw("This call is no longer active")
 
-        # Update participant status
-        for participant in call_session.participants:
-            if participant.user == current_user:
-                participant.status = "Rejected"
-                break
+        # Verify user is member of the room
+        if not is_member(call["room_id"], current_user):
+            frappe.throw("You are not a member of this chat room")
 
-        call_session.save(ignore_permissions=True)
+        # Everyone invited said no: the call ends as Rejected
+        call_ended = call_registry.reject(call_session_id, current_user)
 
         # Broadcast rejection
         frappe.publish_realtime(
             event="call_rejected",
             message={
-                "call_session_id": call_session.name,
-                "session_id": call_session.session_id,
+                "call_session_id": call_session_id,
+                "session_id": call["session_id"],
                 "user": current_user,
-                "room_id": call_session.chat_room
+                "room_id": call["room_id"],
+                "call_ended": call_ended
             },
-            room=f"chat_room_{call_session.chat_room}"
+            room=f"chat_room_{call['room_id']}"
         )
 
         return {
             "success": True,
-            "message": "Call rejected"
+            "message": "Call rejected",
+            "data": {
+                "call_ended": call_ended
+            }
         }
 
     except Exception as e:
@@ -372,47 +292,21 @@ def send_webrtc_signal(call_session_id, signal_type, signal_data, target_user=No
 
     Args:
         call_session_id (str): Call Session ID
-        signal_type (str): Type of signal (offer, answer, ice-candidate)
-        signal_data (dict): Signal data
-        target_user (str): Target user for the signal (optional, broadcasts to all if not specified)
+        signal_type (str): Type of signal (offer, answer, ice-candidate, ice-candidates)
+        signal_data (dict): Signal data (a list of candidates for ice-candidates)
+        target_user (str): Target user for the signal (optional, sent to all other participants if not specified)
 
     Returns:
         dict: Success response
     """
     try:
-        current_user = frappe.session.user
-
-        # Parse signal_data if string
-        if isinstance(signal_data, str):
-            signal_data = json.loads(signal_data)
-
-        # Get call session
-        call_session = frappe.get_doc("Chat Call Session", call_session_id)
-
-        # Verify user is part of the call
-        is_participant = False
-        for participant in call_session.participants:
-            if participant.user == current_user:
-                is_participant = True
-                break
-
-        if not is_participant:
-            frappe.throw("You are not a participant in this call")
-
-        # Broadcast signal
-        frappe.publish_realtime(
-            event="webrtc_signal",
-            message={
-                "call_session_id": call_session.name,
-                "session_id": call_session.session_id,
-                "signal_type": signal_type,
-                "signal_data": signal_data,
-                "from_user": current_user,
-                "to_user": target_user,
-                "room_id": call_session.chat_room
-            },
-            room=f"chat_room_{call_session.chat_room}",
-            after_commit=True
+        # Cached roster check and direct delivery; no document load or commit wait
+        relay_signal(
+            call_session_id,
+            frappe.session.user,
+            signal_type,
+            signal_data,
+            target_user=target_user
         )
 
         return {
@@ -445,25 +339,12 @@ def get_active_call(room_id):
         current_user = frappe.session.user
 
         # Verify user is member of the room
-        room = frappe.get_doc("Chat Room", room_id)
-        permissions = room.get_member_permissions(current_user)
-
-        if not permissions["is_member"]:
+        if not is_member(room_id, current_user):
             frappe.throw("You are not a member of this chat room")
 
-        # Get active call
-        active_calls = frappe.get_all(
-            "Chat Call Session",
-            filters={
-                "chat_room": room_id,
-                "call_status": ["in", ["Initiated", "Ringing", "Connected"]]
-            },
-            fields=["name", "session_id", "call_type", "call_status", "initiated_by", "start_time"],
-            order_by="start_time desc",
-            limit=1
-        )
+        call = call_registry.get_room_active_call(room_id)
 
-        if not active_calls:
+        if not call:
             return {
                 "success": True,
                 "data": {
@@ -472,46 +353,45 @@ def get_active_call(room_id):
                 }
             }
 
-        active_call = active_calls[0]
-
-        # Get call session details
-        call_session = frappe.get_doc("Chat Call Session", active_call.name)
-
-        # Get participants
-        participants = []
-        for participant in call_session.participants:
-            user_info = frappe.db.get_value(
+        # Get participants' user info in one query
+        users = [row["user"] for row in call["participants"]]
+        user_info = {
+            user.name: user
+            for user in frappe.get_all(
                 "User",
-                participant.user,
-                ["full_name", "user_image"],
-                as_dict=True
+                filters={"name": ["in", users]},
+                fields=["name", "full_name", "user_image"]
             )
+        }
 
+        participants = []
+        for row in call["participants"]:
+            info = user_info.get(row["user"])
             participants.append({
-                "user": participant.user,
-                "full_name": user_info.full_name if user_info else participant.user,
-                "user_image": user_info.user_image if user_info else None,
-                "status": participant.status,
-                "joined_time": str(participant.joined_time) if participant.joined_time else None
+                "user": row["user"],
+                "full_name": info.full_name if info else row["user"],
+                "user_image": info.user_image if info else None,
+                "status": row["status"],
+                "joined_time": row.get("joined_time")
             })
 
         # Get ICE servers
-        ice_servers = json.loads(call_session.ice_servers_config) if call_session.ice_servers_config else []
+        ice_servers = json.loads(call["ice_servers_config"]) if call.get("ice_servers_config") else []
 
         return {
             "success": True,
             "data": {
                 "has_active_call": True,
                 "call": {
-                    "call_session_id": call_session.name,
-                    "session_id": call_session.session_id,
-                    "call_type": call_session.call_type,
-                    "call_status": call_session.call_status,
-                    "initiated_by": call_session.initiated_by,
-                    "start_time": str(call_session.start_time),
+                    "call_session_id": call["name"],
+                    "session_id": call["session_id"],
+                    "call_type": call["call_type"],
+                    "call_status": call["call_status"],
+                    "initiated_by": call["initiated_by"],
+                    "start_time": call["start_time"],
                     "participants": participants,
                     "ice_servers": ice_servers,
-                    "is_participant": current_user in [p.user for p in call_session.participants]
+                    "is_participant": current_user in users
                 }
             }
         }
@@ -527,111 +407,99 @@ def get_active_call(room_id):
         }
 
 @frappe.whitelist()
-def get_call_history(room_id=None, page=1, page_size=20):
+def get_call_history(room_id=None, cursor=None, page_size=20):
     """
-    Get call history for a room or all rooms
+    Get the current user's call history, newest first
+
+    Reads the per-user Chat Call History projection written when calls end,
+    so no joins or counts run at read time.
 
     Args:
         room_id (str): Chat Room ID (optional, gets all if not specified)
-        page (int): Page number
+        cursor (str): next_cursor from the previous page (optional)
         page_size (int): Records per page
 
     Returns:
-        dict: Call history with pagination
+        dict: Call history with cursor pagination, and total minutes on the
+            first page (None on later pages)
     """
     try:
         current_user = frappe.session.user
-        page = int(page) or 1
-        page_size = min(int(page_size) or 20, 100)
-        offset = (page - 1) * page_size
+        page_size = min(cint(page_size) or 20, 100)
+
+        conditions = ["user = %(user)s"]
+        values = {"user": current_user, "limit": page_size + 1}
 
-        # Build filters
-        filters = {}
         if room_id:
             # Verify user is member of the room
-            room = frappe.get_doc("Chat Room", room_id)
-            permissions = room.get_member_permissions(current_user)
-
-            if not permissions["is_member"]:
+            if not is_member(room_id, current_user):
                 frappe.throw("You are not a member of this chat room")
 
-            filters["chat_room"] = room_id
-
-        # Get call sessions
-        query = """
-            SELECT
-                cs.name,
-                cs.session_id,
-                cs.chat_room,
-                cr.room_name,
-                cs.call_type,
-                cs.call_status,
-                cs.initiated_by,
-                cs.start_time,
-                cs.end_time,
-                cs.total_duration,
-                (SELECT COUNT(*) FROM `tabChat Call Participant` ccp WHERE ccp.parent = cs.name) as participant_count
-            FROM `tabChat Call Session` cs
-            INNER JOIN `tabChat Room` cr ON cs.chat_room = cr.name
-            INNER JOIN `tabChat Call Participant` ccp ON cs.name = ccp.parent
-            WHERE ccp.user = %(user)s
-        """
-
-        values = {"user": current_user}
-
-        if room_id:
-            query += " AND cs.chat_room = %(room_id)s"
+            conditions.append("chat_room = %(room_id)s")
             values["room_id"] = room_id
 
-        query += """
-            ORDER BY cs.start_time DESC
-            LIMIT %(limit)s OFFSET %(offset)s
-        """
+        if cursor:
+            cursor_time, cursor_name = _decode_history_cursor(cursor)
+            conditions.append("""(
+                start_time < %(cursor_time)s
+                OR (start_time = %(cursor_time)s AND name < %(cursor_name)s)
+            )""")
+            values.update({"cursor_time": cursor_time, "cursor_name": cursor_name})
 
-        values.update({"limit": page_size, "offset": offset})
-
-        call_sessions = frappe.db.sql(query, values, as_dict=True)
+        call_sessions = frappe.db.sql(f"""
+            SELECT
+                name,
+                call_session,
+                chat_room,
+                room_name,
+                call_type,
+                call_status,
+                participant_status,
+                initiated_by,
+                initiated_by_name,
+                participant_count,
+                start_time,
+                end_time,
+                total_duration,
+                duration
+            FROM `tabChat Call History`
+            WHERE {" AND ".join(conditions)}
+            ORDER BY start_time DESC, name DESC
+            LIMIT %(limit)s
+        """, values, as_dict=True)
+
+        has_next = len(call_sessions) > page_size
+        call_sessions = call_sessions[:page_size]
+
+        next_cursor = None
+        if has_next:
+            last = call_sessions[-1]
+            next_cursor = f"{last.start_time}|{last.name}"
 
-        # Format timestamps
         for session in call_sessions:
             session["start_time"] = str(session.start_time)
             if session.end_time:
                 session["end_time"] = str(session.end_time)
 
-            # Get initiator info
-            initiator_info = frappe.db.get_value(
-                "User",
-                session.initiated_by,
-                ["full_name"],
-                as_dict=True
-            )
-            session["initiated_by_name"] = initiator_info.full_name if initiator_info else session.initiated_by
-
-        # Get total count
-        count_query = """
-            SELECT COUNT(DISTINCT cs.name) as total
-            FROM `tabChat Call Session` cs
-            INNER JOIN `tabChat Call Participant` ccp ON cs.name = ccp.parent
-            WHERE ccp.user = %(user)s
-        """
-
-        if room_id:
-            count_query += " AND cs.chat_room = %(room_id)s"
-
-        total_count = frappe.db.sql(count_query, values, as_dict=True)[0].total
-        total_pages = (total_count + page_size - 1) // page_size
+        # Aggregate minutes in the current filter (index range on user), once per listing
+        total_minutes = None
+        if not cursor:
+            total_seconds = frappe.db.sql(f"""
+                SELECT COALESCE(SUM(duration), 0)
+                FROM `tabChat Call History`
+                WHERE user = %(user)s {"AND chat_room = %(room_id)s" if room_id else ""}
+            """, values)[0][0]
+            total_minutes = round(total_seconds / 60.0, 1)
 
         return {
             "success": True,
             "data": {
                 "call_sessions": call_sessions,
+                "total_minutes": total_minutes,
                 "pagination": {
-                    "total_count": total_count,
-                    "page": page,
                     "page_size": page_size,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1
+                    "has_next": has_next,
+                    "next_cursor": next_cursor
                 }
             }
         }
@@ -645,3 +513,11 @@ def get_call_history(room_id=None, page=1, page_size=20):
                 "message": str(e)
             }
         }
+
+
+def _decode_history_cursor(cursor):
+    """Split a `start_time|name` cursor"""
+    cursor_time, _sep, cursor_name = cursor.rpartition("|")
+    if not cursor_time or not cursor_name:
+        frappe.throw("Invalid cursor")
+    return get_datetime(cursor_time), cursor_name
@@ -0,0 +1,431 @@
+# f_chat/APIs/notification_chatroom/chat_apis/call_registry.py
+# Live call state held in Redis, persisted to Chat Call Session once the call ends
+#
+# Layout (all keys site-scoped):
+#   chat_call:{call}               HASH    call fields (room_id, call_type, call_status, ...)
+#   chat_call_participants:{call}  HASH    user -> JSON participant row
+#   chat_call_joined:{call}        SET     users currently in the call
+#   chat_room_active_call:{room}   STRING  call id; claimed with SET NX, one call per room
+#   chat_calls_ringing             ZSET    call -> epoch after which nobody answering means missed
+#
+# Each participant only ever rewrites their own hash field, so concurrent
+# joins/leaves in a group call do not collide. The last user to leave (or the
+# ringing reaper) ends the call; HSETNX on end_time makes sure only one of
+# them writes the document.
+
+import json
+import time
+import uuid
+
+import frappe
+from frappe.utils import now_datetime, time_diff_in_seconds
+
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    decode_set,
+    make_key,
+    pipeline,
+)
+from f_chat.f_chat.doctype.chat_call_history.chat_call_history import record_call_history
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import track_job_run
+
+CALL_EXPIRY = 43200  # 12 hours; safety net for calls nobody closed
+RING_TIMEOUT = 60  # seconds a call may ring before it is marked Missed
+
+ACTIVE_STATUSES = ("Initiated", "Ringing", "Connected")
+
+
+def _call_key(call_session_id):
+    return make_key("chat_call", call_session_id)
+
+
+def _participants_key(call_session_id):
+    return make_key("chat_call_participants", call_session_id)
+
+
+def _joined_key(call_session_id):
+    return make_key("chat_call_joined", call_session_id)
+
+
+def _room_call_key(room_id):
+    return make_key("chat_room_active_call", room_id)
+
+
+def _ringing_key():
+    return make_key("chat_calls_ringing")
+
+
+def _call_keys(call_session_id):
+    return (
+        _call_key(call_session_id),
+        _participants_key(call_session_id),
+        _joined_key(call_session_id),
+    )
+
+
+def create_call(room_id, call_type, initiated_by, invitees, ice_servers):
+    """
+    Register a new ringing call
+
+    Args:
+        room_id (str): Chat Room ID
+        call_type (str): Audio or Video
+        initiated_by (str): Initiating user (joins immediately)
+        invitees (list): Users to ring
+        ice_servers (list): ICE server configuration
+
+    Returns:
+        dict: Call (see get_call)
+    """
+    # Reserve the document name now so clients can use it for the whole call
+    placeholder = frappe.new_doc("Chat Call Session")
+    placeholder.set_new_name()
+    call_session_id = placeholder.name
+
+    _claim_room(room_id, call_session_id)
+
+    now = str(now_datetime())
+    call = {
+        "name": call_session_id,
+        "room_id": room_id,
+        "call_type": call_type,
+        "call_status": "Ringing",
+        "initiated_by": initiated_by,
+        "start_time": now,
+        "session_id": str(uuid.uuid4()),
+        "ice_servers_config": json.dumps(ice_servers),
+    }
+
+    participants = {
+        initiated_by: _participant_row(0, "Joined", joined_time=now)
+    }
+    for user in invitees:
+        if user not in participants:
+            participants[user] = _participant_row(len(participants), "Invited")
+
+    call_key, participants_key, joined_key = _call_keys(call_session_id)
+    pipe = pipeline(transaction=True)
+    pipe.hset(call_key, mapping=call)
+    pipe.hset(participants_key, mapping={
+        user: json.dumps(row) for user, row in participants.items()
+    })
+    pipe.sadd(joined_key, initiated_by)
+    for key in (call_key, participants_key, joined_key):
+        pipe.expire(key, CALL_EXPIRY)
+    pipe.zadd(_ringing_key(), {call_session_id: time.time() + RING_TIMEOUT})
+    pipe.execute()
+
+    return get_call(call_session_id)
+
+
+def _claim_room(room_id, call_session_id):
+    """Atomically make this the room's only active call"""
+    room_key = _room_call_key(room_id)
+
+    pipe = pipeline()
+    pipe.set(room_key, call_session_id, nx=True, ex=CALL_EXPIRY)
+    pipe.get(room_key)
+    claimed, current = pipe.execute()
+    if claimed:
+        return
+
+    # The holder may have expired from the registry without releasing the room
+    pipe = pipeline()
+    pipe.exists(_call_key(decode(current)))
+    if pipe.execute()[0]:
+        frappe.throw("There is already an active call in this room")
+
+    pipe = pipeline()
+    pipe.set(room_key, call_session_id, ex=CALL_EXPIRY)
+    pipe.execute()
+
+
+def _participant_row(idx, status, joined_time=None):
+    return {
+        "idx": idx,
+        "status": status,
+        "joined_time": joined_time,
+        "left_time": None,
+        "duration": None,
+    }
+
+
+def get_call(call_session_id):
+    """
+    Get a live call
+
+    Args:
+        call_session_id (str): Chat Call Session ID
+
+    Returns:
+        dict: Call fields plus `participants` (list of rows with `user`), or None
+    """
+    call_key, participants_key, _joined = _call_keys(call_session_id)
+
+    pipe = pipeline()
+    pipe.hgetall(call_key)
+    pipe.hgetall(participants_key)
+    call, participants = pipe.execute()
+
+    if not call:
+        return None
+
+    call = {decode(field): decode(value) for field, value in call.items()}
+
+    rows = []
+    for user, row in participants.items():
+        row = json.loads(decode(row))
+        row["user"] = decode(user)
+        rows.append(row)
+    call["participants"] = sorted(rows, key=lambda row: row["idx"])
+
+    return call
+
+
+def get_room_active_call(room_id):
+    """Get the live call of a room, if any"""
+    pipe = pipeline()
+    pipe.get(_room_call_key(room_id))
+    call_session_id = decode(pipe.execute()[0])
+
+    return get_call(call_session_id) if call_session_id else None
+
+
+def get_joined_users(call_session_id):
+    pipe = pipeline()
+    pipe.smembers(_joined_key(call_session_id))
+    return decode_set(pipe.execute()[0])
+
+
+def _update_participant(call_session_id, user, create=True, **changes):
+    """
+    Rewrite one participant row (a user only ever rewrites their own row)
+
+    Returns:
+        dict: The new row, or None if the user has no row and `create` is off
+    """
+    participants_key = _participants_key(call_session_id)
+
+    pipe = pipeline()
+    pipe.hget(participants_key, user)
+    pipe.hlen(participants_key)
+    row, count = pipe.execute()
+
+    if row:
+        row = json.loads(decode(row))
+    elif create:
+        row = _participant_row(count, "Invited")
+    else:
+        return None
+
+    row.update(changes)
+
+    pipe = pipeline()
+    pipe.hset(participants_key, user, json.dumps(row))
+    pipe.execute()
+
+    return row
+
+
+def join(call_session_id, user):
+    """
+    Mark a user as joined
+
+    Returns:
+        dict: Call (see get_call)
+    """
+    call = get_call(call_session_id)
+    if not call or call["call_status"] not in ACTIVE_STATUSES:
+        frappe.throw("This call is no longer active")
+
+    _update_participant(
+        call_session_id,
+        user,
+        status="Joined",
+        joined_time=str(now_datetime()),
+        left_time=None
+    )
+
+    pipe = pipeline(transaction=True)
+    pipe.sadd(_joined_key(call_session_id), user)
+    if user != call["initiated_by"] and call["call_status"] != "Connected":
+        # Someone answered: the call is no longer ringing
+        pipe.hset(_call_key(call_session_id), "call_status", "Connected")
+        pipe.zrem(_ringing_key(), call_session_id)
+    pipe.execute()
+
+    return get_call(call_session_id)
+
+
+def leave(call_session_id, user):
+    """
+    Mark a user as left; the last one out ends the call
+
+    Returns:
+        bool: True if the call ended
+    """
+    pipe = pipeline()
+    pipe.hget(_participants_key(call_session_id), user)
+    row = pipe.execute()[0]
+    if not row:
+        return False
+
+    row = json.loads(decode(row))
+    now = str(now_datetime())
+    duration = int(time_diff_in_seconds(now, row["joined_time"])) if row.get("joined_time") else None
+    _update_participant(call_session_id, user, status="Left", left_time=now, duration=duration)
+
+    pipe = pipeline(transaction=True)
+    pipe.srem(_joined_key(call_session_id), user)
+    pipe.scard(_joined_key(call_session_id))
+    remaining = pipe.execute()[1]
+
+    if remaining == 0:
+        return end_call(call_session_id, "Ended") is not None
+
+    return False
+
+
+def reject(call_session_id, user):
+    """
+    Mark an invitee as having rejected the call; once every invitee of a
+    still ringing call has rejected it, it ends as Rejected
+
+    Returns:
+        bool: True if the call ended
+    """
+    if not _update_participant(call_session_id, user, create=False, status="Rejected"):
+        frappe.throw("You were not invited to this call")
+
+    call = get_call(call_session_id)
+    if not call or call["call_status"] not in ("Initiated", "Ringing"):
+        return False
+
+    invitees = [row for row in call["participants"] if row["user"] != call["initiated_by"]]
+    if all(row["status"] == "Rejected" for row in invitees):
+        return end_call(call_session_id, "Rejected") is not None
+
+    return False
+
+
+def end_call(call_session_id, status="Ended"):
+    """
+    End a call and write it to Chat Call Session
+
+    Only the first caller wins; later calls return None. If persisting
+    fails the win is released and the error re-raised, so a retry can end it.
+
+    Args:
+        call_session_id (str): Chat Call Session ID
+        status (str): Final call status (Ended, Missed, Failed, Rejected)
+
+    Returns:
+        Document: The persisted Chat Call Session, or None
+    """
+    end_time = str(now_datetime())
+
+    pipe = pipeline()
+    pipe.hsetnx(_call_key(call_session_id), "end_time", end_time)
+    if not pipe.execute()[0]:
+        return None
+
+    call = get_call(call_session_id)
+    if not call:
+        return None
+
+    participants = []
+    for row in call["participants"]:
+        if row["status"] == "Joined":
+            row["status"] = "Left"
+            row["left_time"] = end_time
+            row["duration"] = int(time_diff_in_seconds(end_time, row["joined_time"]))
+        participants.append({
+            "user": row["user"],
+            "status": row["status"],
+            "joined_time": row.get("joined_time"),
+            "left_time": row.get("left_time"),
+            "duration": row.get("duration"),
+        })
+
+    try:
+        call_session = frappe.get_doc({
+            "doctype": "Chat Call Session",
+            "chat_room": call["room_id"],
+            "call_type": call["call_type"],
+            "call_status": status,
+            "initiated_by": call["initiated_by"],
+            "start_time": call["start_time"],
+            "end_time": end_time,
+            "session_id": call["session_id"],
+            "ice_servers_config": call["ice_servers_config"],
+            "total_duration": int(time_diff_in_seconds(end_time, call["start_time"])),
+            "participants": participants
+        })
+        call_session.insert(ignore_permissions=True, set_name=call_session_id)
+        record_call_history(call_session)
+
+    except Exception:
+        # Give up the win so the call (and its room claim) can still be ended
+        pipe = pipeline()
+        pipe.hdel(_call_key(call_session_id), "end_time")
+        pipe.execute()
+        raise
+
+    _release(call_session_id, call["room_id"])
+
+    return call_session
+
+
+def _release(call_session_id, room_id):
+    room_key = _room_call_key(room_id)
+
+    pipe = pipeline()
+    pipe.get(room_key)
+    holder = decode(pipe.execute()[0])
+
+    pipe = pipeline(transaction=True)
+    pipe.delete(*_call_keys(call_session_id))
+    pipe.zrem(_ringing_key(), call_session_id)
+    if holder == call_session_id:
+        pipe.delete(room_key)
+    pipe.execute()
+
+
+# Scheduled job
+
+def reap_ringing_calls():
+    """
+    Cron job: close calls that rang past RING_TIMEOUT without being answered
+    """
+    with track_job_run("f_chat.APIs.notification_chatroom.chat_apis.call_registry.reap_ringing_calls") as run:
+        try:
+            pipe = pipeline()
+            pipe.zrangebyscore(_ringing_key(), "-inf", time.time())
+            expired = [decode(call_session_id) for call_session_id in pipe.execute()[0]]
+            run.rows = len(expired)
+
+            for call_session_id in expired:
+                call = get_call(call_session_id)
+
+                if call and call["call_status"] in ("Initiated", "Ringing"):
+                    call_session = end_call(call_session_id, "Missed")
+                    if call_session:
+                        frappe.db.commit()
+                        frappe.publish_realtime(
+                            event="call_ended",
+                            message={
+                                "call_session_id": call_session_id,
+                                "session_id": call_session.session_id,
+                                "room_id": call_session.chat_room,
+                                "call_status": "Missed"
+                            },
+                            room=f"chat_room_{call_session.chat_room}"
+                        )
+                else:
+                    pipe = pipeline()
+                    pipe.zrem(_ringing_key(), call_session_id)
+                    pipe.execute()
+
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in reap_ringing_calls: {str(e)}")
@@ -0,0 +1,88 @@
+# f_chat/APIs/notification_chatroom/chat_apis/call_signaling.py
+# WebRTC signaling relay
+#
+# Signals are relayed straight to the participants' own realtime channels.
+# Call membership is checked against the live call registry (Redis), so
+# relaying a signal does not load the Chat Call Session document or wait
+# for a commit.
+
+import json
+
+import frappe
+
+from f_chat.APIs.notification_chatroom.chat_apis.call_registry import get_call
+
+ICE_CANDIDATE_BATCH = "ice-candidates"
+SIGNAL_TYPES = ("offer", "answer", "ice-candidate", ICE_CANDIDATE_BATCH)
+
+
+def get_call_roster(call_session_id):
+    """
+    Get the roster of a live call
+
+    Args:
+        call_session_id (str): Chat Call Session ID
+
+    Returns:
+        dict: {room_id, session_id, participants (set)} or None if the call is not live
+    """
+    call = get_call(call_session_id)
+    if not call:
+        return None
+
+    return {
+        "room_id": call["room_id"],
+        "session_id": call["session_id"],
+        "participants": {row["user"] for row in call["participants"]}
+    }
+
+
+def relay_signal(call_session_id, from_user, signal_type, signal_data, target_user=None):
+    """
+    Relay a signaling message to the other participants of a call
+
+    Args:
+        call_session_id (str): Chat Call Session ID
+        from_user (str): Sender
+        signal_type (str): offer, answer, ice-candidate or ice-candidates
+        signal_data (dict|list): Payload; a list of candidates for ice-candidates
+        target_user (str): Deliver only to this participant
+
+    Returns:
+        int: Number of users the signal was delivered to
+    """
+    if signal_type not in SIGNAL_TYPES:
+        frappe.throw(f"Invalid signal type: {signal_type}")
+
+    if isinstance(signal_data, str):
+        signal_data = json.loads(signal_data)
+
+    roster = get_call_roster(call_session_id)
+    if not roster:
+        frappe.throw("This call is no longer active")
+
+    participants = roster["participants"]
+    if from_user not in participants:
+        frappe.throw("You are not a participant in this call")
+
+    if target_user:
+        if target_user not in participants:
+            frappe.throw("Target user is not a participant in this call")
+        recipients = [target_user]
+    else:
+        recipients = [user for user in participants if user != from_user]
+
+    message = {
+        "call_session_id": call_session_id,
+        "session_id": roster["session_id"],
+        "signal_type": signal_type,
+        "signal_data": signal_data,
+        "from_user": from_user,
+        "to_user": target_user,
+        "room_id": roster["room_id"]
+    }
+
+    for user in recipients:
+        frappe.publish_realtime(event="webrtc_signal", message=message, user=user)
+
+    return len(recipients)
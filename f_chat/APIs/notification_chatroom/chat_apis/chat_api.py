@@ -4,6 +4,12 @@ from frappe import _
 from frappe.utils import now_datetime, cint, get_datetime
 import json
 
+from f_chat.f_chat.doctype.chat_message_archive.chat_message_archive import (
+    get_archived_messages,
+    newest_archived_timestamp,
+    seek_archived,
+)
+
 @frappe.whitelist()
 def get_user_chat_rooms(page=1, page_size=20, room_type=None, search=None):
     """
@@ -236,15 +242,28 @@ def create_chat_room(room_name, room_type, description=None, members=None, team_
         }
 
 @frappe.whitelist()
-def get_chat_messages(room_id, page=1, page_size=10, before_timestamp=None):
+def get_chat_messages(room_id, page=1, page_size=10, before_timestamp=None,
+                      around_message_id=None, around_timestamp=None,
+                      before_cursor=None, after_cursor=None):
     """
     Get messages for a chat room with pagination
     
+    Passing around_message_id / around_timestamp, or one of the cursors
+    returned by that mode, switches to keyset paging on (timestamp, name).
+    
+    Page mode is deprecated and kept for older clients. It reads through the
+    same seek, so it continues into the archive, but a page costs time linear
+    in its offset; use the cursors instead.
+    
     Args:
         room_id (str): Chat room ID
         page (int): Page number
-        page_size (int): Messages per page
+        page_size (int): Messages per page (per side in around mode)
         before_timestamp (str): Get messages before this timestamp
+        around_message_id (str): Center the window on this message
+        around_timestamp (str): Center the window on this point in time
+        before_cursor (str): Get older messages than this cursor
+        after_cursor (str): Get newer messages than this cursor
         
     Returns:
         dict: Messages with pagination info
@@ -262,110 +281,47 @@ def get_chat_messages(room_id, page=1, page_size=10, before_timestamp=None):
         if not permissions["is_member"]:
             frappe.throw("You are not a member of this chat room")
             
+        if around_message_id or around_timestamp or before_cursor or after_cursor:
+            return _get_messages_by_cursor(
+                room_id,
+                page_size,
+                around_message_id=around_message_id,
+                around_timestamp=around_timestamp,
+                before_cursor=before_cursor,
+                after_cursor=after_cursor
+            )
+            
         # Build conditions
         conditions = ["chat_room = %(room_id)s", "is_deleted = 0"]
         values = {"room_id": room_id}
+        # "" sorts before every name, so the seek starts strictly before the timestamp
+        position = (get_datetime(before_timestamp) if before_timestamp else PAGE_MODE_START, "")
         
         if before_timestamp:
             conditions.append("timestamp < %(before_timestamp)s")
-            values["before_timestamp"] = get_datetime(before_timestamp)
+            values["before_timestamp"] = position[0]
             
         where_clause = " AND ".join(conditions)
         
-        # Get messages with attachments and reactions
-        query = f"""
-            SELECT 
-                name,
-                sender,
-                message_type,
-                message_content,
-                timestamp,
-                reply_to_message,
-                is_edited,
-                edit_timestamp
-            FROM `tabChat Message`
-            WHERE {where_clause}
-            ORDER BY timestamp DESC
-            LIMIT %(limit)s OFFSET %(offset)s
-        """
+        # Newest first through the hot table, then the archive
+        messages, _has_more = _seek_messages(room_id, position, "before", offset + page_size)
+        messages = messages[offset:]
         
-        values.update({"limit": page_size, "offset": offset})
-        messages = frappe.db.sql(query, values, as_dict=True)
-        
-        # Get attachments and reactions for each message
-        for message in messages:
-            # Attachments
-            message["attachments"] = frappe.get_all(
-                "Chat Message Attachment",
-                filters={"parent": message.name},
-                fields=["file_name", "file_url", "file_type", "file_size"]
-            )
-
-            # Reactions
-            reactions = frappe.get_all(
-                "Chat Message Reaction",
-                filters={"parent": message.name},
-                fields=["reaction_emoji", "user", "timestamp"]
-            )
-            reaction_summary = {}
-            for reaction in reactions:
-                emoji = reaction.reaction_emoji
-                if emoji not in reaction_summary:
-                    reaction_summary[emoji] = {"count": 0, "users": []}
-                reaction_summary[emoji]["count"] += 1
-                reaction_summary[emoji]["users"].append({
-                    "user": reaction.user,
-                    "timestamp": str(reaction.timestamp)
-                })
-            message["reactions"] = reaction_summary
-
-            # ✅ Reply-to details
-            if message.reply_to_message:
-                reply = frappe.db.get_value(
-                    "Chat Message",
-                    message.reply_to_message,
-                    ["name", "sender", "message_content"],
-                    as_dict=True
-                )
-                if reply:
-                    sender_info = frappe.db.get_value(
-                        "User",
-                        reply.sender,
-                        ["full_name"],
-                        as_dict=True
-                    )
-                    message["reply_to_content"] = reply.message_content
-                    message["reply_to_sender"] = sender_info.full_name if sender_info else reply.sender
-                else:
-                    message["reply_to_content"] = "[Message not found]"
-                    message["reply_to_sender"] = "Unknown"
-
-            # Format timestamps
-            message["timestamp"] = str(message.timestamp)
-            if message.edit_timestamp:
-                message["edit_timestamp"] = str(message.edit_timestamp)
-
-            # Sender info
-            sender_info = frappe.db.get_value(
-                "User", 
-                message.sender, 
-                ["full_name", "user_image"], 
-                as_dict=True
-            )
-            message["sender_info"] = sender_info or {"full_name": message.sender}
-
+        # Attachments, reactions, replies and sender info for the whole page
+        _add_message_details(messages)
         
         # Update user's last read timestamp
         room.update_last_read(current_user)
         
-        # Get total count for pagination
-        count_query = f"""
-            SELECT COUNT(*) as total
-            FROM `tabChat Message`
-            WHERE {where_clause}
-        """
-        
-        total_count = frappe.db.sql(count_query, values, as_dict=True)[0].total
+        # Get total count for pagination (archived messages are still readable)
+        total_count = sum(
+            frappe.db.sql(f"""
+                SELECT COUNT(*)
+                FROM `tab{doctype}`
+                WHERE {where_clause}
+            """, values)[0][0]
+            for doctype in ("Chat Message", "Chat Message Archive")
+        )
         total_pages = (total_count + page_size - 1) // page_size
         
         return {
@@ -393,6 +349,236 @@ def get_chat_messages(room_id, page=1, page_size=10, before_timestamp=None):
             }
         }
 
+PAGE_MODE_START = get_datetime("9999-12-31 23:59:59")  # later than any message
+
+MESSAGE_FIELDS = """
+    name,
+    sender,
+    message_type,
+    message_content,
+    timestamp,
+    reply_to_message,
+    is_edited,
+    edit_timestamp
+"""
+
+def _get_messages_by_cursor(room_id, page_size, around_message_id=None, around_timestamp=None,
+                            before_cursor=None, after_cursor=None):
+    """
+    Keyset paging on the (chat_room, timestamp, name) index
+    
+    Around mode returns up to page_size messages on each side of the anchor
+    (plus the anchor message itself). Messages are newest first, like the
+    paged mode, and each direction gets its own cursor.
+    """
+    anchor = None
+    if around_message_id:
+        anchor = frappe.db.get_value(
+            "Chat Message",
+            around_message_id,
+            ["name", "chat_room", "timestamp", "is_deleted"],
+            as_dict=True
+        ) or get_archived_messages([around_message_id]).get(around_message_id)
+        if not anchor or anchor.chat_room != room_id:
+            frappe.throw("Message not found in this chat room")
+        position = (anchor.timestamp, anchor.name)
+    elif around_timestamp:
+        # "" sorts before every name, so the window splits exactly at the timestamp
+        position = (get_datetime(around_timestamp), "")
+
+    older, newer = [], []
+    has_older = has_newer = False
+    
+    if before_cursor:
+        older, has_older = _seek_messages(room_id, _decode_message_cursor(before_cursor), "before", page_size)
+    elif after_cursor:
+        newer, has_newer = _seek_messages(room_id, _decode_message_cursor(after_cursor), "after", page_size)
+    else:
+        older, has_older = _seek_messages(room_id, position, "before", page_size)
+        newer, has_newer = _seek_messages(room_id, position, "after", page_size)
+        
+    messages = list(reversed(newer))
+    if anchor and not anchor.is_deleted:
+        if anchor.get("archived"):
+            messages.append(anchor)
+        else:
+            messages += frappe.db.sql(f"""
+                SELECT {MESSAGE_FIELDS}
+                FROM `tabChat Message`
+                WHERE name = %(name)s
+            """, {"name": anchor.name}, as_dict=True)
+    messages += older
+    
+    if before_cursor:
+        # Paging backwards from the newest end of the window: whatever is newer was already loaded
+        has_newer = True
+    elif after_cursor:
+        has_older = True
+        
+    before = _encode_message_cursor(messages[-1]) if messages and has_older else None
+    after = _encode_message_cursor(messages[0]) if messages and has_newer else None
+    
+    _add_message_details(messages)
+    
+    return {
+        "success": True,
+        "data": {
+            "messages": messages,
+            "anchor": anchor.name if anchor else None,
+            "pagination": {
+                "page_size": page_size,
+                "has_older": has_older,
+                "has_newer": has_newer,
+                "before_cursor": before,
+                "after_cursor": after
+            }
+        }
+    }
+
+def _seek_messages(room_id, position, direction, limit):
+    """
+    Fetch up to `limit` messages strictly before/after a (timestamp, name) position
+    
+    Falls through to Chat Message Archive when the hot table runs out going
+    back, or when paging forward from inside the archived range.
+    
+    Returns:
+        tuple: (messages ordered away from the position, has_more)
+    """
+    timestamp, name = position
+    if direction == "before":
+        condition = "(timestamp < %(timestamp)s OR (timestamp = %(timestamp)s AND name < %(name)s))"
+        order = "timestamp DESC, name DESC"
+    else:
+        condition = "(timestamp > %(timestamp)s OR (timestamp = %(timestamp)s AND name > %(name)s))"
+        order = "timestamp ASC, name ASC"
+        
+    messages = frappe.db.sql(f"""
+        SELECT {MESSAGE_FIELDS}
+        FROM `tabChat Message`
+        WHERE chat_room = %(room_id)s
+            AND is_deleted = 0
+            AND {condition}
+        ORDER BY {order}
+        LIMIT %(limit)s
+    """, {
+        "room_id": room_id,
+        "timestamp": timestamp,
+        "name": name,
+        "limit": limit + 1
+    }, as_dict=True)
+    
+    if direction == "before":
+        reaches_archive = len(messages) <= limit
+    else:
+        newest_archived = newest_archived_timestamp(room_id)
+        reaches_archive = bool(newest_archived) and timestamp <= newest_archived
+        
+    if reaches_archive:
+        messages = sorted(
+            messages + seek_archived(room_id, position, direction, limit + 1),
+            key=lambda message: (message.timestamp, message.name),
+            reverse=direction == "before"
+        )[:limit + 1]
+    
+    return messages[:limit], len(messages) > limit
+
+def _encode_message_cursor(message):
+    return f"{message.timestamp}|{message.name}"
+
+def _decode_message_cursor(cursor):
+    """Split a `timestamp|name` cursor"""
+    cursor_time, _sep, cursor_name = cursor.rpartition("|")
+    if not cursor_time or not cursor_name:
+        frappe.throw("Invalid cursor")
+    return get_datetime(cursor_time), cursor_name
+
+def _add_message_details(messages):
+    """Attach attachments, reactions, reply previews and sender info with one query each"""
+    if not messages:
+        return
+        
+    # Archived messages carry their attachments and reactions in the payload
+    names = [message.name for message in messages if not message.get("archived")]
+    attachments = {}
+    reaction_rows = []
+    for message in messages:
+        if message.get("archived"):
+            attachments[message.name] = message.pop("archived_attachments")
+            reaction_rows += [
+                frappe._dict(reaction, parent=message.name) for reaction in message.pop("archived_reactions")
+            ]
+            
+    if names:
+        for attachment in frappe.get_all(
+            "Chat Message Attachment",
+            filters={"parent": ["in", names]},
+            fields=["parent", "file_name", "file_url", "file_type", "file_size"]
+        ):
+            attachments.setdefault(attachment.pop("parent"), []).append(attachment)
+            
+        reaction_rows += frappe.get_all(
+            "Chat Message Reaction",
+            filters={"parent": ["in", names]},
+            fields=["parent", "reaction_emoji", "user", "timestamp"]
+        )
+        
+    reactions = {}
+    for reaction in reaction_rows:
+        summary = reactions.setdefault(reaction.parent, {})
+        entry = summary.setdefault(reaction.reaction_emoji, {"count": 0, "users": []})
+        entry["count"] += 1
+        entry["users"].append({"user": reaction.user, "timestamp": str(reaction.timestamp)})
+        
+    reply_names = list({message.reply_to_message for message in messages if message.reply_to_message})
+    replies = {}
+    if reply_names:
+        replies = {
+            reply.name: reply
+            for reply in frappe.get_all(
+                "Chat Message",
+                filters={"name": ["in", reply_names]},
+                fields=["name", "sender", "message_content"]
+            )
+        }
+        replies.update(get_archived_messages([name for name in reply_names if name not in replies]))
+        
+    senders = {message.sender for message in messages}
+    senders.update(reply.sender for reply in replies.values())
+    users = {
+        user.name: user
+        for user in frappe.get_all(
+            "User",
+            filters={"name": ["in", list(senders)]},
+            fields=["name", "full_name", "user_image"]
+        )
+    }
+    
+    for message in messages:
+        message["attachments"] = attachments.get(message.name, [])
+        message["reactions"] = reactions.get(message.name, {})
+        
+        if message.reply_to_message:
+            reply = replies.get(message.reply_to_message)
+            if reply:
+                reply_sender = users.get(reply.sender)
+                message["reply_to_content"] = reply.message_content
+                message["reply_to_sender"] = reply_sender.full_name if reply_sender else reply.sender
+            else:
+                message["reply_to_content"] = "[Message not found]"
+                message["reply_to_sender"] = "Unknown"
+                
+        message["cursor"] = _encode_message_cursor(message)
+        message["timestamp"] = str(message.timestamp)
+        if message.edit_timestamp:
+            message["edit_timestamp"] = str(message.edit_timestamp)
+            
+        sender = users.get(message.sender)
+        message["sender_info"] = (
+            {"full_name": sender.full_name, "user_image": sender.user_image}
+            if sender else {"full_name": message.sender}
+        )
+
 @frappe.whitelist()
 def send_message(room_id, message_content, message_type="Text", reply_to=None, attachments=None):
     """
@@ -0,0 +1,509 @@
+# f_chat/APIs/notification_chatroom/chat_apis/compliance_export.py
+# Organisation-wide compliance export: every room a set of users took part in
+#
+# The work is partitioned by room. Each room is a shard written by its own
+# background job on the "long" queue, so several RQ workers export in
+# parallel. A shard streams its messages into a gzip File with the same
+# reader/writer as the single-room export. When the last shard settles, the
+# worker that finished it writes a JSON manifest listing every shard file,
+# its message count and checksum.
+#
+# State lives in Redis:
+#   chat_compliance:{job}               HASH  job fields (users, range, status, manifest, ...)
+#   chat_compliance_shards:{job}        HASH  room -> JSON shard state
+#   chat_compliance_manifest:{job}      STRING lock taken by the worker that merges
+#
+# Shard files have deterministic names, so a restart only re-runs the shards
+# that are not Completed and overwrites whatever a failed attempt left behind.
+
+import json
+import time
+import uuid
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis.message_export import (
+    FORMATS,
+    create_export_file,
+    write_room_export,
+)
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    make_key,
+    pipeline,
+)
+
+ADMIN_ROLES = ("System Manager", "Chat Admin")
+JOB_EXPIRY = 86400 * 7  # compliance jobs are kept for a week after the last update
+SHARD_TIMEOUT = 3600  # an unfinished shard silent for this long is assumed lost and may be restarted
+SHARD_METHOD = "f_chat.APIs.notification_chatroom.chat_apis.compliance_export.run_shard"
+
+SHARD_QUEUED = "Queued"
+SHARD_RUNNING = "Running"
+SHARD_COMPLETED = "Completed"
+SHARD_FAILED = "Failed"
+
+
+def _job_key(job_id):
+    return make_key("chat_compliance", job_id)
+
+
+def _shards_key(job_id):
+    return make_key("chat_compliance_shards", job_id)
+
+
+def _manifest_lock_key(job_id):
+    return make_key("chat_compliance_manifest", job_id)
+
+
+def _check_admin():
+    if not set(ADMIN_ROLES) & set(frappe.get_roles()):
+        frappe.throw("Only System Managers and Chat Admins can run compliance exports", frappe.PermissionError)
+
+
+def _update_job(job_id, **fields):
+    pipe = pipeline(transaction=True)
+    pipe.hset(_job_key(job_id), mapping={
+        field: "" if value is None else value for field, value in fields.items()
+    })
+    pipe.expire(_job_key(job_id), JOB_EXPIRY)
+    pipe.expire(_shards_key(job_id), JOB_EXPIRY)
+    pipe.execute()
+
+
+def _update_shard(job_id, room_id, **fields):
+    """Merge fields into one shard's state (each shard is only written by its own worker)"""
+    pipe = pipeline()
+    pipe.hget(_shards_key(job_id), room_id)
+    shard = pipe.execute()[0]
+    shard = json.loads(decode(shard)) if shard else {"room_id": room_id}
+    shard.update(fields, updated=time.time())
+
+    pipe = pipeline(transaction=True)
+    pipe.hset(_shards_key(job_id), room_id, json.dumps(shard, default=str))
+    pipe.expire(_shards_key(job_id), JOB_EXPIRY)
+    pipe.execute()
+    return shard
+
+
+def get_job(job_id):
+    """
+    Get a compliance export's job fields
+
+    Returns:
+        dict: Job fields, or None if unknown or expired
+    """
+    pipe = pipeline()
+    pipe.hgetall(_job_key(job_id))
+    job = pipe.execute()[0]
+    if not job:
+        return None
+
+    job = {decode(field): decode(value) for field, value in job.items()}
+    job["users"] = json.loads(job.get("users") or "[]")
+    for field in ("total_shards", "processed"):
+        job[field] = cint(job.get(field))
+    return job
+
+
+def get_shards(job_id):
+    """
+    Get every shard's state
+
+    Returns:
+        dict: room -> shard state
+    """
+    pipe = pipeline()
+    pipe.hgetall(_shards_key(job_id))
+    return {
+        decode(room): json.loads(decode(state))
+        for room, state in pipe.execute()[0].items()
+    }
+
+
+def get_participated_rooms(users, from_date=None, to_date=None):
+    """
+    Rooms any of the users belongs to or posted in during the range
+
+    Former members are found through their messages, live or archived, so
+    rooms they have since left are still exported.
+    """
+    conditions = ["sender IN %(users)s"]
+    values = {"users": tuple(users)}
+    if from_date:
+        conditions.append("timestamp >= %(from_date)s")
+        values["from_date"] = get_datetime(from_date)
+    if to_date:
+        conditions.append("timestamp <= %(to_date)s")
+        values["to_date"] = get_datetime(to_date)
+
+    return [row[0] for row in frappe.db.sql(f"""
+        SELECT parent FROM `tabChat Room Member`
+        WHERE user IN %(users)s AND parenttype = 'Chat Room'
+        UNION
+        SELECT DISTINCT chat_room FROM `tabChat Message`
+        WHERE {" AND ".join(conditions)}
+        UNION
+        SELECT DISTINCT chat_room FROM `tabChat Message Archive`
+        WHERE {" AND ".join(conditions)}
+        ORDER BY 1
+    """, values)]
+
+
+def _shard_file_name(job_id, room_id, format_type):
+    return f"compliance_{job_id[:8]}_{frappe.scrub(room_id)}.{format_type}.gz"
+
+
+def _enqueue_shards(job_id, rooms):
+    pipe = pipeline(transaction=True)
+    for room_id in rooms:
+        pipe.hset(_shards_key(job_id), room_id, json.dumps({
+            "room_id": room_id,
+            "status": SHARD_QUEUED,
+            "processed": 0,
+            "updated": time.time(),
+        }))
+    pipe.expire(_shards_key(job_id), JOB_EXPIRY)
+    pipe.execute()
+
+    for room_id in rooms:
+        frappe.enqueue(
+            SHARD_METHOD,
+            queue="long",
+            timeout=SHARD_TIMEOUT,
+            enqueue_after_commit=True,
+            export_id=job_id,
+            room_id=room_id
+        )
+
+
+def start_compliance_export(users, from_date=None, to_date=None, format_type="ndjson", requested_by=None):
+    """
+    Queue one shard per room the users took part in
+
+    Args:
+        users (list): Users whose conversations are exported
+        from_date (datetime): Earliest timestamp
+        to_date (datetime): Latest timestamp
+        format_type (str): csv or ndjson
+        requested_by (str): User notified of progress (defaults to the session user)
+
+    Returns:
+        dict: Job state
+    """
+    if format_type not in FORMATS:
+        frappe.throw(f"Unsupported export format: {format_type}")
+    if not users:
+        frappe.throw("At least one user is required")
+
+    rooms = get_participated_rooms(users, from_date, to_date)
+    job_id = uuid.uuid4().hex
+
+    _update_job(
+        job_id,
+        job_id=job_id,
+        user=requested_by or frappe.session.user,
+        users=json.dumps(sorted(users)),
+        format=format_type,
+        from_date=str(from_date) if from_date else None,
+        to_date=str(to_date) if to_date else None,
+        status="Running" if rooms else "Completed",
+        total_shards=len(rooms),
+        created=str(now_datetime())
+    )
+
+    if rooms:
+        _enqueue_shards(job_id, rooms)
+    else:
+        write_manifest(job_id)
+
+    return get_status(job_id)
+
+
+def restart_compliance_export(job_id):
+    """
+    Re-queue the shards that did not complete
+
+    Failed shards are re-run, as are Queued or Running shards that have not
+    reported for SHARD_TIMEOUT seconds (their RQ job or worker was lost).
+    Completed shards keep their files.
+
+    Returns:
+        dict: Job state, or None if the job is unknown
+    """
+    job = get_job(job_id)
+    if not job:
+        return None
+
+    cutoff = time.time() - SHARD_TIMEOUT
+    rooms = [
+        room_id for room_id, shard in get_shards(job_id).items()
+        if shard["status"] == SHARD_FAILED
+        or (shard["status"] != SHARD_COMPLETED and shard.get("updated", 0) < cutoff)
+    ]
+
+    if rooms:
+        pipe = pipeline()
+        pipe.delete(_manifest_lock_key(job_id))
+        pipe.execute()
+
+        _update_job(job_id, status="Running", manifest_url=None, completed=None)
+        _enqueue_shards(job_id, rooms)
+
+    return get_status(job_id)
+
+
+def run_shard(export_id, room_id):
+    """
+    Background job: export one room of a compliance job
+
+    (The argument is not called job_id because frappe.enqueue reserves that name.)
+    """
+    job_id = export_id
+    job = get_job(job_id)
+    if not job:
+        return
+
+    pipe = pipeline()
+    pipe.hget(_shards_key(job_id), room_id)
+    shard = pipe.execute()[0]
+    if not shard:
+        return
+    shard = json.loads(decode(shard))
+    if shard["status"] == SHARD_COMPLETED:
+        return
+
+    file_name = _shard_file_name(job_id, room_id, job["format"])
+
+    try:
+        _update_shard(
+            job_id, room_id,
+            status=SHARD_RUNNING,
+            attempts=cint(shard.get("attempts")) + 1,
+            error=None
+        )
+        _remove_file(file_name)
+
+        # Left unattached: attaching to the Chat Room would let its members read it
+        file_doc, processed = write_room_export(
+            room_id, file_name, job.get("from_date"), job.get("to_date"), job["format"],
+            on_chunk=lambda count: _update_shard(job_id, room_id, processed=count)
+        )
+
+        _update_shard(
+            job_id, room_id,
+            status=SHARD_COMPLETED,
+            processed=processed,
+            file_name=file_name,
+            file_url=file_doc.file_url,
+            file_size=file_doc.file_size,
+            content_hash=file_doc.content_hash
+        )
+
+    except Exception as e:
+        _update_shard(job_id, room_id, status=SHARD_FAILED, error=str(e))
+        frappe.log_error(f"Error in compliance export {job_id} shard {room_id}: {str(e)}")
+
+    _shard_settled(job_id)
+
+
+def _remove_file(file_name):
+    """Drop a shard file left by an earlier attempt (its contents may be incomplete)"""
+    for name in frappe.get_all("File", filters={"file_url": f"/private/files/{file_name}"}, pluck="name"):
+        frappe.delete_doc("File", name, ignore_permissions=True, force=True)
+    frappe.db.commit()
+
+
+def _shard_settled(job_id):
+    """Merge the manifest once no shard is left to run (only one worker gets the lock)"""
+    shards = get_shards(job_id)
+    if any(shard["status"] in (SHARD_QUEUED, SHARD_RUNNING) for shard in shards.values()):
+        _publish_progress(job_id)
+        return
+
+    pipe = pipeline()
+    pipe.set(_manifest_lock_key(job_id), 1, nx=True, ex=JOB_EXPIRY)
+    if pipe.execute()[0]:
+        write_manifest(job_id)
+    _publish_progress(job_id)
+
+
+def write_manifest(job_id):
+    """
+    Merge shard results into one JSON manifest File
+
+    The job is Completed when every shard completed and Partial otherwise;
+    a Partial job can be restarted and is merged again afterwards.
+    """
+    job = get_job(job_id)
+    shards = sorted(get_shards(job_id).values(), key=lambda shard: shard["room_id"])
+    room_names = dict(frappe.get_all(
+        "Chat Room",
+        filters={"name": ["in", [shard["room_id"] for shard in shards]]},
+        fields=["name", "room_name"],
+        as_list=True
+    )) if shards else {}
+
+    failed = [shard["room_id"] for shard in shards if shard["status"] != SHARD_COMPLETED]
+    manifest = {
+        "job_id": job_id,
+        "requested_by": job["user"],
+        "users": job["users"],
+        "from_date": job.get("from_date") or None,
+        "to_date": job.get("to_date") or None,
+        "format": job["format"],
+        "generated": str(now_datetime()),
+        "total_messages": sum(cint(shard.get("processed")) for shard in shards if shard["status"] == SHARD_COMPLETED),
+        "failed_rooms": failed,
+        "shards": [
+            {
+                "room_id": shard["room_id"],
+                "room_name": room_names.get(shard["room_id"]),
+                "status": shard["status"],
+                "message_count": cint(shard.get("processed")),
+                "file_url": shard.get("file_url"),
+                "file_size": shard.get("file_size"),
+                "md5": shard.get("content_hash"),
+                "error": shard.get("error"),
+            }
+            for shard in shards
+        ]
+    }
+
+    file_name = f"compliance_{job_id[:8]}_manifest_{now_datetime().strftime('%Y%m%d_%H%M%S')}.json"
+    path = frappe.get_site_path("private", "files", file_name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, default=str)
+
+    file_doc = create_export_file(path, file_name)
+    frappe.db.commit()
+
+    _update_job(
+        job_id,
+        status="Partial" if failed else "Completed",
+        processed=manifest["total_messages"],
+        manifest_url=file_doc.file_url,
+        completed=str(now_datetime())
+    )
+
+
+def get_status(job_id):
+    """
+    Job fields plus per-shard counts
+
+    Returns:
+        dict: Job state with shard status counts and failed rooms, or None
+    """
+    job = get_job(job_id)
+    if not job:
+        return None
+
+    shards = get_shards(job_id)
+    counts = dict.fromkeys((SHARD_QUEUED, SHARD_RUNNING, SHARD_COMPLETED, SHARD_FAILED), 0)
+    for shard in shards.values():
+        counts[shard["status"]] = counts.get(shard["status"], 0) + 1
+
+    job["shards"] = counts
+    job["messages_written"] = sum(cint(shard.get("processed")) for shard in shards.values())
+    job["failed_rooms"] = sorted(
+        room_id for room_id, shard in shards.items() if shard["status"] == SHARD_FAILED
+    )
+    return job
+
+
+def _publish_progress(job_id):
+    job = get_status(job_id)
+    if job:
+        frappe.publish_realtime(event="chat_compliance_export_progress", message=job, user=job["user"])
+
+
+# Whitelisted endpoints
+
+@frappe.whitelist()
+def export_user_conversations(users, from_date=None, to_date=None, format_type="ndjson"):
+    """
+    Admin-only export of every conversation some users took part in
+
+    Args:
+        users (list|str): User IDs (JSON list or comma separated)
+        from_date (str): Earliest timestamp
+        to_date (str): Latest timestamp
+        format_type (str): csv or ndjson
+
+    Returns:
+        dict: Queued job with its shard counts
+    """
+    try:
+        _check_admin()
+
+        if isinstance(users, str):
+            users = json.loads(users) if users.strip().startswith("[") else users.split(",")
+        users = sorted({user.strip() for user in users if user and user.strip()})
+
+        job = start_compliance_export(users, from_date, to_date, format_type)
+
+        return {
+            "success": True,
+            "data": job
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error in export_user_conversations: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def get_compliance_export_status(job_id):
+    """
+    Progress of a compliance export
+
+    Args:
+        job_id (str): Compliance export job ID
+
+    Returns:
+        dict: Job state, shard counts and manifest URL once merged
+    """
+    try:
+        _check_admin()
+
+        job = get_status(job_id)
+        if not job:
+            frappe.throw("Export job not found or expired")
+
+        return {
+            "success": True,
+            "data": job
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error in get_compliance_export_status: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def retry_compliance_export(job_id):
+    """
+    Re-run the shards of a compliance export that failed or were lost
+
+    Args:
+        job_id (str): Compliance export job ID
+
+    Returns:
+        dict: Job state after re-queueing
+    """
+    try:
+        _check_admin()
+
+        job = restart_compliance_export(job_id)
+        if not job:
+            frappe.throw("Export job not found or expired")
+
+        return {
+            "success": True,
+            "data": job
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error in retry_compliance_export: {str(e)}")
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,178 @@
+# f_chat/APIs/notification_chatroom/chat_apis/engagement_sketches.py
+# Per-room, per-day HyperLogLog sketches of active senders and readers
+#
+# Layout (all keys site-scoped):
+#   chat_room_hll:senders:{room}:{date}   HLL  users who posted in the room that day
+#   chat_room_hll:readers:{room}:{date}   HLL  users who read the room that day
+#
+# A distinct count over any range is one PFCOUNT across that range's day
+# keys (Redis merges the sketches on the fly), so 90 days of distinct users
+# costs one call over 90 keys of at most 12 KB each instead of a
+# COUNT(DISTINCT) over the messages. Counts carry HyperLogLog's ~0.81%
+# standard error. Keys expire SKETCH_RETENTION_DAYS after their day.
+
+from datetime import timedelta
+
+import frappe
+from frappe.utils import add_days, get_datetime, getdate, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    make_key,
+    pipeline,
+)
+
+SENDERS = "senders"
+READERS = "readers"
+SKETCH_RETENTION_DAYS = 400  # a year of history plus room for year-over-year ranges
+BACKFILL_BATCH = 1000  # room-days per pipeline round trip
+
+
+def sketch_key(kind, room_id, day):
+    return make_key("chat_room_hll", kind, room_id, day)
+
+
+def _expire_at(day):
+    return int(get_datetime(add_days(day, SKETCH_RETENTION_DAYS + 1)).timestamp())
+
+
+def add_users(kind, room_id, day, users, pipe=None):
+    """
+    Add users to one room's sketch for a day
+
+    Args:
+        kind (str): SENDERS or READERS
+        room_id (str): Chat Room ID
+        day (date): Day of the activity
+        users (iterable): User IDs
+        pipe: Pipeline to queue on (executed here if not given)
+    """
+    users = [user for user in users if user]
+    if not users:
+        return
+
+    own_pipe = pipe is None
+    if own_pipe:
+        pipe = pipeline()
+    key = sketch_key(kind, room_id, getdate(day))
+    pipe.pfadd(key, *users)
+    pipe.expireat(key, _expire_at(getdate(day)))
+    if own_pipe:
+        pipe.execute()
+
+
+def _days(from_date, to_date):
+    day, last = getdate(from_date), getdate(to_date)
+    days = []
+    while day <= last:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def count_distinct(room_ids, kind, from_date, to_date):
+    """
+    Approximate distinct users over a date range
+
+    Args:
+        room_ids (str|list): One room, or several to count across
+        kind (str): SENDERS or READERS
+        from_date (date): First day (inclusive)
+        to_date (date): Last day (inclusive)
+
+    Returns:
+        int: Estimated distinct users
+    """
+    if isinstance(room_ids, str):
+        room_ids = [room_ids]
+
+    keys = [sketch_key(kind, room_id, day) for room_id in room_ids for day in _days(from_date, to_date)]
+    if not keys:
+        return 0
+
+    pipe = pipeline()
+    pipe.pfcount(*keys)
+    return pipe.execute()[0]
+
+
+def daily_counts(room_id, kind, from_date, to_date):
+    """
+    Approximate distinct users per day
+
+    Returns:
+        dict: "YYYY-MM-DD" -> estimated distinct users
+    """
+    days = _days(from_date, to_date)
+
+    pipe = pipeline()
+    for day in days:
+        pipe.pfcount(sketch_key(kind, room_id, day))
+    return {str(day): count for day, count in zip(days, pipe.execute(), strict=True)}
+
+
+def record_reader(room_id, user, when=None):
+    """Count a user as a reader of the room today (called wherever last-read is updated)"""
+    try:
+        add_users(READERS, room_id, when or now_datetime(), [user])
+    except Exception as e:
+        frappe.log_error(f"Error recording reader {user} for room {room_id}: {str(e)}")
+
+
+def backfill_sketches(since=None):
+    """
+    Rebuild sender sketches from Chat Message and seed reader sketches from
+    last-read timestamps (earlier reads were never recorded)
+
+    Senders are read one room at a time on the (chat_room, timestamp) index,
+    so no single query spans the whole retention window of every room.
+
+    Args:
+        since (date): First day to backfill (defaults to the retention window)
+
+    Returns:
+        tuple: (room/day senders added, last reads added)
+    """
+    since = getdate(since or add_days(now_datetime(), -SKETCH_RETENTION_DAYS))
+
+    senders = 0
+    for room_id in frappe.get_all("Chat Room", pluck="name"):
+        rows = frappe.db.sql("""
+            SELECT DISTINCT DATE(timestamp), sender
+            FROM `tabChat Message`
+            WHERE chat_room = %(room_id)s AND timestamp >= %(since)s AND sender IS NOT NULL
+        """, {"room_id": room_id, "since": since})
+        _add_grouped(SENDERS, ((room_id, day, user) for day, user in rows))
+        senders += len(rows)
+
+    readers = frappe.db.sql("""
+        SELECT parent, DATE(last_read_timestamp), user
+        FROM `tabChat Room Member`
+        WHERE parenttype = 'Chat Room' AND last_read_timestamp >= %(since)s
+    """, {"since": since})
+    _add_grouped(READERS, readers)
+
+    return senders, len(readers)
+
+
+def _add_grouped(kind, rows):
+    """Add (room, day, user) rows to their sketches, BACKFILL_BATCH room-days per round trip"""
+    grouped = {}
+    for room_id, day, user in rows:
+        grouped.setdefault((room_id, day), []).append(user)
+
+    pipe = pipeline()
+    for count, ((room_id, day), users) in enumerate(grouped.items(), 1):
+        add_users(kind, room_id, day, users, pipe)
+        if count % BACKFILL_BATCH == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+# Document event hook
+
+def record_sender(doc, method=None):
+    """Chat Message after_insert hook"""
+    try:
+        if doc.sender and not doc.is_deleted:
+            add_users(SENDERS, doc.chat_room, doc.timestamp or now_datetime(), [doc.sender])
+    except Exception as e:
+        frappe.log_error(f"Error recording sender for message {doc.name}: {str(e)}")
@@ -0,0 +1,246 @@
+# f_chat/APIs/notification_chatroom/chat_apis/membership_index.py
+# Redis index of room membership (user -> rooms, room -> users)
+#
+# Both directions are plain Redis sets so callers can resolve a user's rooms,
+# a room's roster or the union/intersection of several rosters without
+# touching `tabChat Room Member`. Sets are built lazily from the database and
+# kept up to date from the Chat Room hooks.
+
+import frappe
+
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode_set,
+    make_key,
+    pipeline,
+)
+
+USER_ROOMS_PREFIX = "chat_user_rooms"
+ROOM_MEMBERS_PREFIX = "chat_room_members"
+
+# Sentinel member marking a set as built, so an empty index is not mistaken
+# for a missing one and rebuilt on every read
+LOADED_MARKER = "__loaded__"
+
+# Safety net: a set that drifted (e.g. a rolled back transaction) heals itself
+INDEX_EXPIRY = 86400  # 24 hours
+
+
+def user_rooms_key(user):
+    return make_key(USER_ROOMS_PREFIX, user)
+
+
+def room_members_key(room_id):
+    return make_key(ROOM_MEMBERS_PREFIX, room_id)
+
+
+def get_user_rooms(user):
+    """
+    Get the rooms a user belongs to
+
+    Args:
+        user (str): User ID
+
+    Returns:
+        set: Chat Room IDs
+    """
+    key = user_rooms_key(user)
+    pipe = pipeline()
+    pipe.smembers(key)
+    members = decode_set(pipe.execute()[0])
+
+    if LOADED_MARKER not in members:
+        members = _build_user_rooms(user)
+
+    members.discard(LOADED_MARKER)
+    return members
+
+
+def get_room_members(room_id):
+    """
+    Get the members of a room
+
+    Args:
+        room_id (str): Chat Room ID
+
+    Returns:
+        set: User IDs
+    """
+    return get_rooms_members([room_id]).get(room_id, set())
+
+
+def get_rooms_members(room_ids):
+    """
+    Get the members of several rooms in one round trip
+
+    Missing room sets are built with a single query.
+
+    Args:
+        room_ids (iterable): Chat Room IDs
+
+    Returns:
+        dict: room_id -> set of User IDs
+    """
+    room_ids = list(room_ids)
+    if not room_ids:
+        return {}
+
+    pipe = pipeline()
+    for room_id in room_ids:
+        pipe.smembers(room_members_key(room_id))
+    replies = pipe.execute()
+
+    rosters = {}
+    missing = []
+    for room_id, reply in zip(room_ids, replies, strict=True):
+        members = decode_set(reply)
+        if LOADED_MARKER in members:
+            members.discard(LOADED_MARKER)
+            rosters[room_id] = members
+        else:
+            missing.append(room_id)
+
+    if missing:
+        rosters.update(_build_room_members(missing))
+
+    return rosters
+
+
+def is_member(room_id, user):
+    """Check room membership from the index"""
+    return user in get_room_members(room_id)
+
+
+def get_user_peers(user):
+    """
+    Get every user who shares at least one room with the given user
+
+    Args:
+        user (str): User ID
+
+    Returns:
+        set: User IDs (the user is excluded)
+    """
+    peers = set()
+    for members in get_rooms_members(get_user_rooms(user)).values():
+        peers |= members
+
+    peers.discard(user)
+    return peers
+
+
+def index_room(room_id, members, previous_members=None):
+    """
+    Replace the indexed roster of a room
+
+    Args:
+        room_id (str): Chat Room ID
+        members (iterable): Current member User IDs
+        previous_members (iterable): Members before the change, if known
+    """
+    members = set(members)
+    removed = set(previous_members or ()) | _indexed_room_members(room_id)
+    removed -= members
+
+    room_key = room_members_key(room_id)
+    pipe = pipeline(transaction=True)
+    pipe.delete(room_key)
+    pipe.sadd(room_key, LOADED_MARKER, *members)
+    pipe.expire(room_key, INDEX_EXPIRY)
+
+    for user in members:
+        pipe.sadd(user_rooms_key(user), room_id)
+    for user in removed:
+        pipe.srem(user_rooms_key(user), room_id)
+
+    pipe.execute()
+
+
+def remove_room(room_id):
+    """Drop a room from the index"""
+    pipe = pipeline(transaction=True)
+    for user in _indexed_room_members(room_id):
+        pipe.srem(user_rooms_key(user), room_id)
+    pipe.delete(room_members_key(room_id))
+    pipe.execute()
+
+
+def remove_user(user):
+    """Drop a user from every indexed room"""
+    rooms = get_user_rooms(user)
+
+    pipe = pipeline(transaction=True)
+    for room_id in rooms:
+        pipe.srem(room_members_key(room_id), user)
+    pipe.delete(user_rooms_key(user))
+    pipe.execute()
+
+
+def _indexed_room_members(room_id):
+    """Members currently held in Redis for a room (empty if not built)"""
+    pipe = pipeline()
+    pipe.smembers(room_members_key(room_id))
+    members = decode_set(pipe.execute()[0])
+    members.discard(LOADED_MARKER)
+    return members
+
+
+def _build_user_rooms(user):
+    rooms = set(frappe.db.sql_list("""
+        SELECT parent
+        FROM `tabChat Room Member`
+        WHERE user = %s AND parenttype = 'Chat Room'
+    """, (user,)))
+
+    key = user_rooms_key(user)
+    pipe = pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.sadd(key, LOADED_MARKER, *rooms)
+    pipe.expire(key, INDEX_EXPIRY)
+    pipe.execute()
+
+    return rooms
+
+
+def _build_room_members(room_ids):
+    rosters = {room_id: set() for room_id in room_ids}
+
+    rows = frappe.db.sql("""
+        SELECT parent, user
+        FROM `tabChat Room Member`
+        WHERE parent IN %(rooms)s AND parenttype = 'Chat Room'
+    """, {"rooms": tuple(room_ids)})
+
+    for room_id, user in rows:
+        rosters[room_id].add(user)
+
+    pipe = pipeline(transaction=True)
+    for room_id, members in rosters.items():
+        key = room_members_key(room_id)
+        pipe.delete(key)
+        pipe.sadd(key, LOADED_MARKER, *members)
+        pipe.expire(key, INDEX_EXPIRY)
+    pipe.execute()
+
+    return rosters
+
+
+# Document event hooks
+
+def update_room_index(doc, method=None):
+    """Chat Room on_update hook: re-index the room's roster"""
+    try:
+        before = doc.get_doc_before_save()
+        previous_members = [member.user for member in before.members] if before else None
+
+        index_room(doc.name, [member.user for member in doc.members], previous_members)
+
+    except Exception as e:
+        frappe.log_error(f"Error updating membership index for room {doc.name}: {str(e)}")
+
+
+def remove_room_index(doc, method=None):
+    """Chat Room on_trash hook"""
+    try:
+        remove_room(doc.name)
+    except Exception as e:
+        frappe.log_error(f"Error removing room {doc.name} from membership index: {str(e)}")
@@ -0,0 +1,389 @@
+# f_chat/APIs/notification_chatroom/chat_apis/message_export.py
+# Background export of a room's messages to a private, gzip-compressed File
+#
+# Messages are read in keyset chunks over the (chat_room, timestamp, name)
+# index of both Chat Message and Chat Message Archive, merged in timestamp
+# order, hydrated with one query per chunk for attachments, reactions and
+# sender names (archived rows carry theirs in the payload), and written
+# straight into a gzip stream on disk. Only one chunk is ever held in
+# memory. Job state lives in a Redis hash:
+#   chat_export:{job}   HASH  status, processed, total, file_url, error, ...
+
+import csv
+import gzip
+import hashlib
+import json
+import os
+import uuid
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    make_key,
+    pipeline,
+)
+from f_chat.f_chat.doctype.chat_message_archive.chat_message_archive import unpack_payload
+
+CHUNK_SIZE = 1000
+JOB_EXPIRY = 86400  # job state is kept for a day after the last update
+FORMATS = ("csv", "ndjson")
+
+CSV_HEADER = [
+    "Timestamp", "Sender", "Sender Name", "Message Type",
+    "Message Content", "Is Edited", "Edit Timestamp", "Attachments", "Reactions"
+]
+
+
+def _job_key(job_id):
+    return make_key("chat_export", job_id)
+
+
+def _update_job(job_id, **fields):
+    pipe = pipeline(transaction=True)
+    pipe.hset(_job_key(job_id), mapping={
+        field: "" if value is None else value for field, value in fields.items()
+    })
+    pipe.expire(_job_key(job_id), JOB_EXPIRY)
+    pipe.execute()
+
+
+def get_job(job_id):
+    """
+    Get an export job's state
+
+    Returns:
+        dict: Job fields, or None if unknown or expired
+    """
+    pipe = pipeline()
+    pipe.hgetall(_job_key(job_id))
+    job = pipe.execute()[0]
+    if not job:
+        return None
+
+    job = {decode(field): decode(value) for field, value in job.items()}
+    for field in ("processed", "total"):
+        job[field] = cint(job.get(field))
+    return job
+
+
+def estimate_message_count(room_id, from_date=None, to_date=None):
+    """Approximate export size from the daily activity rollups"""
+    conditions = ["chat_room = %(room_id)s", "granularity = 'Day'"]
+    values = {"room_id": room_id}
+    if from_date:
+        conditions.append("period_start >= DATE(%(from_date)s)")
+        values["from_date"] = from_date
+    if to_date:
+        conditions.append("period_start <= %(to_date)s")
+        values["to_date"] = to_date
+
+    return cint(frappe.db.sql(f"""
+        SELECT SUM(message_count)
+        FROM `tabChat Activity Rollup`
+        WHERE {" AND ".join(conditions)}
+    """, values)[0][0])
+
+
+def start_export(room_id, user, from_date=None, to_date=None, format_type="csv"):
+    """
+    Queue an export of a room's messages
+
+    Args:
+        room_id (str): Chat Room ID
+        user (str): Requesting user (owns the resulting File)
+        from_date (datetime): Earliest timestamp
+        to_date (datetime): Latest timestamp
+        format_type (str): csv or ndjson
+
+    Returns:
+        dict: Job state
+    """
+    if format_type not in FORMATS:
+        frappe.throw(f"Unsupported export format: {format_type}")
+
+    job_id = uuid.uuid4().hex
+    _update_job(
+        job_id,
+        job_id=job_id,
+        room_id=room_id,
+        user=user,
+        format=format_type,
+        from_date=str(from_date) if from_date else None,
+        to_date=str(to_date) if to_date else None,
+        status="Queued",
+        processed=0,
+        total=estimate_message_count(room_id, from_date, to_date),
+        created=str(now_datetime())
+    )
+
+    frappe.enqueue(
+        "f_chat.APIs.notification_chatroom.chat_apis.message_export.run_export",
+        queue="long",
+        timeout=3600,
+        export_id=job_id
+    )
+
+    return get_job(job_id)
+
+
+def iter_message_chunks(room_id, from_date=None, to_date=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield a room's messages oldest first, one hydrated chunk at a time
+
+    Each chunk is a fresh index seek after the last (timestamp, name) seen in
+    both the live table and the archive, so no cursor stays open while the
+    chunk is hydrated and written, and archived messages are not left out.
+    """
+    conditions = ["chat_room = %(room_id)s", "is_deleted = 0"]
+    values = {"room_id": room_id, "limit": chunk_size}
+    if from_date:
+        conditions.append("timestamp >= %(from_date)s")
+        values["from_date"] = get_datetime(from_date)
+    if to_date:
+        conditions.append("timestamp <= %(to_date)s")
+        values["to_date"] = get_datetime(to_date)
+
+    user_names = {}
+    position = None
+    while True:
+        seek = ""
+        if position:
+            seek = "AND (timestamp > %(last_timestamp)s OR (timestamp = %(last_timestamp)s AND name > %(last_name)s))"
+            values["last_timestamp"], values["last_name"] = position
+
+        live = frappe.db.sql(f"""
+            SELECT name, sender, message_type, message_content, timestamp, is_edited, edit_timestamp
+            FROM `tabChat Message`
+            WHERE {" AND ".join(conditions)} {seek}
+            ORDER BY timestamp ASC, name ASC
+            LIMIT %(limit)s
+        """, values, as_dict=True)
+        archived = frappe.db.sql(f"""
+            SELECT name, sender, message_type, payload, timestamp, is_edited, edit_timestamp
+            FROM `tabChat Message Archive`
+            WHERE {" AND ".join(conditions)} {seek}
+            ORDER BY timestamp ASC, name ASC
+            LIMIT %(limit)s
+        """, values, as_dict=True)
+
+        messages = sorted(
+            live + [_from_archive(row) for row in archived],
+            key=lambda message: (message.timestamp, message.name)
+        )
+        if not messages:
+            return
+
+        last_chunk = len(messages) <= chunk_size
+        messages = messages[:chunk_size]
+
+        position = (messages[-1].timestamp, messages[-1].name)
+        hydrate_messages(messages, user_names)
+        yield messages
+
+        if last_chunk:
+            return
+
+
+def _from_archive(row):
+    """Archive row in the live row's shape, with attachments and reactions from its payload"""
+    payload = unpack_payload(row.pop("payload"))
+    row["message_content"] = payload["message_content"]
+    row["archived_attachments"] = [frappe._dict(attachment) for attachment in payload["attachments"]]
+    row["archived_reactions"] = [frappe._dict(reaction) for reaction in payload["reactions"]]
+    return row
+
+
+def hydrate_messages(messages, user_names):
+    """
+    Attach attachments, reactions and sender names to a chunk with one query each
+
+    Args:
+        messages (list): Chunk of message rows
+        user_names (dict): user -> full name, shared across chunks
+    """
+    names = [message.name for message in messages if "archived_attachments" not in message]
+
+    attachments = {}
+    reactions = {}
+    if names:
+        for attachment in frappe.db.sql("""
+            SELECT parent, file_name, file_url, file_type, file_size
+            FROM `tabChat Message Attachment`
+            WHERE parent IN %(names)s AND parenttype = 'Chat Message'
+            ORDER BY idx
+        """, {"names": tuple(names)}, as_dict=True):
+            attachments.setdefault(attachment.pop("parent"), []).append(attachment)
+
+        for reaction in frappe.db.sql("""
+            SELECT parent, user, reaction_emoji, timestamp
+            FROM `tabChat Message Reaction`
+            WHERE parent IN %(names)s AND parenttype = 'Chat Message'
+            ORDER BY idx
+        """, {"names": tuple(names)}, as_dict=True):
+            reaction["timestamp"] = str(reaction.timestamp) if reaction.timestamp else None
+            reactions.setdefault(reaction.pop("parent"), []).append(reaction)
+
+    missing = {message.sender for message in messages if message.sender not in user_names}
+    if missing:
+        user_names.update(frappe.db.sql("""
+            SELECT name, full_name FROM `tabUser` WHERE name IN %(users)s
+        """, {"users": tuple(missing)}))
+
+    for message in messages:
+        message["sender_name"] = user_names.get(message.sender)
+        if "archived_attachments" in message:
+            message["attachments"] = message.pop("archived_attachments")
+            message["reactions"] = message.pop("archived_reactions")
+        else:
+            message["attachments"] = attachments.get(message.name, [])
+            message["reactions"] = reactions.get(message.name, [])
+        message["timestamp"] = str(message.timestamp)
+        if message.edit_timestamp:
+            message["edit_timestamp"] = str(message.edit_timestamp)
+
+
+class ExportWriter:
+    """Write hydrated message chunks as CSV or NDJSON into a text stream"""
+
+    def __init__(self, stream, format_type):
+        self.stream = stream
+        self.format_type = format_type
+        if format_type == "csv":
+            self.csv = csv.writer(stream)
+            self.csv.writerow(CSV_HEADER)
+
+    def write(self, messages):
+        for message in messages:
+            if self.format_type == "csv":
+                self.csv.writerow([
+                    message.timestamp,
+                    message.sender,
+                    message.sender_name or "",
+                    message.message_type,
+                    message.message_content or "",
+                    message.is_edited,
+                    message.edit_timestamp or "",
+                    "; ".join(attachment.file_name or "" for attachment in message.attachments),
+                    "; ".join(f"{reaction.user}:{reaction.reaction_emoji}" for reaction in message.reactions)
+                ])
+            else:
+                self.stream.write(json.dumps(message, default=str) + "\n")
+
+
+def create_export_file(path, file_name, attached_to_doctype=None, attached_to_name=None):
+    """
+    Register a file already written under private/files as a File document
+
+    The content hash is computed by streaming the file so it is never read
+    into memory at once.
+    """
+    content_hash = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            content_hash.update(block)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "is_private": 1,
+        "file_size": os.path.getsize(path),
+        "content_hash": content_hash.hexdigest(),
+        "attached_to_doctype": attached_to_doctype,
+        "attached_to_name": attached_to_name
+    })
+    file_doc.insert(ignore_permissions=True)
+    return file_doc
+
+
+def write_room_export(room_id, file_name, from_date=None, to_date=None, format_type="csv", on_chunk=None,
+                      attached_to_doctype=None, attached_to_name=None):
+    """
+    Stream a room's messages into a gzip file under private/files and register it
+
+    Args:
+        room_id (str): Chat Room ID
+        file_name (str): Name of the File to create
+        from_date (datetime): Earliest timestamp
+        to_date (datetime): Latest timestamp
+        format_type (str): csv or ndjson
+        on_chunk (callable): Called with the running message count after each chunk
+        attached_to_doctype (str): Doctype the File is attached to (None keeps it
+            unattached, visible only to its owner and System Managers)
+        attached_to_name (str): Document the File is attached to
+
+    Returns:
+        tuple: (File document, messages written)
+    """
+    path = frappe.get_site_path("private", "files", file_name)
+
+    try:
+        processed = 0
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as stream:
+            writer = ExportWriter(stream, format_type)
+            for messages in iter_message_chunks(room_id, from_date, to_date):
+                writer.write(messages)
+                processed += len(messages)
+                if on_chunk:
+                    on_chunk(processed)
+
+        file_doc = create_export_file(path, file_name, attached_to_doctype, attached_to_name)
+        frappe.db.commit()
+        return file_doc, processed
+
+    except Exception:
+        frappe.db.rollback()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def run_export(export_id):
+    """
+    Background job: stream a room's messages into a gzip File
+
+    (The argument is not called job_id because frappe.enqueue reserves that name.)
+    """
+    job_id = export_id
+    job = get_job(job_id)
+    if not job:
+        return
+
+    room_id = job["room_id"]
+    format_type = job["format"]
+    file_name = f"chat_export_{room_id}_{now_datetime().strftime('%Y%m%d_%H%M%S')}_{job_id[:8]}.{format_type}.gz"
+
+    def on_chunk(processed):
+        _update_job(job_id, processed=processed)
+        _publish_progress(job_id)
+
+    try:
+        _update_job(job_id, status="Running", started=str(now_datetime()))
+
+        file_doc, processed = write_room_export(
+            room_id, file_name, job.get("from_date"), job.get("to_date"), format_type, on_chunk,
+            attached_to_doctype="Chat Room", attached_to_name=room_id
+        )
+
+        _update_job(
+            job_id,
+            status="Completed",
+            processed=processed,
+            file_name=file_name,
+            file_url=file_doc.file_url,
+            completed=str(now_datetime())
+        )
+
+    except Exception as e:
+        _update_job(job_id, status="Failed", error=str(e))
+        frappe.log_error(f"Error in chat export {job_id}: {str(e)}")
+
+    _publish_progress(job_id)
+
+
+def _publish_progress(job_id):
+    job = get_job(job_id)
+    if job:
+        frappe.publish_realtime(event="chat_export_progress", message=job, user=job["user"])
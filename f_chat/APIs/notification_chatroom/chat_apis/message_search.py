@@ -0,0 +1,472 @@
+# f_chat/APIs/notification_chatroom/chat_apis/message_search.py
+# Full-text message search backed by a FULLTEXT index on Chat Message
+#
+# Search terms are compiled into a BOOLEAN MODE query: every word is required
+# (prefix matched) and "quoted phrases" must appear verbatim. Room membership
+# is enforced by joining Chat Room Member inside the same statement, so no
+# room list is ever built in Python. Words shorter than the index's minimum
+# token size are not indexed: next to indexed words each one becomes a LIKE
+# on the rows MATCH keeps, and a search made only of such words falls back to
+# one LIKE, still restricted to the user's rooms. The same fallback serves
+# every search when the index is absent (a partitioned message table cannot
+# have one).
+#
+# Highlights are found afterwards with Python regexes over the returned
+# content (find_highlights); the index reports no match offsets.
+#
+# Facets reuse the search's WHERE clause: each one is its own GROUP BY
+# keeping the top FACET_SIZE values, cached briefly per refinement. They need
+# a term or a filter, so nothing ever aggregates a user's whole history.
+
+import hashlib
+import html
+import json
+import re
+from datetime import datetime
+
+import frappe
+from frappe.utils import add_months
+
+FULLTEXT_INDEX = "message_content_fulltext"
+MIN_TOKEN_SIZE = 3  # innodb_ft_min_token_size default
+SNIPPET_RADIUS = 60  # characters of context kept on each side of the first hit
+FACET_CACHE_TTL = 120  # seconds a refinement's facet counts are reused
+INDEX_CACHE_TTL = 3600
+FACET_SIZE = 10
+FACET_DIMENSIONS = ("chat_room", "sender", "message_type", "month")
+
+_FACET_EXPRESSIONS = {
+    "chat_room": "cm.chat_room",
+    "sender": "cm.sender",
+    "message_type": "cm.message_type",
+    "month": "DATE_FORMAT(cm.timestamp, '%%Y-%%m')",
+}
+
+# Every search is confined to rooms the user belongs to
+_FROM = """
+    FROM `tabChat Message` cm
+    INNER JOIN `tabChat Room Member` crm
+        ON crm.parent = cm.chat_room
+        AND crm.parenttype = 'Chat Room'
+        AND crm.user = %(user)s
+"""
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_fulltext_index():
+    """Create the FULLTEXT index on message content if it is missing (not possible once partitioned)"""
+    from f_chat.f_chat.partitioning import is_partitioned
+
+    if frappe.db.has_index("tabChat Message", FULLTEXT_INDEX) or is_partitioned():
+        return False
+
+    frappe.db.sql_ddl(f"""
+        ALTER TABLE `tabChat Message`
+        ADD FULLTEXT INDEX `{FULLTEXT_INDEX}` (message_content)
+    """)
+    frappe.cache().delete_value("chat_message_fulltext_index")
+    return True
+
+
+def has_fulltext_index():
+    """Whether MATCH queries can be used (cached, the index changes only on migrate)"""
+    cached = frappe.cache().get_value("chat_message_fulltext_index")
+    if cached is None:
+        cached = 1 if frappe.db.has_index("tabChat Message", FULLTEXT_INDEX) else 0
+        frappe.cache().set_value("chat_message_fulltext_index", cached, expires_in_sec=INDEX_CACHE_TTL)
+    return bool(cached)
+
+
+def parse_search_term(search_term):
+    """
+    Split a search string into words and quoted phrases
+
+    Boolean operators typed by the user are dropped; only word characters
+    survive, so the compiled query cannot be tampered with.
+
+    Args:
+        search_term (str): Raw search input
+
+    Returns:
+        list: (words, is_phrase) tuples, where words is a list of str
+    """
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(search_term or ""):
+        if phrase:
+            words = _WORD_RE.findall(phrase)
+            if words:
+                terms.append((words, len(words) > 1))
+        else:
+            terms.extend(([token], False) for token in _WORD_RE.findall(word))
+
+    return terms
+
+
+def indexed_terms(terms):
+    """Keep the terms the index can serve (at least one word of MIN_TOKEN_SIZE)"""
+    return [
+        (words, is_phrase) for words, is_phrase in terms
+        if any(len(word) >= MIN_TOKEN_SIZE for word in words)
+    ]
+
+
+def build_boolean_query(terms):
+    """
+    Compile parsed terms into a MATCH ... AGAINST boolean query
+
+    Returns:
+        str: Boolean query, or "" if no term can be served by the index
+    """
+    clauses = []
+    for words, is_phrase in indexed_terms(terms):
+        if is_phrase:
+            clauses.append('+"{0}"'.format(" ".join(words)))
+        else:
+            clauses.append(f"+{words[0]}*")
+
+    return " ".join(clauses)
+
+
+def _compile(user, search_term=None, room_id=None, from_date=None, to_date=None):
+    """
+    Build the part of a search that every refinement shares
+
+    Returns:
+        dict: {terms, fingerprint, conditions, values, score, ranked}
+    """
+    terms = parse_search_term(search_term)
+    boolean_query = build_boolean_query(terms) if has_fulltext_index() else ""
+
+    conditions = ["cm.is_deleted = 0"]
+    values = {"user": user}
+    short_patterns = []
+
+    if boolean_query:
+        match = "MATCH(cm.message_content) AGAINST (%(query)s IN BOOLEAN MODE)"
+        conditions.append(match)
+        values["query"] = boolean_query
+        score = match
+
+        # Terms the index cannot serve are still required, checked with LIKE
+        indexed = indexed_terms(terms)
+        short_patterns = [
+            f"%{_escape_like(' '.join(words))}%" for words, is_phrase in terms
+            if (words, is_phrase) not in indexed
+        ]
+        for index, pattern in enumerate(short_patterns):
+            conditions.append(f"cm.message_content LIKE %(short_{index})s")
+            values[f"short_{index}"] = pattern
+    else:
+        score = "0"
+        if search_term and search_term.strip():
+            conditions.append("cm.message_content LIKE %(like)s")
+            values["like"] = f"%{_escape_like(search_term.strip())}%"
+
+    if room_id:
+        conditions.append("cm.chat_room = %(room_id)s")
+        values["room_id"] = room_id
+
+    if from_date:
+        conditions.append("cm.timestamp >= %(from_date)s")
+        values["from_date"] = from_date
+
+    if to_date:
+        conditions.append("cm.timestamp <= %(to_date)s")
+        values["to_date"] = to_date
+
+    fingerprint = hashlib.sha1(json.dumps(
+        [user, boolean_query, short_patterns, values.get("like"), room_id, str(from_date or ""), str(to_date or "")]
+    ).encode()).hexdigest()
+
+    return {
+        "terms": terms,
+        "fingerprint": fingerprint,
+        "conditions": conditions,
+        "values": values,
+        "score": score,
+        "ranked": bool(boolean_query),
+    }
+
+
+def _month_bounds(month):
+    """Return [start, end) datetimes of a YYYY-MM bucket"""
+    start = datetime.strptime(month, "%Y-%m")
+    end = add_months(start, 1)
+    return start, end
+
+
+def _refine(query, selected):
+    """
+    Narrow a compiled search to selected facet values
+
+    Args:
+        query (dict): Result of _compile
+        selected (dict): Values keyed by chat_room, sender, message_type, month
+
+    Returns:
+        tuple: (conditions, values) for the WHERE clause
+    """
+    conditions = list(query["conditions"])
+    values = dict(query["values"])
+
+    for dimension in FACET_DIMENSIONS:
+        value = selected.get(dimension)
+        if not value:
+            continue
+
+        if dimension == "month":
+            values["month_start"], values["month_end"] = _month_bounds(value)
+            conditions.append("cm.timestamp >= %(month_start)s AND cm.timestamp < %(month_end)s")
+        else:
+            conditions.append(f"{_FACET_EXPRESSIONS[dimension]} = %(facet_{dimension})s")
+            values[f"facet_{dimension}"] = value
+
+    return conditions, values
+
+
+def search(user, search_term=None, room_id=None, message_type=None, from_date=None,
+           to_date=None, sender=None, sort="relevance", limit=20, offset=0, month=None):
+    """
+    Search the messages a user can see
+
+    Args:
+        user (str): Searching user; only rooms they belong to are searched
+        search_term (str): Words and "quoted phrases"; optional when filtering
+        room_id (str): Restrict to one room
+        message_type (str): Filter by message type
+        from_date (datetime): Earliest timestamp
+        to_date (datetime): Latest timestamp
+        sender (str): Filter by sender
+        sort (str): relevance or recent
+        limit (int): Page size
+        offset (int): Rows to skip
+        month (str): Restrict to a YYYY-MM bucket
+
+    Returns:
+        tuple: (rows, has_next, terms) where terms are the ones highlighted
+    """
+    query = _compile(user, search_term, room_id=room_id, from_date=from_date, to_date=to_date)
+    conditions, values = _refine(query, {"message_type": message_type, "sender": sender, "month": month})
+    values.update(limit=limit + 1, offset=offset)
+
+    if sort == "relevance" and query["ranked"]:
+        order_by = "score DESC, cm.timestamp DESC"
+    else:
+        order_by = "cm.timestamp DESC"
+
+    rows = frappe.db.sql(f"""
+        SELECT
+            cm.name,
+            cm.chat_room,
+            cm.sender,
+            cm.message_type,
+            cm.message_content,
+            cm.timestamp,
+            cm.reply_to_message,
+            cr.room_name,
+            cr.room_type,
+            u.full_name AS sender_name,
+            u.user_image AS sender_image,
+            {query["score"]} AS score
+        {_FROM}
+        LEFT JOIN `tabChat Room` cr ON cr.name = cm.chat_room
+        LEFT JOIN `tabUser` u ON u.name = cm.sender
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {order_by}
+        LIMIT %(limit)s OFFSET %(offset)s
+    """, values, as_dict=True)
+
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    terms = query["terms"]
+    for row in rows:
+        add_highlights(row, terms)
+
+    return rows, has_next, terms
+
+
+def get_facets(user, search_term=None, room_id=None, from_date=None, to_date=None,
+               filters=None, size=FACET_SIZE):
+    """
+    Facet counts (rooms, senders, message types, months) for a search
+
+    Built on the same WHERE clause as search(). Each facet is counted with
+    every other selected filter applied but not its own, so the alternatives
+    stay visible while drilling down, and keeps only its top `size` values
+    (months: the most recent). Results are cached for FACET_CACHE_TTL.
+
+    Args:
+        user (str): Searching user
+        search_term (str): Words and "quoted phrases"
+        room_id (str): Room the search is scoped to (not a facet filter)
+        from_date (datetime): Earliest timestamp
+        to_date (datetime): Latest timestamp
+        filters (dict): Selected facet values keyed by chat_room, sender,
+            message_type, month
+        size (int): Entries kept per facet
+
+    Returns:
+        dict: {total, rooms, senders, message_types, months}, or None when
+            neither a term nor a filter narrows the search
+    """
+    selected = {
+        dimension: value for dimension, value in (filters or {}).items()
+        if value and dimension in FACET_DIMENSIONS
+    }
+    if not ((search_term and search_term.strip()) or room_id or from_date or to_date or selected):
+        return None
+
+    query = _compile(user, search_term, room_id=room_id, from_date=from_date, to_date=to_date)
+    cache_key = "chat_search_facets:{0}".format(hashlib.sha1(json.dumps(
+        [query["fingerprint"], sorted(selected.items()), size]
+    ).encode()).hexdigest())
+
+    facets = frappe.cache().get_value(cache_key)
+    if facets is not None:
+        return facets
+
+    conditions, values = _refine(query, selected)
+    total = frappe.db.sql(f"""
+        SELECT COUNT(*)
+        {_FROM}
+        WHERE {" AND ".join(conditions)}
+    """, values)[0][0]
+
+    counts = {}
+    for dimension, expression in _FACET_EXPRESSIONS.items():
+        conditions, values = _refine(query, {
+            other: value for other, value in selected.items() if other != dimension
+        })
+        order_by = "value DESC" if dimension == "month" else "count DESC, value"
+        counts[dimension] = [
+            {"value": value, "count": count}
+            for value, count in frappe.db.sql(f"""
+                SELECT {expression} AS value, COUNT(*) AS count
+                {_FROM}
+                WHERE {" AND ".join(conditions)}
+                GROUP BY value
+                ORDER BY {order_by}
+                LIMIT %(facet_size)s
+            """, dict(values, facet_size=size))
+        ]
+
+    _add_labels(counts["chat_room"], "Chat Room", "room_name")
+    _add_labels(counts["sender"], "User", "full_name")
+
+    facets = {
+        "total": total,
+        "rooms": counts["chat_room"],
+        "senders": counts["sender"],
+        "message_types": counts["message_type"],
+        "months": counts["month"],
+    }
+    frappe.cache().set_value(cache_key, facets, expires_in_sec=FACET_CACHE_TTL)
+
+    return facets
+
+
+def _add_labels(entries, doctype, field):
+    if not entries:
+        return
+
+    labels = dict(frappe.get_all(
+        doctype,
+        filters={"name": ["in", [entry["value"] for entry in entries]]},
+        fields=["name", field],
+        as_list=True
+    ))
+    for entry in entries:
+        entry["label"] = labels.get(entry["value"]) or entry["value"]
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def find_highlights(content, terms):
+    """
+    Locate every term in a message
+
+    Offsets come from these regexes, not from the index. Words match at a word boundary as a prefix (like the index query), phrases
+    match their words in order separated by non-word characters.
+
+    Returns:
+        list: Merged [start, end) character offsets, in order
+    """
+    if not content or not terms:
+        return []
+
+    patterns = []
+    for words, is_phrase in terms:
+        if is_phrase:
+            patterns.append(r"\b" + r"\W+".join(re.escape(word) for word in words) + r"\b")
+        else:
+            patterns.append(r"\b" + re.escape(words[0]) + r"\w*")
+
+    spans = sorted(
+        match.span()
+        for match in re.finditer("|".join(patterns), content, re.IGNORECASE | re.UNICODE)
+    )
+
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    return merged
+
+
+def make_snippet(content, highlights, radius=SNIPPET_RADIUS):
+    """
+    Cut a window of the message around its first hit
+
+    Returns:
+        dict: {text, start, highlights} with highlights relative to text
+    """
+    content = content or ""
+    if not highlights:
+        end = min(len(content), radius * 2)
+        return {"text": content[:end], "start": 0, "highlights": []}
+
+    start = max(0, highlights[0][0] - radius)
+    end = min(len(content), highlights[0][1] + radius)
+
+    return {
+        "text": content[start:end],
+        "start": start,
+        "highlights": [
+            [max(hit_start, start) - start, min(hit_end, end) - start]
+            for hit_start, hit_end in highlights
+            if hit_start < end and hit_end > start
+        ]
+    }
+
+
+def render_highlights(text, highlights):
+    """HTML-escape text and wrap the highlighted ranges in <mark>"""
+    parts = []
+    cursor = 0
+    for start, end in highlights:
+        parts.append(html.escape(text[cursor:start]))
+        parts.append(f"<mark>{html.escape(text[start:end])}</mark>")
+        cursor = end
+    parts.append(html.escape(text[cursor:]))
+
+    return "".join(parts)
+
+
+def add_highlights(row, terms):
+    """Attach highlight offsets, a snippet and rendered HTML to a result row"""
+    content = row.get("message_content") or ""
+    highlights = find_highlights(content, terms)
+    snippet = make_snippet(content, highlights)
+
+    row["highlights"] = highlights
+    row["snippet"] = snippet
+    row["highlighted_content"] = render_highlights(content, highlights)
+    row["highlighted_snippet"] = render_highlights(snippet["text"], snippet["highlights"])
@@ -0,0 +1,346 @@
+# f_chat/APIs/notification_chatroom/chat_apis/people_index.py
+# Redis type-ahead index of users who can be added to chat rooms
+#
+# Layout (all keys site-scoped):
+#   chat_people_docs                HASH  user -> JSON card (name, email, full_name, ...)
+#   chat_people_all                 ZSET  every indexed user
+#   chat_people_prefix:{prefix}     ZSET  users with a word starting with prefix
+#   chat_people_gram:{trigram}      ZSET  users whose searchable text contains trigram
+#   chat_people_loaded              STRING set once the index has been built
+#
+# Every ZSET scores a user by an encoding of their display name, so an
+# intersection comes back already in alphabetical order and only the first
+# `limit` entries ever leave Redis. Words are matched by prefix first; longer
+# terms that are not a word prefix fall back to trigram (infix) matching.
+# Room members are removed from the intersection with ZREM before reading it.
+#
+# The index is kept current from the User on_update / on_trash hooks and is
+# rebuilt lazily if missing. A rebuild replaces the whole keyspace in one
+# transaction, so readers see either the old index or the new one.
+
+import json
+import re
+import uuid
+
+import frappe
+
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import get_room_members
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    make_key,
+    pipeline,
+)
+
+MAX_PREFIX = 20  # longer words are looked up by their first MAX_PREFIX characters
+GRAM_SIZE = 3
+EXCLUDED_USERS = ("Administrator", "Guest")
+CARD_FIELDS = ("name", "email", "full_name", "first_name", "last_name", "user_image")
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_SORT_ALPHABET = " 0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _docs_key():
+    return make_key("chat_people_docs")
+
+
+def _all_key():
+    return make_key("chat_people_all")
+
+
+def _prefix_key(prefix):
+    return make_key("chat_people_prefix", prefix)
+
+
+def _gram_key(gram):
+    return make_key("chat_people_gram", gram)
+
+
+def _loaded_key():
+    return make_key("chat_people_loaded")
+
+
+def display_name(card):
+    return (
+        card.get("full_name")
+        or f"{card.get('first_name') or ''} {card.get('last_name') or ''}".strip()
+        or card["name"]
+    )
+
+
+def _sort_score(card):
+    """Encode the first 8 characters of the display name so scores sort alphabetically"""
+    base = len(_SORT_ALPHABET) + 1
+    score = 0
+    for char in (display_name(card).lower() + " " * 8)[:8]:
+        position = _SORT_ALPHABET.find(char)
+        score = score * base + (position if position >= 0 else base - 1)
+    return float(score)
+
+
+def _search_text(card):
+    return " ".join(
+        (card.get(field) or "").lower()
+        for field in ("full_name", "first_name", "last_name", "email", "name")
+    )
+
+
+def _words(card):
+    words = set()
+    for field in ("full_name", "first_name", "last_name", "email", "name"):
+        value = (card.get(field) or "").lower()
+        if not value:
+            continue
+        words.update(_WORD_RE.findall(value))
+        if field in ("email", "name"):
+            # Whole address and its local part, so "john.sm" finds john.smith@...
+            words.add(value)
+            words.add(value.split("@")[0])
+    return words
+
+
+def _index_keys(card):
+    """All index keys a user card belongs to"""
+    keys = {_all_key()}
+    for word in _words(card):
+        for length in range(1, min(len(word), MAX_PREFIX) + 1):
+            keys.add(_prefix_key(word[:length]))
+
+    text = _search_text(card)
+    for start in range(len(text) - GRAM_SIZE + 1):
+        gram = text[start:start + GRAM_SIZE]
+        if " " not in gram:
+            keys.add(_gram_key(gram))
+
+    return keys
+
+
+def _is_searchable(user):
+    if user.name in EXCLUDED_USERS or not user.enabled:
+        return False
+    if "allow_guest" in user and not user.allow_guest:
+        return False
+    return True
+
+
+def _card(user):
+    return {field: user.get(field) for field in CARD_FIELDS}
+
+
+def _user_fields():
+    fields = list(CARD_FIELDS) + ["enabled"]
+    if frappe.db.has_column("User", "allow_guest"):
+        fields.append("allow_guest")
+    return fields
+
+
+def index_user(user, previous=None):
+    """
+    Add, move or drop one user in the index
+
+    Args:
+        user (dict): User row with CARD_FIELDS, enabled (and allow_guest)
+        previous (dict): Card currently indexed for the user, if any
+    """
+    new_keys = set()
+    card = None
+    if _is_searchable(user):
+        card = _card(user)
+        new_keys = _index_keys(card)
+
+    old_keys = _index_keys(previous) if previous else set()
+
+    pipe = pipeline(transaction=True)
+    for key in old_keys - new_keys:
+        pipe.zrem(key, user.name)
+    if card:
+        score = _sort_score(card)
+        for key in new_keys:
+            pipe.zadd(key, {user.name: score})
+        pipe.hset(_docs_key(), user.name, json.dumps(card))
+    else:
+        pipe.hdel(_docs_key(), user.name)
+    pipe.execute()
+
+
+def remove_user(user):
+    """Drop a user from the index"""
+    pipe = pipeline()
+    pipe.hget(_docs_key(), user)
+    previous = pipe.execute()[0]
+    if not previous:
+        return
+
+    previous = json.loads(decode(previous))
+    pipe = pipeline(transaction=True)
+    for key in _index_keys(previous):
+        pipe.zrem(key, user)
+    pipe.hdel(_docs_key(), user)
+    pipe.execute()
+
+
+def _existing_index_keys():
+    """Every prefix and trigram key currently in Redis"""
+    cache = frappe.cache()
+    return [
+        key
+        for pattern in (_prefix_key("*"), _gram_key("*"))
+        for key in cache.scan_iter(match=pattern, count=1000)
+    ]
+
+
+def build_people_index():
+    """
+    Rebuild the index from scratch
+
+    Stale keys (users since disabled, renamed or deleted) are dropped in the
+    same transaction that writes the new ones, so readers are never starved.
+    """
+    users = frappe.get_all(
+        "User",
+        filters={"enabled": 1, "name": ["not in", EXCLUDED_USERS]},
+        fields=_user_fields()
+    )
+    stale_keys = _existing_index_keys()
+
+    pipe = pipeline(transaction=True)
+    pipe.delete(_docs_key(), _all_key(), *stale_keys)
+    for user in users:
+        if not _is_searchable(user):
+            continue
+        card = _card(user)
+        score = _sort_score(card)
+        for key in _index_keys(card):
+            pipe.zadd(key, {user.name: score})
+        pipe.hset(_docs_key(), user.name, json.dumps(card))
+    pipe.set(_loaded_key(), 1)
+    pipe.execute()
+
+    return len(users)
+
+
+def _ensure_index():
+    pipe = pipeline()
+    pipe.exists(_loaded_key())
+    if not pipe.execute()[0]:
+        build_people_index()
+
+
+def search(term="", exclude_room=None, limit=50):
+    """
+    Type-ahead lookup of users
+
+    Args:
+        term (str): What has been typed so far (words match by prefix)
+        exclude_room (str): Leave out members of this room
+        limit (int): Maximum results
+
+    Returns:
+        list: User cards in display-name order
+    """
+    _ensure_index()
+
+    excluded = list(get_room_members(exclude_room)) if exclude_room else []
+    tokens = (term or "").lower().split()
+
+    if tokens:
+        users = _ranked_intersection(
+            [_prefix_key(token[:MAX_PREFIX]) for token in tokens], excluded, limit
+        )
+        if any(len(token) > MAX_PREFIX for token in tokens):
+            users = [
+                card["name"] for card in _cards(users)
+                if all(any(word.startswith(token) for word in _words(card)) for token in tokens)
+            ]
+
+        if len(users) < limit:
+            infix = _infix_search(tokens, excluded, limit)
+            users += [user for user in infix if user not in users][:limit - len(users)]
+    else:
+        users = _ranked_intersection([_all_key()], excluded, limit)
+
+    return _cards(users)
+
+
+def get_people(users):
+    """
+    Get indexed cards for some users
+
+    Returns:
+        dict: user -> card (unsearchable users are missing)
+    """
+    _ensure_index()
+    return {card["name"]: card for card in _cards(list(users))}
+
+
+def _ranked_intersection(keys, excluded, limit):
+    """Intersect index ZSETs, drop excluded users and read the first `limit` entries"""
+    temp_key = make_key("chat_people_query", uuid.uuid4().hex)
+
+    # Every key scores a user identically, so MIN just keeps that score
+    pipe = pipeline(transaction=True)
+    pipe.zinterstore(temp_key, keys, aggregate="MIN")
+    if excluded:
+        pipe.zrem(temp_key, *excluded)
+    pipe.zrange(temp_key, 0, limit - 1)
+    pipe.delete(temp_key)
+    results = pipe.execute()
+
+    return [decode(user) for user in results[-2]]
+
+
+def _infix_search(tokens, excluded, limit):
+    """Trigram candidates for terms that are not word prefixes, verified against the text"""
+    grams = set()
+    for token in tokens:
+        grams.update(
+            token[start:start + GRAM_SIZE]
+            for start in range(len(token) - GRAM_SIZE + 1)
+        )
+    if not grams:
+        return []
+
+    candidates = _ranked_intersection([_gram_key(gram) for gram in grams], excluded, limit * 4)
+    texts = _texts(candidates)
+
+    return [
+        user for user in candidates
+        if all(token in texts.get(user, "") for token in tokens)
+    ][:limit]
+
+
+def _texts(users):
+    return {card["name"]: _search_text(card) for card in _cards(users)}
+
+
+def _cards(users):
+    if not users:
+        return []
+
+    pipe = pipeline()
+    pipe.hmget(_docs_key(), users)
+    return [json.loads(decode(card)) for card in pipe.execute()[0] if card]
+
+
+# Hooks
+
+def update_people_index(doc, method=None):
+    """User on_update hook: re-index the user"""
+    try:
+        pipe = pipeline()
+        pipe.hget(_docs_key(), doc.name)
+        previous = pipe.execute()[0]
+
+        user = frappe._dict({field: doc.get(field) for field in _user_fields()})
+        index_user(user, json.loads(decode(previous)) if previous else None)
+
+    except Exception as e:
+        frappe.log_error(f"Error updating people index for {doc.name}: {str(e)}")
+
+
+def remove_people_index(doc, method=None):
+    """User on_trash hook"""
+    try:
+        remove_user(doc.name)
+    except Exception as e:
+        frappe.log_error(f"Error removing {doc.name} from people index: {str(e)}")
@@ -0,0 +1,563 @@
+# f_chat/APIs/notification_chatroom/chat_apis/presence.py
+# Redis-backed presence service (single source of truth for chat status)
+#
+# Layout (all keys site-scoped):
+#   chat_presence:heartbeats   ZSET  user -> epoch of last heartbeat (present users only)
+#   chat_presence:online       SET   present users, intersected with room rosters
+#   chat_presence:status       HASH  user -> online / away / busy / offline
+#   chat_presence:last_seen    HASH  user -> epoch of last activity
+#   chat_presence:active_room  HASH  user -> room currently open
+#   chat_presence:dirty        SET   users whose state changed since the last persist
+#   chat_presence:pending      HASH  user -> status waiting to be broadcast
+#   chat_presence:due          ZSET  user -> epoch when the pending status may go out
+#   chat_presence:broadcast    HASH  user -> status peers last heard about
+#
+# Heartbeats only touch Redis. Sending a message counts as a heartbeat
+# (record_sender_activity, a Chat Message hook). A single scheduled sweeper
+# (realtime_events_fixed.cleanup_stale_users) expires stale users by reading
+# only the expired range of the heartbeats ZSET, then writes `Chat User
+# Activity` via persist_presence(), only for users in the dirty set.
+#
+# Status changes are broadcast only to the rooms of the changed user, one
+# event per room listing every change in it. Changes are held for
+# STATUS_COALESCE_WINDOW seconds so a flap such as online -> away -> online
+# produces one event (or none). The first change of a window queues one flush
+# job, which waits until the window closes and then emits; the per-minute
+# broadcast_due_status_changes job is a safety net for a lost job.
+
+import time
+from datetime import datetime
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import (
+    get_room_members,
+    get_user_rooms,
+    room_members_key,
+)
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    decode_set,
+    make_key,
+    pipeline,
+)
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import track_job_run
+
+PRESENCE_TIMEOUT = 600  # seconds without a heartbeat before a user is offline
+PERSIST_BATCH_SIZE = 500
+STATUS_COALESCE_WINDOW = 3  # seconds a status change waits before broadcast
+
+VALID_STATUSES = ("online", "away", "busy", "offline")
+
+# Key names; resolved per site by _key() at call time
+HEARTBEATS = "heartbeats"
+ONLINE = "online"
+STATUS = "status"
+LAST_SEEN = "last_seen"
+ACTIVE_ROOM = "active_room"
+DIRTY = "dirty"
+PENDING_BROADCASTS = "pending"
+BROADCASTS_DUE = "due"
+LAST_BROADCASTS = "broadcast"
+FLUSH_SCHEDULED = "flush_scheduled"
+
+ALL_KEYS = (
+    HEARTBEATS, ONLINE, STATUS, LAST_SEEN, ACTIVE_ROOM, DIRTY,
+    PENDING_BROADCASTS, BROADCASTS_DUE, LAST_BROADCASTS, FLUSH_SCHEDULED,
+)
+
+
+def _key(name):
+    return make_key("chat_presence", name)
+
+
+def _now():
+    return now_datetime().timestamp()
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(float(timestamp)) if timestamp else None
+
+
+def _effective_status(heartbeat, status, now):
+    """Status as seen by readers: anything without a fresh heartbeat is offline"""
+    if heartbeat is None or now - float(heartbeat) > PRESENCE_TIMEOUT:
+        return "offline"
+    return status or "online"
+
+
+def touch(user, status=None):
+    """
+    Record a heartbeat for a user
+
+    Args:
+        user (str): User ID
+        status (str): New status; keeps the current one (or online) if omitted
+
+    Returns:
+        tuple: (previous_status, status)
+    """
+    if status and status not in VALID_STATUSES:
+        frappe.throw(_("Invalid status: {0}").format(status))
+
+    now = _now()
+    pipe = pipeline()
+    pipe.zscore(_key(HEARTBEATS), user)
+    pipe.hget(_key(STATUS), user)
+    heartbeat, stored_status = pipe.execute()
+
+    previous = _effective_status(heartbeat, decode(stored_status), now)
+    if not status:
+        status = previous if previous != "offline" else "online"
+
+    pipe = pipeline(transaction=True)
+    if status == "offline":
+        _mark_offline(pipe, user, now)
+    else:
+        pipe.zadd(_key(HEARTBEATS), {user: now})
+        pipe.sadd(_key(ONLINE), user)
+        pipe.hset(_key(STATUS), user, status)
+        pipe.hset(_key(LAST_SEEN), user, now)
+        if status != previous:
+            pipe.sadd(_key(DIRTY), user)
+    pipe.execute()
+
+    if status != previous:
+        publish_status_change(user, status)
+
+    return previous, status
+
+
+def set_status(user, status):
+    """
+    Explicitly set a user's status (also counts as a heartbeat)
+
+    Returns:
+        tuple: (previous_status, status)
+    """
+    return touch(user, status or "online")
+
+
+def set_active_room(user, room_id=None):
+    """Record the room a user has open (None clears it)"""
+    pipe = pipeline(transaction=True)
+    if room_id:
+        pipe.hset(_key(ACTIVE_ROOM), user, room_id)
+    else:
+        pipe.hdel(_key(ACTIVE_ROOM), user)
+    pipe.sadd(_key(DIRTY), user)
+    pipe.execute()
+
+
+def _mark_offline(pipe, user, last_seen):
+    pipe.zrem(_key(HEARTBEATS), user)
+    pipe.srem(_key(ONLINE), user)
+    pipe.hset(_key(STATUS), user, "offline")
+    pipe.hset(_key(LAST_SEEN), user, last_seen)
+    pipe.hdel(_key(ACTIVE_ROOM), user)
+    pipe.sadd(_key(DIRTY), user)
+
+
+def get_presence(users):
+    """
+    Get presence for several users in one round trip
+
+    Args:
+        users (iterable): User IDs
+
+    Returns:
+        dict: user -> {status, is_online, last_seen, last_activity, active_room}
+    """
+    users = list(dict.fromkeys(users))
+    if not users:
+        return {}
+
+    pipe = pipeline()
+    pipe.hmget(_key(STATUS), users)
+    pipe.hmget(_key(LAST_SEEN), users)
+    pipe.hmget(_key(ACTIVE_ROOM), users)
+    for user in users:
+        pipe.zscore(_key(HEARTBEATS), user)
+    statuses, last_seen, active_rooms, *heartbeats = pipe.execute()
+
+    now = _now()
+    presence = {}
+    for index, user in enumerate(users):
+        status = _effective_status(heartbeats[index], decode(statuses[index]), now)
+        presence[user] = {
+            "status": status,
+            "is_online": 1 if status == "online" else 0,
+            "last_seen": _to_datetime(decode(last_seen[index])),
+            "last_activity": _to_datetime(heartbeats[index] or decode(last_seen[index])),
+            "active_room": decode(active_rooms[index]) if status != "offline" else None,
+        }
+
+    return presence
+
+
+def get_status(user):
+    """Get a single user's status string"""
+    return get_presence([user])[user]["status"]
+
+
+def get_online_users():
+    """
+    Get every user with a fresh heartbeat
+
+    Returns:
+        dict: user -> presence (see get_presence), most recently active first
+    """
+    cutoff = _now() - PRESENCE_TIMEOUT
+
+    pipe = pipeline()
+    pipe.zrevrangebyscore(_key(HEARTBEATS), "+inf", cutoff)
+    users = [decode(user) for user in pipe.execute()[0]]
+
+    return get_presence(users)
+
+
+def get_online_room_members(room_id):
+    """
+    Get the present members of a room
+
+    The roster is intersected with the online set inside Redis; the (small)
+    result is then checked against heartbeat freshness.
+
+    Args:
+        room_id (str): Chat Room ID
+
+    Returns:
+        dict: user -> presence (see get_presence)
+    """
+    room_key = room_members_key(room_id)
+
+    pipe = pipeline()
+    pipe.exists(room_key)
+    pipe.sinter(room_key, _key(ONLINE))
+    indexed, members = pipe.execute()
+
+    if not indexed:
+        # Build the roster index, then intersect again
+        get_room_members(room_id)
+        pipe = pipeline()
+        pipe.sinter(room_key, _key(ONLINE))
+        members = pipe.execute()[0]
+
+    presence = get_presence(decode_set(members))
+    return {user: data for user, data in presence.items() if data["status"] != "offline"}
+
+
+def sweep_stale_presence():
+    """
+    Mark users whose heartbeat expired as offline
+
+    Returns:
+        list: Users that went offline
+    """
+    cutoff = _now() - PRESENCE_TIMEOUT
+
+    pipe = pipeline()
+    pipe.zrangebyscore(_key(HEARTBEATS), "-inf", cutoff, withscores=True)
+    expired = [(decode(user), score) for user, score in pipe.execute()[0]]
+
+    if not expired:
+        return []
+
+    pipe = pipeline(transaction=True)
+    for user, last_heartbeat in expired:
+        _mark_offline(pipe, user, last_heartbeat)
+    pipe.execute()
+
+    offline_users = [user for user, _score in expired]
+    for user in offline_users:
+        publish_status_change(user, "offline")
+
+    return offline_users
+
+
+# Document event hook
+
+def record_sender_activity(doc, method=None):
+    """Chat Message after_insert hook: the sender is active right now"""
+    try:
+        if doc.sender and doc.sender not in ("Administrator", "Guest"):
+            touch(doc.sender)
+    except Exception as e:
+        frappe.log_error(f"Error recording activity for message {doc.name}: {str(e)}")
+
+
+def publish_status_change(user, status):
+    """
+    Queue a status broadcast for the rooms of `user`
+
+    Changes are coalesced: the user's entry becomes due STATUS_COALESCE_WINDOW
+    seconds after the first change, and the flush then emits only the final
+    status, and only if it differs from what peers were last told.
+    """
+    pipe = pipeline(transaction=True)
+    pipe.hset(_key(PENDING_BROADCASTS), user, status)
+    pipe.zadd(_key(BROADCASTS_DUE), {user: _now() + STATUS_COALESCE_WINDOW}, nx=True)
+    opened_window = pipe.execute()[1]
+
+    if opened_window:
+        _schedule_flush()
+
+
+def _schedule_flush():
+    """Queue one flush job unless one is already waiting"""
+    pipe = pipeline()
+    # Expiry is a safety net in case the flush job never runs
+    pipe.set(_key(FLUSH_SCHEDULED), 1, nx=True, ex=STATUS_COALESCE_WINDOW * 10)
+    if pipe.execute()[0]:
+        frappe.enqueue(
+            "f_chat.APIs.notification_chatroom.chat_apis.presence.flush_status_broadcasts",
+            queue="short"
+        )
+
+
+def flush_status_broadcasts():
+    """
+    Background job, queued by the first change of a window: wait for the
+    earliest entry to fall due, then broadcast what is due
+
+    Returns:
+        int: Users whose change was broadcast
+    """
+    pipe = pipeline()
+    pipe.zrange(_key(BROADCASTS_DUE), 0, 0, withscores=True)
+    earliest = pipe.execute()[0]
+    if earliest:
+        wait = min(earliest[0][1] - _now(), STATUS_COALESCE_WINDOW)
+        if wait > 0:
+            time.sleep(wait)
+
+    broadcast = _broadcast_due_changes()
+
+    # Windows opened while this job waited found it already queued
+    pipe = pipeline()
+    pipe.zcard(_key(BROADCASTS_DUE))
+    if pipe.execute()[0]:
+        _schedule_flush()
+
+    return broadcast
+
+
+def _broadcast_due_changes():
+    """
+    Emit the coalesced status changes that are due, one event per room
+
+    Returns:
+        int: Users whose change was broadcast
+    """
+    pipe = pipeline()
+    pipe.zrangebyscore(_key(BROADCASTS_DUE), "-inf", _now())
+    due = [decode(user) for user in pipe.execute()[0]]
+
+    # Changes arriving after this point schedule a new entry
+    pipe = pipeline(transaction=True)
+    pipe.delete(_key(FLUSH_SCHEDULED))
+    if due:
+        pipe.hmget(_key(PENDING_BROADCASTS), due)
+        pipe.hdel(_key(PENDING_BROADCASTS), *due)
+        pipe.zrem(_key(BROADCASTS_DUE), *due)
+    results = pipe.execute()
+
+    if not due:
+        return 0
+
+    pending = {
+        user: decode(status) for user, status in zip(due, results[1], strict=True)
+        if status is not None
+    }
+    if not pending:
+        return 0
+
+    users = list(pending)
+    pipe = pipeline()
+    pipe.hmget(_key(LAST_BROADCASTS), users)
+    last_broadcast = dict(zip(users, (decode(status) for status in pipe.execute()[0]), strict=True))
+
+    # A user nobody has heard about yet is implicitly offline
+    changed = {
+        user: status for user, status in pending.items()
+        if status != (last_broadcast[user] or "offline")
+    }
+    if not changed:
+        return 0
+
+    pipe = pipeline()
+    pipe.hset(_key(LAST_BROADCASTS), mapping=changed)
+    pipe.execute()
+
+    room_changes = {}
+    for user, status in changed.items():
+        for room_id in get_user_rooms(user):
+            room_changes.setdefault(room_id, []).append({"user": user, "status": status})
+
+    timestamp = str(now_datetime())
+    for room_id, users in room_changes.items():
+        frappe.publish_realtime(
+            event="user_statuses_changed",
+            message={
+                "room_id": room_id,
+                "users": users,
+                "timestamp": timestamp
+            },
+            room=f"chat_room_{room_id}"
+        )
+
+    return len(changed)
+
+
+def broadcast_due_status_changes():
+    """
+    Cron job: broadcast due status changes whose flush job was lost
+    """
+    with track_job_run("f_chat.APIs.notification_chatroom.chat_apis.presence.broadcast_due_status_changes") as run:
+        try:
+            run.rows = _broadcast_due_changes()
+
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in broadcast_due_status_changes: {str(e)}")
+
+
+def persist_presence(batch_size=PERSIST_BATCH_SIZE):
+    """
+    Write changed presence to `Chat User Activity`
+
+    Only users in the dirty set are written, with one upsert per batch.
+
+    Returns:
+        int: Number of users persisted
+    """
+    persisted = 0
+
+    while True:
+        pipe = pipeline()
+        pipe.spop(_key(DIRTY), batch_size)
+        users = [user for user in decode_set(pipe.execute()[0]) if user != "Guest"]
+        if not users:
+            break
+
+        try:
+            _upsert_activity(users)
+            frappe.db.commit()
+            persisted += len(users)
+
+        except Exception:
+            frappe.db.rollback()
+            # Put the batch back so the next run retries it
+            pipe = pipeline()
+            pipe.sadd(_key(DIRTY), *users)
+            pipe.execute()
+            raise
+
+    return persisted
+
+
+def _upsert_activity(users):
+    presence = get_presence(users)
+    full_names = dict(frappe.db.sql("""
+        SELECT name, full_name FROM `tabUser` WHERE name IN %(users)s
+    """, {"users": tuple(users)}))
+
+    now = now_datetime()
+    values = []
+    params = {"now": now}
+    for index, user in enumerate(users):
+        if user not in full_names:
+            continue
+
+        data = presence[user]
+        values.append(
+            f"(%(user_{index})s, %(user_{index})s, %(full_name_{index})s, %(status_{index})s, "
+            f"%(is_online_{index})s, %(last_seen_{index})s, %(last_activity_{index})s, "
+            f"%(active_room_{index})s, %(now)s, %(now)s, 'Administrator', 'Administrator')"
+        )
+        params.update({
+            f"user_{index}": user,
+            f"full_name_{index}": full_names[user],
+            f"status_{index}": data["status"],
+            f"is_online_{index}": data["is_online"],
+            f"last_seen_{index}": data["last_seen"],
+            f"last_activity_{index}": data["last_activity"],
+            f"active_room_{index}": data["active_room"],
+        })
+
+    if not values:
+        return
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabChat User Activity`
+            (name, user, full_name, chat_status, is_online, last_seen, last_activity,
+             active_room, creation, modified, owner, modified_by)
+        VALUES {", ".join(values)}
+        ON DUPLICATE KEY UPDATE
+            full_name = VALUES(full_name),
+            chat_status = VALUES(chat_status),
+            is_online = VALUES(is_online),
+            last_seen = VALUES(last_seen),
+            last_activity = VALUES(last_activity),
+            active_room = VALUES(active_room),
+            modified = VALUES(modified)
+    """, params)
+
+
+def reset_presence():
+    """
+    Drop all presence state
+
+    Returns:
+        int: Number of users that were present
+    """
+    pipe = pipeline(transaction=True)
+    pipe.zcard(_key(HEARTBEATS))
+    pipe.delete(*[_key(name) for name in ALL_KEYS])
+    present = pipe.execute()[0]
+
+    return present
+
+
+def take_everyone_offline():
+    """
+    Drop all presence state and mark every persisted status offline
+
+    Returns:
+        int: Number of users that were present
+    """
+    present = reset_presence()
+
+    frappe.db.sql("""
+        UPDATE `tabChat User Activity`
+        SET chat_status = 'offline',
+            is_online = 0,
+            active_room = NULL,
+            typing_in_room = NULL
+        WHERE chat_status != 'offline' OR is_online = 1
+    """)
+
+    return present
+
+
+def get_presence_statistics():
+    """Presence counters, all O(1) or O(log n) in Redis"""
+    cutoff = _now() - PRESENCE_TIMEOUT
+
+    pipe = pipeline()
+    pipe.zcount(_key(HEARTBEATS), cutoff, "+inf")
+    pipe.zcard(_key(HEARTBEATS))
+    pipe.hlen(_key(STATUS))
+    pipe.scard(_key(DIRTY))
+    online, tracked, known, pending = pipe.execute()
+
+    return {
+        "online_users": online,
+        "stale_heartbeats": tracked - online,
+        "known_users": known,
+        "pending_persist": pending,
+        "timestamp": str(now_datetime())
+    }
+
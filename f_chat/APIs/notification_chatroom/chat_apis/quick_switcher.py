@@ -0,0 +1,322 @@
+# f_chat/APIs/notification_chatroom/chat_apis/quick_switcher.py
+# "Jump to room or person" lookup backed by a per-user Redis index
+#
+# Layout (all keys site-scoped):
+#   chat_switcher_rooms             HASH  room -> JSON card (room_name, room_type, room_status)
+#   chat_switcher_recent:{user}     ZSET  room -> last activity (epoch); group rooms only
+#   chat_switcher_contacts:{user}   ZSET  peer -> last activity of their direct room
+#   chat_switcher_direct:{user}     HASH  peer -> direct room
+#
+# Direct Message rooms are listed as the person on the other side, so a user
+# shows up once whether they are typed as a name or reached through a room.
+# Per-user keys carry a LOADED_MARKER member and are rebuilt from the
+# database when it is missing. Room hooks keep cards and rosters current;
+# new messages only bump scores of entries that already exist (ZADD XX).
+
+import json
+import time
+
+import frappe
+from frappe.utils import cint
+
+from f_chat.APIs.notification_chatroom.chat_apis import people_index
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import (
+    LOADED_MARKER,
+    get_room_members,
+)
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    make_key,
+    pipeline,
+)
+
+DIRECT_ROOM_TYPE = "Direct Message"
+INDEX_EXPIRY = 86400 * 7  # idle users' indexes are dropped and rebuilt on next use
+MAX_RESULTS = 20
+
+# Match tiers, best first
+MATCH_START = 3  # the name starts with the query
+MATCH_WORD = 2  # a later word starts with the query
+MATCH_INFIX = 1  # the query appears inside the name
+
+
+def _rooms_key():
+    return make_key("chat_switcher_rooms")
+
+
+def _recent_key(user):
+    return make_key("chat_switcher_recent", user)
+
+
+def _contacts_key(user):
+    return make_key("chat_switcher_contacts", user)
+
+
+def _direct_key(user):
+    return make_key("chat_switcher_direct", user)
+
+
+def _room_card(room):
+    return json.dumps({
+        "room_name": room.room_name,
+        "room_type": room.room_type,
+        "room_status": room.room_status,
+    })
+
+
+def _build_user_index(user):
+    """Load a user's rooms and direct contacts from the database"""
+    rooms = frappe.db.sql("""
+        SELECT cr.name, cr.room_name, cr.room_type, cr.room_status,
+            UNIX_TIMESTAMP(cr.modified) AS last_activity
+        FROM `tabChat Room Member` crm
+        INNER JOIN `tabChat Room` cr ON cr.name = crm.parent
+        WHERE crm.user = %(user)s AND crm.parenttype = 'Chat Room'
+    """, {"user": user}, as_dict=True)
+
+    direct_rooms = [room.name for room in rooms if room.room_type == DIRECT_ROOM_TYPE]
+    peers = []
+    if direct_rooms:
+        peers = frappe.db.sql("""
+            SELECT parent, user
+            FROM `tabChat Room Member`
+            WHERE parent IN %(rooms)s AND parenttype = 'Chat Room' AND user != %(user)s
+        """, {"rooms": tuple(direct_rooms), "user": user}, as_dict=True)
+
+    activity = {room.name: float(room.last_activity or 0) for room in rooms}
+
+    recent_key, contacts_key, direct_key = _recent_key(user), _contacts_key(user), _direct_key(user)
+    pipe = pipeline(transaction=True)
+    pipe.delete(recent_key, contacts_key, direct_key)
+    pipe.zadd(recent_key, {LOADED_MARKER: 0})
+    for room in rooms:
+        pipe.hset(_rooms_key(), room.name, _room_card(room))
+        if room.room_type != DIRECT_ROOM_TYPE:
+            pipe.zadd(recent_key, {room.name: activity[room.name]})
+    for peer in peers:
+        pipe.zadd(contacts_key, {peer.user: activity[peer.parent]})
+        pipe.hset(direct_key, peer.user, peer.parent)
+    for key in (recent_key, contacts_key, direct_key):
+        pipe.expire(key, INDEX_EXPIRY)
+    pipe.execute()
+
+
+def _load_user_index(user):
+    """Read a user's rooms, contacts and direct rooms, building them if needed"""
+    for attempt in range(2):
+        pipe = pipeline()
+        pipe.zrevrange(_recent_key(user), 0, -1, withscores=True)
+        pipe.zrevrange(_contacts_key(user), 0, -1, withscores=True)
+        pipe.hgetall(_direct_key(user))
+        recent, contacts, direct = pipe.execute()
+
+        recent = [(decode(room), score) for room, score in recent]
+        if any(room == LOADED_MARKER for room, _score in recent) or attempt:
+            break
+        _build_user_index(user)
+
+    return (
+        [(room, score) for room, score in recent if room != LOADED_MARKER],
+        [(decode(peer), score) for peer, score in contacts],
+        {decode(peer): decode(room) for peer, room in direct.items()},
+    )
+
+
+def _match_tier(query, *labels):
+    """Best tier at which the query matches any label (0: no match)"""
+    if not query:
+        return MATCH_START
+
+    best = 0
+    for label in labels:
+        label = (label or "").lower()
+        if label.startswith(query):
+            return MATCH_START
+        if any(word.startswith(query) for word in label.split()[1:]):
+            best = max(best, MATCH_WORD)
+        elif query in label:
+            best = max(best, MATCH_INFIX)
+    return best
+
+
+def quick_switch_results(user, query="", limit=MAX_RESULTS):
+    """
+    Rank a user's rooms and people for the quick switcher
+
+    Args:
+        user (str): Current user
+        query (str): What has been typed so far
+        limit (int): Maximum results
+
+    Returns:
+        list: Entries ordered by match tier, then recency
+    """
+    query = (query or "").strip().lower()
+    recent, contacts, direct = _load_user_index(user)
+
+    results = []
+
+    if recent:
+        pipe = pipeline()
+        pipe.hmget(_rooms_key(), [room for room, _score in recent])
+        cards = pipe.execute()[0]
+
+        for (room, last_activity), card in zip(recent, cards, strict=True):
+            if not card:
+                continue
+            card = json.loads(decode(card))
+            if card.get("room_status") not in (None, "Active"):
+                continue
+
+            tier = _match_tier(query, card.get("room_name"))
+            if tier:
+                results.append({
+                    "type": "room",
+                    "value": room,
+                    "label": card.get("room_name") or room,
+                    "description": card.get("room_type"),
+                    "room_id": room,
+                    "last_activity": last_activity,
+                    "match": tier,
+                })
+
+    # Direct contacts first (they carry recency), then anyone else the query finds
+    people = {peer: last_activity for peer, last_activity in contacts}
+    if query:
+        for card in people_index.search(query, limit=limit):
+            people.setdefault(card["name"], 0)
+    people.pop(user, None)
+
+    cards = people_index.get_people(people)
+    for peer, last_activity in people.items():
+        card = cards.get(peer)
+        if not card:
+            continue
+
+        label = people_index.display_name(card)
+        tier = _match_tier(query, label, card.get("email"), peer)
+        if tier:
+            results.append({
+                "type": "person",
+                "value": peer,
+                "label": label,
+                "description": card.get("email"),
+                "user_image": card.get("user_image"),
+                "room_id": direct.get(peer),
+                "last_activity": last_activity,
+                "match": tier,
+            })
+
+    results.sort(key=lambda entry: (-entry["match"], -entry["last_activity"], entry["label"].lower()))
+    return results[:limit]
+
+
+@frappe.whitelist()
+def quick_switch(query="", limit=MAX_RESULTS):
+    """
+    Jump-to lookup over the current user's rooms and people
+
+    Args:
+        query (str): What has been typed so far
+        limit (int): Maximum results
+
+    Returns:
+        dict: Ranked rooms and people
+    """
+    try:
+        limit = min(cint(limit) or MAX_RESULTS, 50)
+        results = quick_switch_results(frappe.session.user, query, limit)
+
+        return {
+            "success": True,
+            "data": {
+                "query": query,
+                "results": results
+            }
+        }
+
+    except Exception as e:
+        frappe.log_error(f"Error in quick_switch: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+# Document event hooks
+
+def update_room_entries(doc, method=None):
+    """Chat Room on_update hook: refresh the room card and its members' entries"""
+    try:
+        before = doc.get_doc_before_save()
+        members = {member.user for member in doc.members}
+        previous = {member.user for member in before.members} if before else set()
+        last_activity = time.time()
+        is_direct = doc.room_type == DIRECT_ROOM_TYPE
+
+        pipe = pipeline(transaction=True)
+        pipe.hset(_rooms_key(), doc.name, _room_card(doc))
+
+        for user in previous - members:
+            pipe.zrem(_recent_key(user), doc.name)
+            # Leaving a group room keeps the user's own DMs with its members
+            if is_direct:
+                for peer in previous - {user}:
+                    pipe.zrem(_contacts_key(user), peer)
+                    pipe.hdel(_direct_key(user), peer)
+
+        for user in members - previous:
+            # A key created here has no LOADED_MARKER, so it is rebuilt in full on first use
+            if is_direct:
+                for peer in members - {user}:
+                    pipe.zadd(_contacts_key(user), {peer: last_activity}, nx=True)
+                    pipe.hset(_direct_key(user), peer, doc.name)
+            else:
+                pipe.zadd(_recent_key(user), {doc.name: last_activity}, nx=True)
+
+        pipe.execute()
+
+    except Exception as e:
+        frappe.log_error(f"Error updating quick switcher for room {doc.name}: {str(e)}")
+
+
+def remove_room_entries(doc, method=None):
+    """Chat Room on_trash hook"""
+    try:
+        members = {member.user for member in doc.members}
+
+        pipe = pipeline(transaction=True)
+        pipe.hdel(_rooms_key(), doc.name)
+        for user in members:
+            pipe.zrem(_recent_key(user), doc.name)
+            if doc.room_type == DIRECT_ROOM_TYPE:
+                for peer in members - {user}:
+                    pipe.zrem(_contacts_key(user), peer)
+                    pipe.hdel(_direct_key(user), peer)
+        pipe.execute()
+
+    except Exception as e:
+        frappe.log_error(f"Error removing room {doc.name} from quick switcher: {str(e)}")
+
+
+def bump_room_activity(doc, method=None):
+    """Chat Message after_insert hook: move the room up for every member"""
+    try:
+        members = get_room_members(doc.chat_room)
+        if not members:
+            return
+
+        pipe = pipeline()
+        pipe.hget(_rooms_key(), doc.chat_room)
+        card = pipe.execute()[0]
+        is_direct = bool(card) and json.loads(decode(card)).get("room_type") == DIRECT_ROOM_TYPE
+
+        now = time.time()
+        pipe = pipeline()
+        for user in members:
+            if is_direct:
+                for peer in members - {user}:
+                    pipe.zadd(_contacts_key(user), {peer: now}, xx=True)
+            else:
+                pipe.zadd(_recent_key(user), {doc.chat_room: now}, xx=True)
+        pipe.execute()
+
+    except Exception as e:
+        frappe.log_error(f"Error updating quick switcher activity for room {doc.chat_room}: {str(e)}")
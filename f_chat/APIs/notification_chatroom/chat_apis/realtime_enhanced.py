@@ -3,10 +3,13 @@
 
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, cint, get_datetime, time_diff_in_seconds
+from frappe.utils import now_datetime, cint, get_datetime, time_diff_in_seconds, sbool
 import json
 from typing import Dict, List, Optional, Any
 
+from f_chat.APIs.notification_chatroom.chat_apis import engagement_sketches, presence, typing_indicators
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import get_room_members, is_member
+
 @frappe.whitelist()
 def get_user_chat_status():
     """
@@ -163,39 +166,8 @@ def update_user_online_status(status="online"):
     try:
         current_user = frappe.session.user
         
-        # Update user's last activity timestamp
-        cache_key = f"chat_user_status_{current_user}"
-        status_data = {
-            "status": status,
-            "last_seen": str(now_datetime()),
-            "user": current_user
-        }
-        
-        # Cache for 10 minutes
-        frappe.cache().set_value(cache_key, status_data, expires_in_sec=600)
-        
-        # Also update in database if user record has custom fields
-        try:
-            if frappe.db.exists("Custom Field", {"dt": "User", "fieldname": "custom_chat_status"}):
-                frappe.db.set_value("User", current_user, "custom_chat_status", status)
-                
-            if frappe.db.exists("Custom Field", {"dt": "User", "fieldname": "custom_last_chat_activity"}):
-                frappe.db.set_value("User", current_user, "custom_last_chat_activity", now_datetime())
-                
-        except Exception as e:
-            # Custom fields might not exist, continue without error
-            pass
-        
-        # Notify other users about status change
-        frappe.publish_realtime(
-            event="user_status_changed",
-            message={
-                "user": current_user,
-                "status": status,
-                "timestamp": str(now_datetime())
-            },
-            room="chat_global"
-        )
+        # Transitions are broadcast (coalesced) to users sharing a room
+        previous_status, status = presence.set_status(current_user, status)
         
         return {
             "success": True,
@@ -315,6 +287,7 @@ def mark_room_as_read_enhanced(room_id):
             SET last_read = %s 
             WHERE parent = %s AND user = %s
         """, (now_datetime(), room_id, current_user))
+        engagement_sketches.record_reader(room_id, current_user)
         
         # Clear unread cache for this user
         cache_key = f"chat_unread_{current_user}"
@@ -355,23 +328,14 @@ def send_typing_indicator_enhanced(room_id, is_typing=True):
     try:
         current_user = frappe.session.user
         
-        # Get user info
-        user_info = frappe.db.get_value("User", current_user, 
-                                      ["full_name", "user_image"], as_dict=True)
+        if not typing_indicators.is_typing_enabled():
+            return {"success": True}
         
-        # Send typing indicator to room members
-        frappe.publish_realtime(
-            event="user_typing",
-            message={
-                "room_id": room_id,
-                "user": current_user,
-                "user_name": user_info.get("full_name") or current_user,
-                "user_image": user_info.get("user_image"),
-                "is_typing": is_typing,
-                "timestamp": str(now_datetime())
-            },
-            room=f"chat_room_{room_id}"
-        )
+        if not is_member(room_id, current_user):
+            return {"success": False, "error": "You are not a member of this room"}
+        
+        # Aggregated `typing_users` events go to the room (see typing_indicators.py)
+        typing_indicators.set_typing(room_id, current_user, sbool(is_typing))
         
         return {"success": True}
         
@@ -381,7 +345,7 @@ def send_typing_indicator_enhanced(room_id, is_typing=True):
 
 def get_user_online_status(user):
     """
-    Get user's online status from cache
+    Get user's online status from the presence service
     
     Args:
         user (str): User ID
@@ -390,20 +354,7 @@ def get_user_online_status(user):
         str: User's online status
     """
     try:
-        cache_key = f"chat_user_status_{user}"
-        status_data = frappe.cache().get_value(cache_key)
-        
-        if not status_data:
-            return "offline"
-        
-        # Check if user was seen recently (within 10 minutes)
-        last_seen = get_datetime(status_data.get("last_seen"))
-        current_time = now_datetime()
-        
-        if time_diff_in_seconds(current_time, last_seen) > 600:  # 10 minutes
-            return "offline"
-        
-        return status_data.get("status", "offline")
+        return presence.get_status(user)
         
     except Exception:
         return "offline"
@@ -809,72 +760,6 @@ def handle_member_removed_notification(doc, method):
     except Exception as e:
         frappe.log_error(f"Error in handle_member_removed_notification: {str(e)}")
 
-# Maintenance and cleanup functions
-
-def cleanup_user_status_cache():
-    """
-    Daily cleanup of expired user status cache entries
-    """
-    try:
-        # This would clean up old status entries
-        # Implementation depends on your cache system
-        print("🧹 Cleaning up user status cache entries...")
-        
-        # Get all users and check their status timestamps
-        users = frappe.get_all("User", filters={"enabled": 1}, pluck="name")
-        
-        current_time = now_datetime()
-        cleaned_count = 0
-        
-        for user in users:
-            cache_key = f"chat_user_status_{user}"
-            status_data = frappe.cache().get_value(cache_key)
-            
-            if status_data and status_data.get("last_seen"):
-                last_seen = get_datetime(status_data["last_seen"])
-                
-                # Remove status if older than 24 hours
-                if time_diff_in_seconds(current_time, last_seen) > 86400:  # 24 hours
-                    frappe.cache().delete_value(cache_key)
-                    cleaned_count += 1
-        
-        print(f"✅ Cleaned up {cleaned_count} expired user status entries")
-        
-    except Exception as e:
-        frappe.log_error(f"Error in cleanup_user_status_cache: {str(e)}")
-
-def update_user_activity_status():
-    """
-    Minute-wise update of user activity status
-    """
-    try:
-        # Update activity for users who have been active in chat recently
-        active_users_query = """
-            SELECT DISTINCT sender as user
-            FROM `tabChat Message`
-            WHERE timestamp >= DATE_SUB(NOW(), INTERVAL 15 MINUTE)
-            AND sender != 'Administrator'
-        """
-        
-        active_users = frappe.db.sql(active_users_query, as_dict=True)
-        
-        for user_data in active_users:
-            user = user_data["user"]
-            cache_key = f"chat_user_status_{user}"
-            
-            # Update last activity timestamp
-            status_data = frappe.cache().get_value(cache_key) or {}
-            status_data.update({
-                "last_seen": str(now_datetime()),
-                "status": status_data.get("status", "online"),
-                "user": user
-            })
-            
-            frappe.cache().set_value(cache_key, status_data, expires_in_sec=900)  # 15 minutes
-        
-    except Exception as e:
-        frappe.log_error(f"Error in update_user_activity_status: {str(e)}")
-
 # Additional utility functions for enhanced chat
 
 @frappe.whitelist()
@@ -889,22 +774,29 @@ def get_online_users_in_room(room_id):
         dict: List of online users
     """
     try:
-        # Get room members
-        room = frappe.get_doc("Chat Room", room_id)
-        members = [member.user for member in room.members]
+        members = get_room_members(room_id)
+        online = presence.get_online_room_members(room_id)
+        
+        user_info = {}
+        if online:
+            user_info = {
+                row.name: row
+                for row in frappe.get_all(
+                    "User",
+                    filters={"name": ["in", list(online)]},
+                    fields=["name", "full_name", "user_image"]
+                )
+            }
         
         online_users = []
-        for user in members:
-            status = get_user_online_status(user)
-            if status in ["online", "busy", "away"]:
-                user_info = frappe.db.get_value("User", user, 
-                                              ["full_name", "user_image"], as_dict=True)
-                online_users.append({
-                    "user": user,
-                    "full_name": user_info.get("full_name") or user,
-                    "user_image": user_info.get("user_image"),
-                    "status": status
-                })
+        for user, status in online.items():
+            info = user_info.get(user) or {}
+            online_users.append({
+                "user": user,
+                "full_name": info.get("full_name") or user,
+                "user_image": info.get("user_image"),
+                "status": status["status"]
+            })
         
         return {
             "success": True,
@@ -3,6 +3,9 @@ import frappe
 from frappe import _
 from frappe.utils import now_datetime
 
+from f_chat.APIs.notification_chatroom.chat_apis import typing_indicators
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import is_member
+
 @frappe.whitelist()
 def join_chat_room(room_id):
     """
@@ -129,25 +132,12 @@ def send_typing_indicator(room_id, is_typing):
         current_user = frappe.session.user
         
         # Verify user is member of the room
-        room = frappe.get_doc("Chat Room", room_id)
-        permissions = room.get_member_permissions(current_user)
-        
-        if not permissions["is_member"]:
+        if not is_member(room_id, current_user):
             frappe.throw("You are not a member of this chat room")
             
-        # Send typing indicator to other members
-        room_channel = f"chat_room_{room_id}"
-        frappe.publish_realtime(
-            event="typing_indicator",
-            message={
-                "user": current_user,
-                "room_id": room_id,
-                "is_typing": bool(int(is_typing)),
-                "timestamp": str(now_datetime())
-            },
-            user=[member.user for member in room.members if member.user != current_user],
-            room=room_channel
-        )
+        # Aggregated `typing_users` events go to the room (see typing_indicators.py)
+        if typing_indicators.is_typing_enabled():
+            typing_indicators.set_typing(room_id, current_user, bool(int(is_typing)))
         
         return {
             "success": True,
@@ -1,21 +1,25 @@
 # -*- coding: utf-8 -*-
 # f_chat/APIs/notification_chatroom/chat_apis/realtime_events_fixed.py
-# Fixed realtime events - Uses Chat User Activity instead of User doctype
+# Fixed realtime events - status lives in the Redis presence service
+# (see presence.py) and is synced to Chat User Activity by cleanup_stale_users
 
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, get_datetime
-from datetime import timedelta
+from frappe.utils import now_datetime, get_fullname, sbool
 import json
 
+from f_chat.APIs.notification_chatroom.chat_apis import presence, typing_indicators
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import is_member
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import track_job_run
+
 # ============================================================================
-# USER STATUS MANAGEMENT (FIXED - Uses Chat User Activity)
+# USER STATUS MANAGEMENT (Redis presence, persisted to Chat User Activity)
 # ============================================================================
 
 @frappe.whitelist()
 def update_user_status(status="online"):
     """
-    Update user online/offline status using Chat User Activity
+    Update user online/offline status in the presence service
     
     Args:
         status (str): online, away, busy, offline
@@ -26,52 +30,8 @@ def update_user_status(status="online"):
     try:
         user = frappe.session.user
         
-        # Get or create Chat User Activity record
-        activity_name = frappe.db.get_value(
-            "Chat User Activity",
-            {"user": user},
-            "name"
-        )
-        
-        if activity_name:
-            # Update existing record using db.set_value to avoid locking issues
-            frappe.db.set_value(
-                "Chat User Activity",
-                activity_name,
-                {
-                    "chat_status": status,
-                    "is_online": 1 if status == "online" else 0,
-                    "last_activity": now_datetime(),
-                    "last_seen": now_datetime() if status != "offline" else None
-                },
-                update_modified=False  # Don't update modified to reduce conflicts
-            )
-        else:
-            # Create new record
-            user_full_name = frappe.db.get_value("User", user, "full_name")
-            activity_doc = frappe.get_doc({
-                "doctype": "Chat User Activity",
-                "user": user,
-                "full_name": user_full_name,
-                "chat_status": status,
-                "is_online": 1 if status == "online" else 0,
-                "last_activity": now_datetime(),
-                "last_seen": now_datetime()
-            })
-            activity_doc.insert(ignore_permissions=True, ignore_mandatory=True)
-        
-        frappe.db.commit()
-        
-        # Broadcast status change to all users
-        frappe.publish_realtime(
-            event="user_status_changed",
-            message={
-                "user": user,
-                "status": status,
-                "timestamp": str(now_datetime())
-            },
-            user="all"  # Broadcast to all connected users
-        )
+        # Transitions are broadcast (coalesced) to users sharing a room
+        previous_status, status = presence.set_status(user, status)
         
         return {
             "success": True,
@@ -90,7 +50,7 @@ def update_user_status(status="online"):
 @frappe.whitelist()
 def get_user_status(user=None):
     """
-    Get user online/offline status from Chat User Activity
+    Get user online/offline status from the presence service
     
     Args:
         user (str): User email (optional, defaults to current user)
@@ -102,32 +62,16 @@ def get_user_status(user=None):
         if not user:
             user = frappe.session.user
         
-        activity = frappe.db.get_value(
-            "Chat User Activity",
-            {"user": user},
-            ["chat_status", "is_online", "last_seen", "last_activity", "full_name"],
-            as_dict=True
-        )
-        
-        if not activity:
-            # Return default offline status if no activity record
-            return {
-                "success": True,
-                "user": user,
-                "status": "offline",
-                "is_online": 0,
-                "last_seen": None,
-                "last_activity": None
-            }
+        status = presence.get_presence([user])[user]
         
         return {
             "success": True,
             "user": user,
-            "status": activity.chat_status,
-            "is_online": activity.is_online,
-            "last_seen": activity.last_seen,
-            "last_activity": activity.last_activity,
-            "full_name": activity.full_name
+            "status": status["status"],
+            "is_online": status["is_online"],
+            "last_seen": status["last_seen"],
+            "last_activity": status["last_activity"],
+            "full_name": get_fullname(user)
         }
         
     except Exception as e:
@@ -141,21 +85,29 @@ def get_user_status(user=None):
 @frappe.whitelist()
 def get_online_users():
     """
-    Get list of all currently online users from Chat User Activity
+    Get list of all currently online users from the presence service
     
     Returns:
         dict: List of online users
     """
     try:
-        online_users = frappe.db.get_all(
-            "Chat User Activity",
-            filters={
-                "is_online": 1,
-                "chat_status": ["!=", "offline"]
-            },
-            fields=["user", "full_name", "chat_status", "last_activity"],
-            order_by="last_activity desc"
-        )
+        online = presence.get_online_users()
+        
+        full_names = {}
+        if online:
+            full_names = dict(frappe.db.sql("""
+                SELECT name, full_name FROM `tabUser` WHERE name IN %(users)s
+            """, {"users": tuple(online)}))
+        
+        online_users = [
+            {
+                "user": user,
+                "full_name": full_names.get(user) or user,
+                "chat_status": status["status"],
+                "last_activity": status["last_activity"]
+            }
+            for user, status in online.items()
+        ]
         
         return {
             "success": True,
@@ -175,22 +127,13 @@ def get_online_users():
 def heartbeat():
     """
     Client heartbeat to keep user status active
-    Updates last_activity timestamp to show user is still active
+    Only touches Redis; the database is synced by the presence cron
     
     Returns:
         dict: Success response
     """
     try:
-        user = frappe.session.user
-        
-        # Only update last_activity timestamp
-        frappe.db.sql("""
-            UPDATE `tabChat User Activity`
-            SET last_activity = %s
-            WHERE user = %s
-        """, (now_datetime(), user))
-        
-        frappe.db.commit()
+        presence.touch(frappe.session.user)
         
         return {
             "success": True,
@@ -206,13 +149,16 @@ def heartbeat():
 
 
 # ============================================================================
-# TYPING INDICATORS (FIXED - Uses Chat User Activity)
+# TYPING INDICATORS (Redis only - see typing_indicators.py)
 # ============================================================================
 
 @frappe.whitelist()
 def user_typing(room_id, is_typing=True):
     """
-    Broadcast typing indicator for a user in a room
+    Record a typing indicator for a user in a room
+    
+    The room receives one aggregated `typing_users` event per burst
+    instead of one event per keystroke.
     
     Args:
         room_id (str): Chat Room ID
@@ -223,47 +169,21 @@ def user_typing(room_id, is_typing=True):
     """
     try:
         user = frappe.session.user
+        is_typing = sbool(is_typing)
         
-        # Update Chat User Activity with typing status
-        activity_name = frappe.db.get_value(
-            "Chat User Activity",
-            {"user": user},
-            "name"
-        )
+        if not typing_indicators.is_typing_enabled():
+            return {
+                "success": True,
+                "is_typing": False
+            }
         
-        if activity_name:
-            if is_typing:
-                # Set typing_in_room when user starts typing
-                frappe.db.set_value(
-                    "Chat User Activity",
-                    activity_name,
-                    "typing_in_room",
-                    room_id,
-                    update_modified=False
-                )
-            else:
-                # Clear typing_in_room when user stops typing
-                frappe.db.set_value(
-                    "Chat User Activity",
-                    activity_name,
-                    "typing_in_room",
-                    None,
-                    update_modified=False
-                )
-            
-            frappe.db.commit()
+        if not is_member(room_id, user):
+            return {
+                "success": False,
+                "error": "You are not a member of this room"
+            }
         
-        # Broadcast typing indicator to room
-        frappe.publish_realtime(
-            event="user_typing",
-            message={
-                "user": user,
-                "room_id": room_id,
-                "is_typing": is_typing,
-                "timestamp": str(now_datetime())
-            },
-            room=f"chat_room_{room_id}"
-        )
+        typing_indicators.set_typing(room_id, user, is_typing)
         
         return {
             "success": True,
@@ -290,11 +210,10 @@ def get_typing_users(room_id):
         dict: List of typing users
     """
     try:
-        typing_users = frappe.db.get_all(
-            "Chat User Activity",
-            filters={"typing_in_room": room_id},
-            fields=["user", "full_name"]
-        )
+        typing_users = [
+            {"user": user, "full_name": get_fullname(user)}
+            for user in typing_indicators.get_typing_users(room_id)
+        ]
         
         return {
             "success": True,
@@ -328,35 +247,14 @@ def join_room(room_id):
         user = frappe.session.user
         
         # Verify user is member of room
-        is_member = frappe.db.exists(
-            "Chat Room Member",
-            {"parent": room_id, "user": user}
-        )
-        
-        if not is_member:
+        if not is_member(room_id, user):
             return {
                 "success": False,
                 "error": "You are not a member of this room"
             }
         
-        # Update active room in Chat User Activity
-        activity_name = frappe.db.get_value(
-            "Chat User Activity",
-            {"user": user},
-            "name"
-        )
-        
-        if activity_name:
-            frappe.db.set_value(
-                "Chat User Activity",
-                activity_name,
-                {
-                    "active_room": room_id,
-                    "last_activity": now_datetime()
-                },
-                update_modified=False
-            )
-            frappe.db.commit()
+        presence.touch(user)
+        presence.set_active_room(user, room_id)
         
         # Subscribe to room's realtime events
         frappe.publish_realtime(
@@ -396,25 +294,12 @@ def leave_room(room_id):
     try:
         user = frappe.session.user
         
-        # Clear active room in Chat User Activity
-        activity_name = frappe.db.get_value(
-            "Chat User Activity",
-            {"user": user, "active_room": room_id},
-            "name"
-        )
+        presence.touch(user)
+        if presence.get_presence([user])[user]["active_room"] == room_id:
+            presence.set_active_room(user, None)
         
-        if activity_name:
-            frappe.db.set_value(
-                "Chat User Activity",
-                activity_name,
-                {
-                    "active_room": None,
-                    "typing_in_room": None,  # Also clear typing status
-                    "last_activity": now_datetime()
-                },
-                update_modified=False
-            )
-            frappe.db.commit()
+        # Also clear typing status
+        typing_indicators.set_typing(room_id, user, False)
         
         # Broadcast user left
         frappe.publish_realtime(
@@ -451,14 +336,23 @@ def get_room_active_users(room_id):
         dict: List of active users
     """
     try:
-        active_users = frappe.db.get_all(
-            "Chat User Activity",
-            filters={
-                "active_room": room_id,
-                "is_online": 1
-            },
-            fields=["user", "full_name", "chat_status"]
-        )
+        online = presence.get_online_room_members(room_id)
+        in_room = [user for user, status in online.items() if status["active_room"] == room_id]
+        
+        full_names = {}
+        if in_room:
+            full_names = dict(frappe.db.sql("""
+                SELECT name, full_name FROM `tabUser` WHERE name IN %(users)s
+            """, {"users": tuple(in_room)}))
+        
+        active_users = [
+            {
+                "user": user,
+                "full_name": full_names.get(user) or user,
+                "chat_status": online[user]["status"]
+            }
+            for user in in_room
+        ]
         
         return {
             "success": True,
@@ -480,26 +374,22 @@ def get_room_active_users(room_id):
 def cleanup_stale_users():
     """
     Background job to mark users as offline if they haven't sent heartbeat
+    and sync changed presence to Chat User Activity
     Run this as a scheduled job every 5-10 minutes
     """
-    try:
-        # Mark users as offline if no activity in last 10 minutes
-        stale_threshold = get_datetime() - timedelta(minutes=10)
+    with track_job_run("f_chat.APIs.notification_chatroom.chat_apis.realtime_events_fixed.cleanup_stale_users") as run:
+        try:
+            # Expire heartbeats older than presence.PRESENCE_TIMEOUT (10 minutes)
+            offline_users = presence.sweep_stale_presence()
         
-        frappe.db.sql("""
-            UPDATE `tabChat User Activity`
-            SET chat_status = 'offline',
-                is_online = 0,
-                active_room = NULL,
-                typing_in_room = NULL
-            WHERE last_activity < %s
-            AND is_online = 1
-        """, (stale_threshold,))
+            # Write users whose presence changed since the last run
+            run.rows = len(offline_users) + presence.persist_presence()
         
-        frappe.db.commit()
+            frappe.db.commit()
         
-    except Exception as e:
-        frappe.log_error(f"Error in cleanup_stale_users: {str(e)}", "Cleanup Stale Users Error")
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in cleanup_stale_users: {str(e)}", "Cleanup Stale Users Error")
 
 
 # ============================================================================
@@ -0,0 +1,39 @@
+# f_chat/APIs/notification_chatroom/chat_apis/redis_store.py
+# Small helpers shared by the Redis-backed chat indexes and services
+
+import frappe
+
+
+def make_key(*parts):
+    """
+    Build a site-scoped Redis key from its parts
+
+    Args:
+        *parts: Key segments, e.g. ("chat_user_rooms", user)
+
+    Returns:
+        bytes: Key prefixed with the site namespace
+    """
+    return frappe.cache().make_key(":".join(str(part) for part in parts))
+
+
+def pipeline(transaction=False):
+    """
+    Get a raw Redis pipeline
+
+    The pipeline bypasses RedisWrapper's pickling and key prefixing, so keys
+    passed to it must come from make_key().
+    """
+    return frappe.cache().pipeline(transaction=transaction)
+
+
+def decode(value):
+    """Decode a raw Redis value to str (None stays None)"""
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+def decode_set(values):
+    """Decode a raw Redis set/list reply to a set of str"""
+    return {decode(value) for value in values or ()}
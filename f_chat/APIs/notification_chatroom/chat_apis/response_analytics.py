@@ -0,0 +1,255 @@
+# f_chat/APIs/notification_chatroom/chat_apis/response_analytics.py
+# Response-time and activity-heatmap metrics computed with NumPy
+#
+# A room's messages for the period are read in keyset chunks over the
+# (chat_room, timestamp, name) index into a columnar snapshot:
+#   ts        float64  wall-clock seconds since 1970-01-01 (site time, no tz shift)
+#   sender    int32    sender code (index into `senders`)
+#   parent    int64    snapshot index of the replied-to message, -1 if none/outside
+# Every metric is then a handful of vector operations over those arrays.
+# Results are cached per room and period for CACHE_TTL seconds.
+
+import frappe
+import numpy as np
+from frappe.utils import add_days, get_datetime, now_datetime
+
+CHUNK_SIZE = 5000
+CACHE_TTL = 600
+CONVERSATION_GAP = 30 * 60  # silence after which a message opens a new conversation
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30, "quarter": 90}
+EXCLUDED_TYPES = ("System",)
+
+
+def _cache_key(room_id, period):
+    return f"chat_response_analytics:{room_id}:{period}"
+
+
+def load_snapshot(room_id, from_date, to_date, chunk_size=CHUNK_SIZE):
+    """
+    Read a room's messages into column arrays, one keyset chunk at a time
+
+    Returns:
+        dict: ts, sender, parent arrays plus the senders lookup
+    """
+    values = {
+        "room_id": room_id,
+        "from_date": get_datetime(from_date),
+        "to_date": get_datetime(to_date),
+        "excluded": EXCLUDED_TYPES,
+        "limit": chunk_size,
+    }
+
+    names, senders, seconds, replies = [], [], [], []
+    position = None
+    while True:
+        seek = ""
+        if position:
+            seek = "AND (timestamp > %(last_timestamp)s OR (timestamp = %(last_timestamp)s AND name > %(last_name)s))"
+            values["last_timestamp"], values["last_name"] = position
+
+        rows = frappe.db.sql(f"""
+            SELECT name, COALESCE(sender, '') AS sender, timestamp,
+                TIMESTAMPDIFF(SECOND, '1970-01-01', timestamp) AS seconds,
+                COALESCE(reply_to_message, '') AS reply_to
+            FROM `tabChat Message`
+            WHERE chat_room = %(room_id)s
+                AND timestamp >= %(from_date)s AND timestamp <= %(to_date)s
+                AND is_deleted = 0
+                AND message_type NOT IN %(excluded)s
+                {seek}
+            ORDER BY timestamp ASC, name ASC
+            LIMIT %(limit)s
+        """, values)
+
+        if not rows:
+            break
+
+        position = (rows[-1][2], rows[-1][0])
+        chunk_names, chunk_senders, _timestamps, chunk_seconds, chunk_replies = zip(*rows, strict=True)
+        names.append(np.array(chunk_names, dtype=object))
+        senders.append(np.array(chunk_senders, dtype=object))
+        seconds.append(np.array(chunk_seconds, dtype=np.float64))
+        replies.append(np.array(chunk_replies, dtype=object))
+
+        if len(rows) < chunk_size:
+            break
+
+    if not names:
+        return {
+            "ts": np.empty(0, dtype=np.float64),
+            "sender": np.empty(0, dtype=np.int32),
+            "parent": np.empty(0, dtype=np.int64),
+            "senders": np.empty(0, dtype=object),
+        }
+
+    names = np.concatenate(names)
+    sender_lookup, sender_codes = np.unique(np.concatenate(senders).astype(str), return_inverse=True)
+
+    return {
+        "ts": np.concatenate(seconds),
+        "sender": sender_codes.astype(np.int32),
+        "parent": _resolve_parents(names, np.concatenate(replies)),
+        "senders": sender_lookup,
+    }
+
+
+def _resolve_parents(names, replies):
+    """Snapshot index of each message's reply target (-1 if none or before the period)"""
+    order = np.argsort(names)
+    sorted_names = names[order]
+    positions = np.searchsorted(sorted_names, replies)
+    positions = np.minimum(positions, len(names) - 1)
+
+    found = (replies != "") & (sorted_names[positions] == replies)
+    return np.where(found, order[positions], -1).astype(np.int64)
+
+
+def _summary(seconds):
+    """Distribution summary of a latency array (seconds)"""
+    if not len(seconds):
+        return {"count": 0, "median": None, "p90": None, "mean": None}
+
+    median, p90 = np.percentile(seconds, [50, 90])
+    return {
+        "count": len(seconds),
+        "median": round(float(median), 1),
+        "p90": round(float(p90), 1),
+        "mean": round(float(seconds.mean()), 1),
+    }
+
+
+def first_response_times(ts, sender, gap=CONVERSATION_GAP):
+    """
+    Time from each conversation opener to the first message by someone else
+
+    A message opens a conversation when it follows `gap` seconds of silence
+    (or is the first in the snapshot). Consecutive messages by one sender form
+    a run, so the first reply by someone else is the start of the next run.
+    That reply only answers the opener if it comes before the next opener;
+    a run that starts after another silence opens a conversation of its own.
+
+    Returns:
+        tuple: (latencies of answered openers, number of unanswered openers)
+    """
+    count = len(ts)
+    if count == 0:
+        return np.empty(0), 0
+
+    openers = np.flatnonzero(np.r_[True, np.diff(ts) >= gap])
+    next_openers = np.r_[openers[1:], count]
+
+    run_starts = np.flatnonzero(np.r_[True, sender[1:] != sender[:-1]])
+    run_ids = np.cumsum(np.r_[True, sender[1:] != sender[:-1]]) - 1
+    next_run = run_ids[openers] + 1
+
+    # The end of the snapshot stands in for a missing next run
+    responders = np.r_[run_starts, count][next_run]
+    answered = responders < next_openers
+    latencies = ts[responders[answered]] - ts[openers[answered]]
+
+    return latencies, int((~answered).sum())
+
+
+def reply_latencies(ts, sender, parent):
+    """Seconds between a message and an explicit reply to it by someone else"""
+    replies = np.flatnonzero(parent >= 0)
+    parents = parent[replies]
+    others = sender[replies] != sender[parents]
+    return ts[replies[others]] - ts[parents[others]]
+
+
+def activity_heatmap(ts):
+    """
+    Message counts by weekday (Monday first) and hour of day
+
+    Returns:
+        ndarray: 7 x 24 counts
+    """
+    if not len(ts):
+        return np.zeros((7, 24), dtype=np.int64)
+
+    seconds = ts.astype(np.int64)
+    weekday = (seconds // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+    hour = (seconds // 3600) % 24
+    return np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+
+
+def responder_medians(ts, sender, senders, limit=10):
+    """Median hand-off latency per responder (previous speaker's message to theirs), busiest first"""
+    count = len(ts)
+    if count < 2:
+        return []
+
+    changes = np.flatnonzero(sender[1:] != sender[:-1]) + 1
+    handoffs = changes[(ts[changes] - ts[changes - 1]) < CONVERSATION_GAP]
+    latency = ts[handoffs] - ts[handoffs - 1]
+    responder = sender[handoffs]
+
+    order = np.argsort(responder, kind="stable")
+    responder, latency = responder[order], latency[order]
+    codes, starts, counts = np.unique(responder, return_index=True, return_counts=True)
+
+    results = [
+        {
+            "user": str(senders[code]),
+            "responses": int(number),
+            "median": round(float(np.median(latency[start:start + number])), 1),
+        }
+        for code, start, number in zip(codes, starts, counts, strict=True)
+    ]
+    results.sort(key=lambda entry: entry["responses"], reverse=True)
+    return results[:limit]
+
+
+def compute_metrics(snapshot):
+    """All response and activity metrics for one snapshot"""
+    ts, sender = snapshot["ts"], snapshot["sender"]
+
+    latencies, unanswered = first_response_times(ts, sender)
+    heatmap = activity_heatmap(ts)
+
+    return {
+        "messages": len(ts),
+        "participants": len(snapshot["senders"]),
+        "first_response": dict(_summary(latencies), unanswered=unanswered),
+        "reply_latency": _summary(reply_latencies(ts, sender, snapshot["parent"])),
+        "responders": responder_medians(ts, sender, snapshot["senders"]),
+        "heatmap": {
+            "weekdays": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+            "counts": heatmap.tolist(),
+            "by_hour": heatmap.sum(axis=0).tolist(),
+            "by_weekday": heatmap.sum(axis=1).tolist(),
+        },
+    }
+
+
+def get_room_metrics(room_id, period="month"):
+    """
+    Response times and activity heatmap for a room (cached per room and period)
+
+    Args:
+        room_id (str): Chat Room ID
+        period (str): day, week, month or quarter
+
+    Returns:
+        dict: Metrics with the period's start and end
+    """
+    if period not in PERIOD_DAYS:
+        period = "month"
+
+    cached = frappe.cache().get_value(_cache_key(room_id, period))
+    if cached:
+        return cached
+
+    end_date = now_datetime()
+    start_date = add_days(end_date, -PERIOD_DAYS[period])
+
+    metrics = compute_metrics(load_snapshot(room_id, start_date, end_date))
+    metrics.update({
+        "period": period,
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+    })
+
+    frappe.cache().set_value(_cache_key(room_id, period), metrics, expires_in_sec=CACHE_TTL)
+    return metrics
@@ -4,6 +4,8 @@ from frappe import _
 from frappe.utils import now_datetime, cint
 import json
 
+from f_chat.APIs.notification_chatroom.chat_apis.user_search import search_users_for_chat_room
+
 @frappe.whitelist()
 def check_room_permissions(room_id, user_id=None):
     """
@@ -720,4 +722,21 @@ def get_user_room_role(room_id, user_id=None):
         return {
             "success": False,
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+
+@frappe.whitelist()
+def search_users_for_room(search_term="", room_id=None, exclude_existing=True):
+    """
+    Type-ahead search for the member picker
+    Same index and response as user_search.search_users_for_chat_room
+    
+    Args:
+        search_term (str): What has been typed so far
+        room_id (str): Room whose members are left out
+        exclude_existing (bool): Whether to exclude existing room members
+        
+    Returns:
+        dict: Success status and user data
+    """
+    return search_users_for_chat_room(search_term, room_id, exclude_existing)
@@ -4,24 +4,35 @@ from frappe import _
 from frappe.utils import now_datetime, cint, get_datetime, add_days
 import json
 
+from f_chat.APIs.notification_chatroom.chat_apis import (
+    engagement_sketches,
+    message_export,
+    message_search,
+    response_analytics,
+)
+from f_chat.f_chat.doctype.chat_activity_rollup.chat_activity_rollup import BUCKET_FORMATS
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import is_member
+
 @frappe.whitelist()
 def search_messages(room_id, search_term, page=1, page_size=20, message_type=None, 
-                   from_date=None, to_date=None, sender=None):
+                   from_date=None, to_date=None, sender=None, sort="relevance", month=None):
     """
     Search messages in a chat room
     
     Args:
         room_id (str): Chat room ID
-        search_term (str): Search term
+        search_term (str): Words and "quoted phrases"
         page (int): Page number
         page_size (int): Messages per page
         message_type (str): Filter by message type
         from_date (str): Start date for search
         to_date (str): End date for search
         sender (str): Filter by sender
+        sort (str): relevance or recent
+        month (str): Filter by month (YYYY-MM)
         
     Returns:
-        dict: Search results with pagination
+        dict: Search results with facets and pagination
     """
     try:
         current_user = frappe.session.user
@@ -30,102 +41,63 @@ def search_messages(room_id, search_term, page=1, page_size=20, message_type=Non
         offset = (page - 1) * page_size
         
         # Verify user is member of the room
-        room = frappe.get_doc("Chat Room", room_id)
-        permissions = room.get_member_permissions(current_user)
-        
-        if not permissions["is_member"]:
+        if not is_member(room_id, current_user):
             frappe.throw("You are not a member of this chat room")
             
-        # Build search conditions
-        conditions = [
-            "chat_room = %(room_id)s",
-            "is_deleted = 0"
-        ]
-        values = {"room_id": room_id}
-        
-        if search_term:
-            conditions.append("message_content LIKE %(search_term)s")
-            values["search_term"] = f"%{search_term}%"
-            
-        if message_type:
-            conditions.append("message_type = %(message_type)s")
-            values["message_type"] = message_type
-            
-        if from_date:
-            conditions.append("timestamp >= %(from_date)s")
-            values["from_date"] = get_datetime(from_date)
-            
-        if to_date:
-            conditions.append("timestamp <= %(to_date)s")
-            values["to_date"] = get_datetime(to_date)
-            
-        if sender:
-            conditions.append("sender = %(sender)s")
-            values["sender"] = sender
-            
-        where_clause = " AND ".join(conditions)
-        
-        # Get total count
-        count_query = f"""
-            SELECT COUNT(*) as total
-            FROM `tabChat Message`
-            WHERE {where_clause}
-        """
-        
-        total_count = frappe.db.sql(count_query, values, as_dict=True)[0].total
+        from_date = get_datetime(from_date) if from_date else None
+        to_date = get_datetime(to_date) if to_date else None
+        
+        messages, has_next, _terms = message_search.search(
+            current_user,
+            search_term,
+            room_id=room_id,
+            message_type=message_type,
+            from_date=from_date,
+            to_date=to_date,
+            sender=sender,
+            sort=sort,
+            limit=page_size,
+            offset=offset,
+            month=month
+        )
+        
+        facets = message_search.get_facets(
+            current_user,
+            search_term,
+            room_id=room_id,
+            from_date=from_date,
+            to_date=to_date,
+            filters={"sender": sender, "message_type": message_type, "month": month}
+        )
+        
+        # Attachments for the whole page in one query
+        attachments = {}
+        if messages:
+            for attachment in frappe.get_all(
+                "Chat Message Attachment",
+                filters={"parent": ["in", [message.name for message in messages]]},
+                fields=["parent", "file_name", "file_url", "file_type"]
+            ):
+                attachments.setdefault(attachment.pop("parent"), []).append(attachment)
         
-        # Get messages
-        query = f"""
-            SELECT 
-                name,
-                sender,
-                message_type,
-                message_content,
-                timestamp,
-                reply_to_message
-            FROM `tabChat Message`
-            WHERE {where_clause}
-            ORDER BY timestamp DESC
-            LIMIT %(limit)s OFFSET %(offset)s
-        """
-        
-        values.update({"limit": page_size, "offset": offset})
-        messages = frappe.db.sql(query, values, as_dict=True)
-        
-        # Add sender info and attachments
         for message in messages:
-            # Get sender info
-            sender_info = frappe.db.get_value(
-                "User",
-                message.sender,
-                ["full_name", "user_image"],
-                as_dict=True
-            )
-            message["sender_info"] = sender_info or {"full_name": message.sender}
-            
-            # Get attachments
-            message["attachments"] = frappe.get_all(
-                "Chat Message Attachment",
-                filters={"parent": message.name},
-                fields=["file_name", "file_url", "file_type"]
-            )
-            
+            message["sender_info"] = {
+                "full_name": message.pop("sender_name") or message.sender,
+                "user_image": message.pop("sender_image")
+            }
+            message["attachments"] = attachments.get(message.name, [])
             message["timestamp"] = str(message.timestamp)
             
-        # Pagination info
-        total_pages = (total_count + page_size - 1) // page_size
-        
         return {
             "success": True,
             "data": {
                 "messages": messages,
                 "search_term": search_term,
+                "facets": facets,
                 "pagination": {
-                    "total_count": total_count,
                     "page": page,
                     "page_size": page_size,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
+                    "has_next": has_next,
                     "has_prev": page > 1
                 }
             }
@@ -157,10 +129,7 @@ def get_chat_analytics(room_id, period="week"):
         current_user = frappe.session.user
         
         # Verify user is member of the room
-        room = frappe.get_doc("Chat Room", room_id)
-        permissions = room.get_member_permissions(current_user)
-        
-        if not permissions["is_member"]:
+        if not is_member(room_id, current_user):
             frappe.throw("You are not a member of this chat room")
             
         # Calculate date range
@@ -174,98 +143,59 @@ def get_chat_analytics(room_id, period="week"):
         else:
             start_date = add_days(end_date, -7)  # Default to week
             
-        # Get message statistics
-        message_stats = frappe.db.sql("""
-            SELECT 
-                COUNT(*) as total_messages,
-                COUNT(DISTINCT sender) as active_users,
-                AVG(CHAR_LENGTH(message_content)) as avg_message_length
-            FROM `tabChat Message`
-            WHERE chat_room = %(room_id)s 
-                AND timestamp >= %(start_date)s 
-                AND timestamp <= %(end_date)s
-                AND is_deleted = 0
-        """, {
-            "room_id": room_id,
-            "start_date": start_date,
-            "end_date": end_date
-        }, as_dict=True)[0]
-        
-        # Get message count by type
-        message_by_type = frappe.db.sql("""
+        # One read of the pre-aggregated buckets (hourly for a day, daily otherwise)
+        granularity = "Hour" if period == "day" else "Day"
+        buckets = frappe.db.sql("""
             SELECT 
+                period_start,
+                sender,
                 message_type,
-                COUNT(*) as count
-            FROM `tabChat Message`
+                message_count,
+                total_length,
+                messages_with_files,
+                file_count,
+                file_size
+            FROM `tabChat Activity Rollup`
             WHERE chat_room = %(room_id)s 
-                AND timestamp >= %(start_date)s 
-                AND timestamp <= %(end_date)s
-                AND is_deleted = 0
-            GROUP BY message_type
+                AND granularity = %(granularity)s
+                AND period_start >= %(start_date)s 
+                AND period_start <= %(end_date)s
         """, {
             "room_id": room_id,
-            "start_date": start_date,
+            "granularity": granularity,
+            "start_date": start_date.strftime(BUCKET_FORMATS[granularity]),
             "end_date": end_date
         }, as_dict=True)
         
-        # Get most active users
-        most_active_users = frappe.db.sql("""
-            SELECT 
-                cm.sender,
-                COUNT(*) as message_count,
-                u.full_name
-            FROM `tabChat Message` cm
-            LEFT JOIN `tabUser` u ON cm.sender = u.name
-            WHERE cm.chat_room = %(room_id)s 
-                AND cm.timestamp >= %(start_date)s 
-                AND cm.timestamp <= %(end_date)s
-                AND cm.is_deleted = 0
-            GROUP BY cm.sender
-            ORDER BY message_count DESC
-            LIMIT 10
-        """, {
-            "room_id": room_id,
-            "start_date": start_date,
-            "end_date": end_date
-        }, as_dict=True)
+        total_messages = total_length = 0
+        by_type, by_sender, by_date = {}, {}, {}
+        file_stats = {"messages_with_files": 0, "total_files": 0, "total_file_size": 0}
         
-        # Get daily message counts for chart
-        daily_stats = frappe.db.sql("""
-            SELECT 
-                DATE(timestamp) as date,
-                COUNT(*) as message_count,
-                COUNT(DISTINCT sender) as unique_senders
-            FROM `tabChat Message`
-            WHERE chat_room = %(room_id)s 
-                AND timestamp >= %(start_date)s 
-                AND timestamp <= %(end_date)s
-                AND is_deleted = 0
-            GROUP BY DATE(timestamp)
-            ORDER BY date
-        """, {
-            "room_id": room_id,
-            "start_date": start_date,
-            "end_date": end_date
-        }, as_dict=True)
-        
-        # Get file sharing stats
-        file_stats = frappe.db.sql("""
-            SELECT 
-                COUNT(DISTINCT cm.name) as messages_with_files,
-                COUNT(cma.name) as total_files,
-                SUM(cma.file_size) as total_file_size
-            FROM `tabChat Message` cm
-            LEFT JOIN `tabChat Message Attachment` cma ON cm.name = cma.parent
-            WHERE cm.chat_room = %(room_id)s 
-                AND cm.timestamp >= %(start_date)s 
-                AND cm.timestamp <= %(end_date)s
-                AND cm.is_deleted = 0
-                AND cma.name IS NOT NULL
-        """, {
-            "room_id": room_id,
-            "start_date": start_date,
-            "end_date": end_date
-        }, as_dict=True)[0]
+        for bucket in buckets:
+            date = str(bucket.period_start.date())
+            
+            total_messages += bucket.message_count
+            total_length += bucket.total_length
+            by_type[bucket.message_type] = by_type.get(bucket.message_type, 0) + bucket.message_count
+            by_sender[bucket.sender] = by_sender.get(bucket.sender, 0) + bucket.message_count
+            by_date[date] = by_date.get(date, 0) + bucket.message_count
+            
+            file_stats["messages_with_files"] += bucket.messages_with_files
+            file_stats["total_files"] += bucket.file_count
+            file_stats["total_file_size"] += bucket.file_size
+            
+        # Distinct users come from the per-day HyperLogLog sketches (approximate)
+        senders_by_date = engagement_sketches.daily_counts(
+            room_id, engagement_sketches.SENDERS, start_date, end_date
+        )
+        
+        top_senders = sorted(by_sender.items(), key=lambda item: item[1], reverse=True)[:10]
+        full_names = dict(frappe.get_all(
+            "User",
+            filters={"name": ["in", [sender for sender, _count in top_senders]]},
+            fields=["name", "full_name"],
+            as_list=True
+        )) if top_senders else {}
         
         return {
             "success": True,
@@ -274,24 +204,31 @@ def get_chat_analytics(room_id, period="week"):
                 "start_date": str(start_date),
                 "end_date": str(end_date),
                 "message_stats": {
-                    "total_messages": message_stats.total_messages or 0,
-                    "active_users": message_stats.active_users or 0,
-                    "avg_message_length": round(message_stats.avg_message_length or 0, 2)
+                    "total_messages": total_messages,
+                    "active_users": engagement_sketches.count_distinct(
+                        room_id, engagement_sketches.SENDERS, start_date, end_date
+                    ),
+                    "active_readers": engagement_sketches.count_distinct(
+                        room_id, engagement_sketches.READERS, start_date, end_date
+                    ),
+                    "avg_message_length": round(total_length / total_messages, 2) if total_messages else 0
                 },
-                "message_by_type": message_by_type,
-                "most_active_users": most_active_users,
+                "message_by_type": [
+                    {"message_type": message_type, "count": count}
+                    for message_type, count in by_type.items()
+                ],
+                "most_active_users": [
+                    {"sender": sender, "message_count": count, "full_name": full_names.get(sender)}
+                    for sender, count in top_senders
+                ],
                 "daily_stats": [
                     {
-                        "date": str(stat.date),
-                        "message_count": stat.message_count,
-                        "unique_senders": stat.unique_senders
-                    } for stat in daily_stats
+                        "date": date,
+                        "message_count": by_date[date],
+                        "unique_senders": senders_by_date.get(date, 0)
+                    } for date in sorted(by_date)
                 ],
-                "file_stats": {
-                    "messages_with_files": file_stats.messages_with_files or 0,
-                    "total_files": file_stats.total_files or 0,
-                    "total_file_size": file_stats.total_file_size or 0
-                }
+                "file_stats": file_stats
             }
         }
         
@@ -306,17 +243,113 @@ def get_chat_analytics(room_id, period="week"):
         }
 
 @frappe.whitelist()
-def get_global_chat_search(search_term, page=1, page_size=20):
+def get_room_engagement(room_id, days=90):
+    """
+    Distinct senders and readers of a room over a trailing window
+    
+    Counts are HyperLogLog estimates merged from per-day sketches.
+    
+    Args:
+        room_id (str): Chat room ID
+        days (int): Window length in days (up to a year)
+        
+    Returns:
+        dict: Window totals and per-day distinct senders/readers
+    """
+    try:
+        current_user = frappe.session.user
+        
+        if not is_member(room_id, current_user):
+            frappe.throw("You are not a member of this chat room")
+            
+        days = min(max(cint(days) or 90, 1), 365)
+        end_date = now_datetime()
+        start_date = add_days(end_date, -(days - 1))
+        
+        senders = engagement_sketches.daily_counts(room_id, engagement_sketches.SENDERS, start_date, end_date)
+        readers = engagement_sketches.daily_counts(room_id, engagement_sketches.READERS, start_date, end_date)
+        
+        return {
+            "success": True,
+            "data": {
+                "days": days,
+                "start_date": str(start_date.date()),
+                "end_date": str(end_date.date()),
+                "active_senders": engagement_sketches.count_distinct(
+                    room_id, engagement_sketches.SENDERS, start_date, end_date
+                ),
+                "active_readers": engagement_sketches.count_distinct(
+                    room_id, engagement_sketches.READERS, start_date, end_date
+                ),
+                "daily": [
+                    {"date": date, "unique_senders": senders[date], "unique_readers": readers[date]}
+                    for date in senders
+                ]
+            }
+        }
+        
+    except Exception as e:
+        frappe.log_error(f"Error in get_room_engagement: {str(e)}")
+        return {
+            "success": False,
+            "error": {
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            }
+        }
+
+@frappe.whitelist()
+def get_response_analytics(room_id, period="month"):
+    """
+    Get response times and an activity heatmap for a room
+    
+    Args:
+        room_id (str): Chat room ID
+        period (str): Analysis period (day, week, month, quarter)
+        
+    Returns:
+        dict: First-response and reply latency (seconds), top responders
+            and weekday x hour message counts
+    """
+    try:
+        current_user = frappe.session.user
+        
+        if not is_member(room_id, current_user):
+            frappe.throw("You are not a member of this chat room")
+            
+        return {
+            "success": True,
+            "data": response_analytics.get_room_metrics(room_id, period)
+        }
+        
+    except Exception as e:
+        frappe.log_error(f"Error in get_response_analytics: {str(e)}")
+        return {
+            "success": False,
+            "error": {
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            }
+        }
+
+@frappe.whitelist()
+def get_global_chat_search(search_term, page=1, page_size=20, sort="relevance",
+                           room_id=None, sender=None, message_type=None, month=None):
     """
     Search across all accessible chat rooms
     
     Args:
-        search_term (str): Search term
+        search_term (str): Words and "quoted phrases"
         page (int): Page number
         page_size (int): Results per page
+        sort (str): relevance or recent
+        room_id (str): Refine to a room
+        sender (str): Refine to a sender
+        message_type (str): Refine to a message type
+        month (str): Refine to a month (YYYY-MM)
         
     Returns:
-        dict: Global search results
+        dict: Global search results with facets
     """
     try:
         current_user = frappe.session.user
@@ -327,97 +360,44 @@ def get_global_chat_search(search_term, page=1, page_size=20):
         if not search_term:
             frappe.throw("Search term is required")
             
-        # Get rooms user is member of
-        user_rooms = frappe.db.sql("""
-            SELECT DISTINCT parent as room_id
-            FROM `tabChat Room Member`
-            WHERE user = %(user)s
-        """, {"user": current_user}, as_dict=True)
-        
-        if not user_rooms:
-            return {
-                "success": True,
-                "data": {
-                    "results": [],
-                    "pagination": {
-                        "total_count": 0,
-                        "page": page,
-                        "page_size": page_size,
-                        "total_pages": 0,
-                        "has_next": False,
-                        "has_prev": False
-                    }
-                }
+        # Membership is filtered inside the index query
+        results, has_next, _terms = message_search.search(
+            current_user,
+            search_term,
+            room_id=room_id,
+            message_type=message_type,
+            sender=sender,
+            sort=sort,
+            limit=page_size,
+            offset=offset,
+            month=month
+        )
+        
+        # Room is a facet here, so refining by it reuses the cached buckets
+        facets = message_search.get_facets(
+            current_user,
+            search_term,
+            filters={
+                "chat_room": room_id,
+                "sender": sender,
+                "message_type": message_type,
+                "month": month
             }
-            
-        room_ids = [room.room_id for room in user_rooms]
-        room_placeholders = ", ".join(["%s"] * len(room_ids))
+        )
         
-        # Search messages across user's rooms
-        query = f"""
-            SELECT 
-                cm.name,
-                cm.chat_room,
-                cm.sender,
-                cm.message_type,
-                cm.message_content,
-                cm.timestamp,
-                cr.room_name,
-                cr.room_type,
-                u.full_name as sender_name
-            FROM `tabChat Message` cm
-            LEFT JOIN `tabChat Room` cr ON cm.chat_room = cr.name
-            LEFT JOIN `tabUser` u ON cm.sender = u.name
-            WHERE cm.chat_room IN ({room_placeholders})
-                AND cm.message_content LIKE %(search_term)s
-                AND cm.is_deleted = 0
-            ORDER BY cm.timestamp DESC
-            LIMIT %(limit)s OFFSET %(offset)s
-        """
-        
-        values = room_ids + [f"%{search_term}%", page_size, offset]
-        results = frappe.db.sql(query, values, as_dict=True)
-        
-        # Get total count
-        count_query = f"""
-            SELECT COUNT(*) as total
-            FROM `tabChat Message` cm
-            WHERE cm.chat_room IN ({room_placeholders})
-                AND cm.message_content LIKE %(search_term)s
-                AND cm.is_deleted = 0
-        """
-        
-        count_values = room_ids + [f"%{search_term}%"]
-        total_count = frappe.db.sql(count_query, count_values, as_dict=True)[0].total
-        
-        # Format results
         for result in results:
             result["timestamp"] = str(result.timestamp)
             
-            # Highlight search term in message content
-            if result.message_content and search_term.lower() in result.message_content.lower():
-                highlighted = result.message_content.replace(
-                    search_term,
-                    f"<mark>{search_term}</mark>"
-                )
-                result["highlighted_content"] = highlighted
-            else:
-                result["highlighted_content"] = result.message_content
-                
-        # Pagination info
-        total_pages = (total_count + page_size - 1) // page_size
-        
         return {
             "success": True,
             "data": {
                 "results": results,
                 "search_term": search_term,
+                "facets": facets,
                 "pagination": {
-                    "total_count": total_count,
                     "page": page,
                     "page_size": page_size,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
+                    "has_next": has_next,
                     "has_prev": page > 1
                 }
             }
@@ -434,18 +414,22 @@ def get_global_chat_search(search_term, page=1, page_size=20):
         }
 
 @frappe.whitelist()
-def export_chat_messages(room_id, from_date=None, to_date=None, format_type="json"):
+def export_chat_messages(room_id, from_date=None, to_date=None, format_type="csv"):
     """
-    Export chat messages for a room
+    Queue an export of chat messages for a room
+    
+    The export runs in the background and is written to a private,
+    gzip-compressed File; poll get_export_status or listen for
+    `chat_export_progress` to get the download link.
     
     Args:
         room_id (str): Chat room ID
         from_date (str): Start date
         to_date (str): End date
-        format_type (str): Export format (json, csv)
+        format_type (str): Export format (csv, ndjson)
         
     Returns:
-        dict: Export data or file
+        dict: Export job
     """
     try:
         current_user = frappe.session.user
@@ -457,130 +441,60 @@ def export_chat_messages(room_id, from_date=None, to_date=None, format_type="jso
         if not permissions["is_admin"]:
             frappe.throw("Only admins can export chat messages")
             
-        # Build conditions
-        conditions = ["chat_room = %(room_id)s", "is_deleted = 0"]
-        values = {"room_id": room_id}
-        
-        if from_date:
-            conditions.append("timestamp >= %(from_date)s")
-            values["from_date"] = get_datetime(from_date)
-            
-        if to_date:
-            conditions.append("timestamp <= %(to_date)s")
-            values["to_date"] = get_datetime(to_date)
+        if format_type == "json":
+            format_type = "ndjson"
             
-        where_clause = " AND ".join(conditions)
+        job = message_export.start_export(
+            room_id,
+            current_user,
+            from_date=get_datetime(from_date) if from_date else None,
+            to_date=get_datetime(to_date) if to_date else None,
+            format_type=format_type
+        )
         
-        # Get messages
-        query = f"""
-            SELECT 
-                cm.name,
-                cm.sender,
-                cm.message_type,
-                cm.message_content,
-                cm.timestamp,
-                cm.is_edited,
-                cm.edit_timestamp,
-                u.full_name as sender_name
-            FROM `tabChat Message` cm
-            LEFT JOIN `tabUser` u ON cm.sender = u.name
-            WHERE {where_clause}
-            ORDER BY cm.timestamp ASC
-        """
-        
-        messages = frappe.db.sql(query, values, as_dict=True)
-        
-        # Add attachments and reactions
-        for message in messages:
-            # Get attachments
-            message["attachments"] = frappe.get_all(
-                "Chat Message Attachment",
-                filters={"parent": message.name},
-                fields=["file_name", "file_url", "file_type", "file_size"]
-            )
-            
-            # Get reactions
-            message["reactions"] = frappe.get_all(
-                "Chat Message Reaction",
-                filters={"parent": message.name},
-                fields=["user", "reaction_emoji", "timestamp"]
-            )
-            
-            # Format timestamps
-            message["timestamp"] = str(message.timestamp)
-            if message.edit_timestamp:
-                message["edit_timestamp"] = str(message.edit_timestamp)
-                
-        export_data = {
-            "room_info": {
-                "room_id": room.name,
-                "room_name": room.room_name,
-                "room_type": room.room_type,
-                "export_date": str(now_datetime()),
-                "exported_by": current_user,
-                "message_count": len(messages)
-            },
-            "messages": messages
+        return {
+            "success": True,
+            "data": job
         }
-        
-        if format_type == "csv":
-            # Convert to CSV format
-            import csv
-            import io
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write headers
-            writer.writerow([
-                "Timestamp", "Sender", "Sender Name", "Message Type", 
-                "Message Content", "Is Edited", "Edit Timestamp", "Attachments", "Reactions"
-            ])
             
-            # Write data
-            for message in messages:
-                attachments_str = "; ".join([att["file_name"] for att in message["attachments"]])
-                reactions_str = "; ".join([f"{r['user']}:{r['reaction_emoji']}" for r in message["reactions"]])
-                
-                writer.writerow([
-                    message["timestamp"],
-                    message["sender"],
-                    message["sender_name"] or "",
-                    message["message_type"],
-                    message["message_content"] or "",
-                    message["is_edited"],
-                    message["edit_timestamp"] or "",
-                    attachments_str,
-                    reactions_str
-                ])
-                
-            csv_content = output.getvalue()
-            output.close()
-            
-            return {
-                "success": True,
-                "data": {
-                    "format": "csv",
-                    "content": csv_content,
-                    "filename": f"chat_export_{room_id}_{now_datetime().strftime('%Y%m%d_%H%M%S')}.csv"
-                }
-            }
-        else:
-            # Return JSON format
-            return {
-                "success": True,
-                "data": {
-                    "format": "json",
-                    "content": export_data
-                }
+    except Exception as e:
+        frappe.log_error(f"Error in export_chat_messages: {str(e)}")
+        return {
+            "success": False,
+            "error": {
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
             }
+        }
+
+@frappe.whitelist()
+def get_export_status(job_id):
+    """
+    Get progress of a chat export
+    
+    Args:
+        job_id (str): Export job ID
+        
+    Returns:
+        dict: Status, processed/total messages and file_url once completed
+    """
+    try:
+        job = message_export.get_job(job_id)
+        
+        if not job or job["user"] != frappe.session.user:
+            frappe.throw("Export not found")
             
+        return {
+            "success": True,
+            "data": job
+        }
+        
     except Exception as e:
-        frappe.log_error(f"Error in export_chat_messages: {str(e)}")
+        frappe.log_error(f"Error in get_export_status: {str(e)}")
         return {
             "success": False,
             "error": {
                 "code": "INTERNAL_ERROR",
                 "message": str(e)
             }
-        }
\ No newline at end of file
+        }
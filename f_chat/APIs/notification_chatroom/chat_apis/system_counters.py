@@ -0,0 +1,269 @@
+# f_chat/APIs/notification_chatroom/chat_apis/system_counters.py
+# Live counters behind get_chat_system_stats
+#
+# Layout (all keys site-scoped):
+#   chat_stats                    HASH    total_messages, total_rooms (active rooms)
+#   chat_stats_users              HASH    user -> number of rooms they belong to
+#   chat_stats_messages:{date}    STRING  messages sent that day
+#   chat_stats_active:{date}      HLL     senders that day
+#   chat_stats_loaded             STRING  set once the counters have been built
+#
+# Counters are incremented from the Chat Message and Chat Room hooks, so
+# reading them is a single pipeline. Per-day keys roll over by name and
+# expire after DAY_KEY_EXPIRY. The daily job rebuilds everything from the
+# database to correct drift from bulk SQL updates (e.g. memberships removed
+# when a user is disabled). Bulk message soft deletes go through
+# forget_messages instead.
+
+import frappe
+from frappe.utils import add_days, cint, get_datetime, getdate, now_datetime, nowdate
+
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    make_key,
+    pipeline,
+)
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import track_job_run
+
+DAY_KEY_EXPIRY = 86400 * 3  # only today's keys are read; a margin covers timezone edges
+
+
+def _stats_key():
+    return make_key("chat_stats")
+
+
+def _users_key():
+    return make_key("chat_stats_users")
+
+
+def _messages_key(day):
+    return make_key("chat_stats_messages", day)
+
+
+def _active_key(day):
+    return make_key("chat_stats_active", day)
+
+
+def _loaded_key():
+    return make_key("chat_stats_loaded")
+
+
+def _message_day(doc):
+    return str(getdate(doc.timestamp or now_datetime()))
+
+
+def rebuild_system_counters():
+    """Recompute every counter from the database"""
+    today = nowdate()
+    day_start = get_datetime(today)
+    day_end = add_days(day_start, 1)
+
+    total_rooms = frappe.db.count("Chat Room", {"room_status": "Active"})
+    # Archived messages are still readable, so they stay in the total
+    total_messages = (
+        frappe.db.count("Chat Message", {"is_deleted": 0})
+        + frappe.db.count("Chat Message Archive", {"is_deleted": 0})
+    )
+    memberships = frappe.db.sql("""
+        SELECT user, COUNT(*)
+        FROM `tabChat Room Member`
+        WHERE parenttype = 'Chat Room'
+        GROUP BY user
+    """)
+    messages_today = frappe.db.sql("""
+        SELECT COUNT(*)
+        FROM `tabChat Message`
+        WHERE timestamp >= %(start)s AND timestamp < %(end)s AND is_deleted = 0
+    """, {"start": day_start, "end": day_end})[0][0]
+    senders_today = [row[0] for row in frappe.db.sql("""
+        SELECT DISTINCT sender
+        FROM `tabChat Message`
+        WHERE timestamp >= %(start)s AND timestamp < %(end)s AND sender IS NOT NULL
+    """, {"start": day_start, "end": day_end})]
+
+    pipe = pipeline(transaction=True)
+    pipe.hset(_stats_key(), mapping={"total_rooms": total_rooms, "total_messages": total_messages})
+    pipe.delete(_users_key(), _active_key(today))
+    if memberships:
+        pipe.hset(_users_key(), mapping=dict(memberships))
+    pipe.set(_messages_key(today), messages_today, ex=DAY_KEY_EXPIRY)
+    if senders_today:
+        pipe.pfadd(_active_key(today), *senders_today)
+    pipe.expire(_active_key(today), DAY_KEY_EXPIRY)
+    pipe.set(_loaded_key(), 1)
+    pipe.execute()
+
+
+def get_system_stats():
+    """
+    Read the system counters (built on first use)
+
+    Returns:
+        dict: total_rooms, total_messages, total_users, messages_today, active_users_today
+    """
+    today = nowdate()
+
+    for attempt in range(2):
+        pipe = pipeline()
+        pipe.exists(_loaded_key())
+        pipe.hmget(_stats_key(), ["total_rooms", "total_messages"])
+        pipe.hlen(_users_key())
+        pipe.get(_messages_key(today))
+        pipe.pfcount(_active_key(today))
+        loaded, (total_rooms, total_messages), total_users, messages_today, active_today = pipe.execute()
+
+        if loaded or attempt:
+            break
+        rebuild_system_counters()
+
+    return {
+        "total_rooms": cint(decode(total_rooms)),
+        "total_messages": cint(decode(total_messages)),
+        "total_users": total_users,
+        "messages_today": cint(decode(messages_today)),
+        "active_users_today": active_today
+    }
+
+
+def _count_message(doc, sign):
+    day = _message_day(doc)
+
+    pipe = pipeline()
+    pipe.hincrby(_stats_key(), "total_messages", sign)
+    pipe.incrby(_messages_key(day), sign)
+    pipe.expire(_messages_key(day), DAY_KEY_EXPIRY)
+    if sign > 0 and doc.sender:
+        pipe.pfadd(_active_key(day), doc.sender)
+        pipe.expire(_active_key(day), DAY_KEY_EXPIRY)
+    pipe.execute()
+
+
+def _count_memberships(deltas):
+    """Apply user -> membership deltas and drop users left in no room"""
+    users = [user for user, delta in deltas.items() if delta]
+    if not users:
+        return
+
+    pipe = pipeline()
+    for user in users:
+        pipe.hincrby(_users_key(), user, deltas[user])
+    counts = pipe.execute()
+
+    gone = [user for user, count in zip(users, counts, strict=True) if count <= 0]
+    if gone:
+        pipe = pipeline()
+        pipe.hdel(_users_key(), *gone)
+        pipe.execute()
+
+
+# Document event hooks
+
+def record_message(doc, method=None):
+    """Chat Message after_insert hook"""
+    try:
+        if not doc.is_deleted:
+            _count_message(doc, 1)
+    except Exception as e:
+        frappe.log_error(f"Error updating system counters for message {doc.name}: {str(e)}")
+
+
+def record_message_update(doc, method=None):
+    """Chat Message on_update hook: a soft delete leaves the totals"""
+    try:
+        before = doc.get_doc_before_save()
+        if before and not before.is_deleted and doc.is_deleted:
+            _count_message(before, -1)
+    except Exception as e:
+        frappe.log_error(f"Error updating system counters for message {doc.name}: {str(e)}")
+
+
+def forget_message(doc, method=None):
+    """Take a trashed message out of the totals (called before Chat Message.on_trash soft-deletes it)"""
+    try:
+        if not doc.is_deleted:
+            _count_message(doc, -1)
+    except Exception as e:
+        frappe.log_error(f"Error updating system counters for message {doc.name}: {str(e)}")
+
+
+def forget_messages(names):
+    """
+    Take a batch of still-live messages out of the totals and per-day counts
+
+    Used by bulk soft deletes that bypass document hooks, before the rows
+    are marked deleted. Per-day keys that already expired are left alone.
+
+    Args:
+        names (list): Chat Message names, not yet marked deleted
+    """
+    if not names:
+        return
+
+    days = frappe.db.sql("""
+        SELECT DATE(timestamp) AS day, COUNT(*)
+        FROM `tabChat Message`
+        WHERE name IN %(names)s AND is_deleted = 0
+        GROUP BY day
+    """, {"names": tuple(names)})
+    if not days:
+        return
+
+    dated = [(str(day), count) for day, count in days if day]
+    pipe = pipeline()
+    for day, _count in dated:
+        pipe.exists(_messages_key(day))
+    live = pipe.execute()
+
+    pipe = pipeline()
+    pipe.hincrby(_stats_key(), "total_messages", -sum(count for _day, count in days))
+    for (day, count), exists in zip(dated, live, strict=True):
+        if exists:
+            pipe.incrby(_messages_key(day), -count)
+    pipe.execute()
+
+
+def record_room_update(doc, method=None):
+    """Chat Room on_update hook: follow status changes and member rosters"""
+    try:
+        before = doc.get_doc_before_save()
+        was_active = bool(before) and before.room_status == "Active"
+        is_active = doc.room_status == "Active"
+        if was_active != is_active:
+            pipe = pipeline()
+            pipe.hincrby(_stats_key(), "total_rooms", 1 if is_active else -1)
+            pipe.execute()
+
+        members = {member.user for member in doc.members}
+        previous = {member.user for member in before.members} if before else set()
+        deltas = {user: 1 for user in members - previous}
+        deltas.update({user: -1 for user in previous - members})
+        _count_memberships(deltas)
+
+    except Exception as e:
+        frappe.log_error(f"Error updating system counters for room {doc.name}: {str(e)}")
+
+
+def forget_room(doc, method=None):
+    """Chat Room on_trash hook (its messages leave the totals in ChatRoom.on_trash)"""
+    try:
+        if doc.room_status == "Active":
+            pipe = pipeline()
+            pipe.hincrby(_stats_key(), "total_rooms", -1)
+            pipe.execute()
+
+        _count_memberships({member.user: -1 for member in doc.members})
+
+    except Exception as e:
+        frappe.log_error(f"Error updating system counters for room {doc.name}: {str(e)}")
+
+
+# Scheduled job
+
+def reconcile_system_counters():
+    """Daily job: rebuild the counters from the database"""
+    with track_job_run("f_chat.APIs.notification_chatroom.chat_apis.system_counters.reconcile_system_counters") as run:
+        try:
+            rebuild_system_counters()
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in reconcile_system_counters: {str(e)}")
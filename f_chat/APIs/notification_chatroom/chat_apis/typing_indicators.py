@@ -0,0 +1,188 @@
+# f_chat/APIs/notification_chatroom/chat_apis/typing_indicators.py
+# Ephemeral typing indicators kept in Redis (no database writes)
+#
+# Layout (all keys site-scoped):
+#   chat_typing:{room}                 ZSET    user -> epoch when the flag expires
+#   chat_typing_throttle:{room}:{user} STRING  set while further pings are ignored
+#   chat_typing_emit:{room}            STRING  set while the room's emit gate is closed
+#   chat_typing_due                    ZSET    room -> epoch when its trailing emit is due
+#
+# Rooms receive one aggregated `typing_users` event listing everyone typing,
+# at most once per EMIT_INTERVAL_MS. Each typist carries `expires_at`, the
+# epoch their flag lapses, and clients drop them then without waiting for
+# another event. Changes inside a closed gate are queued for one trailing
+# emit. The next typing ping, in any room, sends it once it is due. Someone
+# still typing pings again within THROTTLE_MS, so a new typist shows up that
+# quickly. A "stopped" with no ping after it is settled by the client-side
+# expiry, within TYPING_TTL. Nothing here runs on a schedule or writes to the
+# database.
+
+import time
+
+import frappe
+from frappe.utils import get_fullname, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    make_key,
+    pipeline,
+)
+
+TYPING_TTL = 6  # seconds a typing flag lives without a refresh
+THROTTLE_MS = 1500  # minimum gap between accepted pings from one user in a room
+EMIT_INTERVAL_MS = 300  # minimum gap between events for one room
+FLUSH_BATCH_SIZE = 20  # due rooms emitted by one typing ping
+
+
+def _typing_key(room_id):
+    return make_key("chat_typing", room_id)
+
+
+def _throttle_key(room_id, user):
+    return make_key("chat_typing_throttle", room_id, user)
+
+
+def _emit_gate_key(room_id):
+    return make_key("chat_typing_emit", room_id)
+
+
+def _due_key():
+    return make_key("chat_typing_due")
+
+
+def is_typing_enabled():
+    """Typing indicators can be switched off in Chat Settings"""
+    from f_chat.f_chat.doctype.chat_settings.chat_settings import get_chat_settings
+    return bool(get_chat_settings().get("enable_typing_indicators", True))
+
+
+def set_typing(room_id, user, is_typing=True):
+    """
+    Record that a user started or stopped typing in a room
+
+    Repeated "typing" pings inside THROTTLE_MS are ignored; the flag already
+    outlives the throttle window. "Stopped" is always accepted.
+
+    Args:
+        room_id (str): Chat Room ID
+        user (str): User ID
+        is_typing (bool): Whether the user is typing
+
+    Returns:
+        bool: True if the state changed and an update was scheduled
+    """
+    now = time.time()
+    room_key = _typing_key(room_id)
+
+    flush_typing_users()
+
+    if is_typing:
+        pipe = pipeline()
+        pipe.set(_throttle_key(room_id, user), 1, nx=True, px=THROTTLE_MS)
+        if not pipe.execute()[0]:
+            return False
+
+        pipe = pipeline(transaction=True)
+        pipe.zremrangebyscore(room_key, "-inf", now)
+        pipe.zadd(room_key, {user: now + TYPING_TTL})
+        pipe.expire(room_key, TYPING_TTL)
+        # zadd reports 0 when only the expiry was refreshed
+        changed = pipe.execute()[1] > 0
+    else:
+        pipe = pipeline(transaction=True)
+        pipe.zrem(room_key, user)
+        pipe.delete(_throttle_key(room_id, user))
+        changed = pipe.execute()[0] > 0
+
+    if changed:
+        _schedule_emit(room_id)
+
+    return changed
+
+
+def get_typing_users(room_id):
+    """
+    Get users currently typing in a room
+
+    Args:
+        room_id (str): Chat Room ID
+
+    Returns:
+        list: User IDs
+    """
+    pipe = pipeline()
+    pipe.zrangebyscore(_typing_key(room_id), time.time(), "+inf")
+    return [decode(user) for user in pipe.execute()[0]]
+
+
+def _schedule_emit(room_id):
+    """Emit now if the room's gate is open, otherwise queue one trailing emit"""
+    pipe = pipeline()
+    pipe.set(_emit_gate_key(room_id), 1, nx=True, px=EMIT_INTERVAL_MS)
+    if pipe.execute()[0]:
+        emit_typing_users(room_id)
+        return
+
+    # A room already waiting keeps its earlier due time
+    pipe = pipeline()
+    pipe.zadd(_due_key(), {room_id: time.time() + EMIT_INTERVAL_MS / 1000.0}, nx=True)
+    pipe.execute()
+
+
+def flush_typing_users(limit=FLUSH_BATCH_SIZE):
+    """
+    Trailing emits for rooms whose changes hit a closed gate and are now due
+
+    Args:
+        limit (int): Most rooms emitted in one call
+
+    Returns:
+        int: Rooms emitted
+    """
+    now = time.time()
+    pipe = pipeline()
+    # Clients have expired everything in these rooms on their own by now
+    pipe.zremrangebyscore(_due_key(), "-inf", now - TYPING_TTL)
+    pipe.zrangebyscore(_due_key(), "-inf", now, start=0, num=limit)
+    due = [decode(room_id) for room_id in pipe.execute()[1]]
+    if not due:
+        return 0
+
+    # ZREM decides which caller sends each room's emit
+    pipe = pipeline()
+    for room_id in due:
+        pipe.zrem(_due_key(), room_id)
+    claimed = [room_id for room_id, removed in zip(due, pipe.execute(), strict=True) if removed]
+    if not claimed:
+        return 0
+
+    pipe = pipeline()
+    for room_id in claimed:
+        pipe.set(_emit_gate_key(room_id), 1, px=EMIT_INTERVAL_MS)
+    pipe.execute()
+
+    for room_id in claimed:
+        emit_typing_users(room_id)
+
+    return len(claimed)
+
+
+def emit_typing_users(room_id):
+    """Publish the aggregated list of typists, with when each flag expires, to the room"""
+    pipe = pipeline()
+    pipe.zrangebyscore(_typing_key(room_id), time.time(), "+inf", withscores=True)
+    typists = [(decode(user), expires_at) for user, expires_at in pipe.execute()[0]]
+
+    frappe.publish_realtime(
+        event="typing_users",
+        message={
+            "room_id": room_id,
+            "users": [
+                {"user": user, "full_name": get_fullname(user), "expires_at": expires_at}
+                for user, expires_at in typists
+            ],
+            "ttl": TYPING_TTL,
+            "timestamp": str(now_datetime())
+        },
+        room=f"chat_room_{room_id}"
+    )
@@ -3,8 +3,12 @@
 
 import frappe
 from frappe import _
+from frappe.utils import cint
 import json
 
+from f_chat.APIs.notification_chatroom.chat_apis import people_index
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import get_room_members
+
 @frappe.whitelist()
 def search_users_for_chat_room(search_term="", room_id=None, exclude_existing=True):
     """
@@ -19,77 +23,11 @@ def search_users_for_chat_room(search_term="", room_id=None, exclude_existing=Tr
         dict: Success status and user data
     """
     try:
-        # Build search conditions
-        conditions = []
-        values = []
-        
-        # Only include enabled users who allow guest access
-        conditions.append("enabled = 1")
-        
-        # Add custom field check if exists
-        if frappe.db.has_column("User", "allow_guest"):
-            conditions.append("allow_guest = 1")
-        
-        # Search filter
-        if search_term:
-            search_condition = """(
-                LOWER(full_name) LIKE LOWER(%s) OR 
-                LOWER(first_name) LIKE LOWER(%s) OR 
-                LOWER(last_name) LIKE LOWER(%s) OR 
-                LOWER(email) LIKE LOWER(%s) OR
-                LOWER(name) LIKE LOWER(%s)
-            )"""
-            conditions.append(search_condition)
-            search_pattern = f"%{search_term}%"
-            values.extend([search_pattern] * 5)
-        
-        # Exclude system users
-        conditions.append("name NOT IN ('Administrator', 'Guest')")
-        
-        # Get existing room members to exclude
-        existing_members = []
-        if room_id and exclude_existing:
-            try:
-                existing_members_data = frappe.db.sql("""
-                    SELECT user 
-                    FROM `tabChat Room Member` 
-                    WHERE parent = %s
-                """, [room_id], as_dict=True)
-                existing_members = [member.user for member in existing_members_data]
-            except Exception as e:
-                frappe.log_error(f"Error getting existing members: {str(e)}")
-        
-        # Exclude existing members
-        if existing_members:
-            placeholders = ",".join(["%s"] * len(existing_members))
-            conditions.append(f"name NOT IN ({placeholders})")
-            values.extend(existing_members)
-        
-        # Build final query
-        where_clause = " AND ".join(conditions)
-        
-        query = f"""
-            SELECT 
-                name,
-                email,
-                full_name,
-                first_name,
-                last_name,
-                user_image,
-                enabled,
-                creation
-            FROM `tabUser`
-            WHERE {where_clause}
-            ORDER BY 
-                CASE 
-                    WHEN full_name IS NOT NULL AND full_name != '' THEN full_name
-                    WHEN first_name IS NOT NULL AND first_name != '' THEN first_name
-                    ELSE name
-                END
-            LIMIT 50
-        """
+        exclude_room = room_id if room_id and cint(exclude_existing) else None
         
-        users = frappe.db.sql(query, values, as_dict=True)
+        # Prefix/n-gram index in Redis; room members are subtracted there
+        users = [frappe._dict(user) for user in people_index.search(search_term, exclude_room=exclude_room)]
+        existing_members = get_room_members(exclude_room) if exclude_room else set()
         
         # Format user data
         formatted_users = []
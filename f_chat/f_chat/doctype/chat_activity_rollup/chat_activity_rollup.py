@@ -0,0 +1,254 @@
+# Copyright (c) 2026, bluephoenix and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, get_datetime, now_datetime
+
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import track_job_run
+
+HOURLY_RETENTION_DAYS = 14  # hourly rows are only needed for short-range charts
+
+# Bucket formats per granularity (SQL DATE_FORMAT / Python strftime)
+BUCKET_FORMATS = {
+    "Hour": "%Y-%m-%d %H:00:00",
+    "Day": "%Y-%m-%d 00:00:00",
+}
+
+ROLLUP_FIELDS = [
+    "name", "creation", "modified", "owner", "modified_by",
+    "granularity", "period_start", "chat_room", "sender", "message_type",
+    "message_count", "total_length", "messages_with_files", "file_count", "file_size"
+]
+COUNTER_FIELDS = ["message_count", "total_length", "messages_with_files", "file_count", "file_size"]
+
+
+class ChatActivityRollup(Document):
+    pass
+
+
+def on_doctype_update():
+    """Indexes for per-room ranges and site-wide charts"""
+    frappe.db.add_index("Chat Activity Rollup", ["chat_room", "granularity", "period_start"])
+    frappe.db.add_index("Chat Activity Rollup", ["granularity", "period_start"])
+
+
+def rollup_name(granularity, period_start, chat_room, sender, message_type):
+    """Deterministic row name, so each bucket has exactly one row to upsert"""
+    key = ":".join([granularity, period_start, chat_room or "", sender or "", message_type or ""])
+    return hashlib.md5(key.encode()).hexdigest()[:16]
+
+
+def _message_deltas(doc, sign=1, content=None):
+    """Counter deltas a message contributes to its buckets"""
+    files = doc.get("file_attachments") or []
+    content = doc.message_content if content is None else content
+
+    return {
+        "message_count": sign,
+        "total_length": sign * len(content or ""),
+        "messages_with_files": sign * (1 if files else 0),
+        "file_count": sign * len(files),
+        "file_size": sign * sum(row.file_size or 0 for row in files),
+    }
+
+
+def apply_deltas(doc, deltas):
+    """
+    Add counter deltas to the hourly and daily buckets of a message
+
+    Args:
+        doc (Document): Chat Message
+        deltas (dict): COUNTER_FIELDS -> change
+    """
+    timestamp = get_datetime(doc.timestamp or now_datetime())
+    now = now_datetime()
+
+    values = []
+    for granularity, bucket_format in BUCKET_FORMATS.items():
+        period_start = timestamp.strftime(bucket_format)
+        values.append([
+            rollup_name(granularity, period_start, doc.chat_room, doc.sender, doc.message_type),
+            now, now, "Administrator", "Administrator",
+            granularity, period_start, doc.chat_room, doc.sender or "", doc.message_type or ""
+        ] + [deltas[field] for field in COUNTER_FIELDS])
+
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(ROLLUP_FIELDS)) + ")"] * len(values))
+    updates = ", ".join(f"{field} = {field} + VALUES({field})" for field in COUNTER_FIELDS)
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabChat Activity Rollup` ({", ".join(ROLLUP_FIELDS)})
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE {updates}, modified = VALUES(modified)
+    """, [value for row in values for value in row])
+
+
+def rebuild_rollups(granularity, since=None):
+    """
+    Recompute one granularity from Chat Message
+
+    Args:
+        granularity (str): Hour or Day
+        since (datetime): Only rebuild buckets from this point on
+    """
+    conditions = ["cm.is_deleted = 0", "cm.timestamp IS NOT NULL"]
+    values = {
+        "granularity": granularity,
+        "bucket_format": BUCKET_FORMATS[granularity],
+    }
+    if since:
+        conditions.append("cm.timestamp >= %(since)s")
+        values["since"] = get_datetime(since).strftime(BUCKET_FORMATS[granularity])
+
+    frappe.db.sql(f"""
+        DELETE FROM `tabChat Activity Rollup`
+        WHERE granularity = %(granularity)s
+        {"AND period_start >= %(since)s" if since else ""}
+    """, values)
+
+    frappe.db.sql(f"""
+        INSERT INTO `tabChat Activity Rollup` ({", ".join(ROLLUP_FIELDS)})
+        SELECT
+            LEFT(MD5(CONCAT_WS(':', %(granularity)s, bucket, chat_room, sender, message_type)), 16),
+            NOW(), NOW(), 'Administrator', 'Administrator',
+            %(granularity)s, bucket, chat_room, sender, message_type,
+            COUNT(*),
+            SUM(content_length),
+            SUM(file_count > 0),
+            SUM(file_count),
+            SUM(file_size)
+        FROM (
+            SELECT
+                DATE_FORMAT(cm.timestamp, %(bucket_format)s) AS bucket,
+                cm.chat_room,
+                COALESCE(cm.sender, '') AS sender,
+                COALESCE(cm.message_type, '') AS message_type,
+                CHAR_LENGTH(COALESCE(cm.message_content, '')) AS content_length,
+                COALESCE(files.file_count, 0) AS file_count,
+                COALESCE(files.file_size, 0) AS file_size
+            FROM `tabChat Message` cm
+            LEFT JOIN (
+                SELECT parent, COUNT(*) AS file_count, SUM(COALESCE(file_size, 0)) AS file_size
+                FROM `tabChat Message Attachment`
+                WHERE parenttype = 'Chat Message'
+                GROUP BY parent
+            ) files ON files.parent = cm.name
+            WHERE {" AND ".join(conditions)}
+        ) messages
+        GROUP BY bucket, chat_room, sender, message_type
+    """, values)
+
+
+# Document event hooks
+
+def record_message(doc, method=None):
+    """Chat Message after_insert hook: count the message in its buckets"""
+    try:
+        if not doc.is_deleted:
+            apply_deltas(doc, _message_deltas(doc))
+    except Exception as e:
+        frappe.log_error(f"Error updating activity rollups for message {doc.name}: {str(e)}")
+
+
+def record_message_update(doc, method=None):
+    """Chat Message on_update hook: follow deletes and edits"""
+    try:
+        before = doc.get_doc_before_save()
+        if not before or before.is_deleted:
+            return
+
+        if doc.is_deleted:
+            apply_deltas(before, _message_deltas(before, sign=-1))
+        elif (before.message_content or "") != (doc.message_content or ""):
+            deltas = dict.fromkeys(COUNTER_FIELDS, 0)
+            deltas["total_length"] = len(doc.message_content or "") - len(before.message_content or "")
+            apply_deltas(doc, deltas)
+
+    except Exception as e:
+        frappe.log_error(f"Error updating activity rollups for message {doc.name}: {str(e)}")
+
+
+def forget_messages(names):
+    """
+    Take a batch of still-live messages out of their buckets in two statements
+
+    Used by bulk soft deletes (retention) that bypass document hooks. Hourly
+    buckets already pruned are left alone.
+
+    Args:
+        names (list): Chat Message names, not yet marked deleted
+    """
+    if not names:
+        return
+
+    hourly_cutoff = add_days(now_datetime(), -HOURLY_RETENTION_DAYS)
+    for granularity, bucket_format in BUCKET_FORMATS.items():
+        frappe.db.sql(f"""
+            INSERT INTO `tabChat Activity Rollup` ({", ".join(ROLLUP_FIELDS)})
+            SELECT
+                LEFT(MD5(CONCAT_WS(':', %(granularity)s, bucket, chat_room, sender, message_type)), 16),
+                NOW(), NOW(), 'Administrator', 'Administrator',
+                %(granularity)s, bucket, chat_room, sender, message_type,
+                -COUNT(*),
+                -SUM(content_length),
+                -SUM(file_count > 0),
+                -SUM(file_count),
+                -SUM(file_size)
+            FROM (
+                SELECT
+                    DATE_FORMAT(cm.timestamp, %(bucket_format)s) AS bucket,
+                    cm.chat_room,
+                    COALESCE(cm.sender, '') AS sender,
+                    COALESCE(cm.message_type, '') AS message_type,
+                    CHAR_LENGTH(COALESCE(cm.message_content, '')) AS content_length,
+                    COALESCE(files.file_count, 0) AS file_count,
+                    COALESCE(files.file_size, 0) AS file_size
+                FROM `tabChat Message` cm
+                LEFT JOIN (
+                    SELECT parent, COUNT(*) AS file_count, SUM(COALESCE(file_size, 0)) AS file_size
+                    FROM `tabChat Message Attachment`
+                    WHERE parenttype = 'Chat Message' AND parent IN %(names)s
+                    GROUP BY parent
+                ) files ON files.parent = cm.name
+                WHERE cm.name IN %(names)s AND cm.is_deleted = 0 AND cm.timestamp IS NOT NULL
+                    {"AND cm.timestamp >= %(hourly_cutoff)s" if granularity == "Hour" else ""}
+            ) messages
+            GROUP BY bucket, chat_room, sender, message_type
+            ON DUPLICATE KEY UPDATE
+                {", ".join(f"{field} = {field} + VALUES({field})" for field in COUNTER_FIELDS)},
+                modified = VALUES(modified)
+        """, {
+            "names": tuple(names),
+            "granularity": granularity,
+            "bucket_format": bucket_format,
+            "hourly_cutoff": hourly_cutoff,
+        })
+
+
+def forget_message(doc, method=None):
+    """Take a trashed message out of its buckets (called before Chat Message.on_trash soft-deletes it)"""
+    try:
+        if not doc.is_deleted:
+            apply_deltas(doc, _message_deltas(doc, sign=-1))
+    except Exception as e:
+        frappe.log_error(f"Error updating activity rollups for message {doc.name}: {str(e)}")
+
+
+# Scheduled job
+
+def prune_hourly_rollups():
+    """Daily job: drop hourly buckets past HOURLY_RETENTION_DAYS (daily rows are kept)"""
+    with track_job_run("f_chat.f_chat.doctype.chat_activity_rollup.chat_activity_rollup.prune_hourly_rollups") as run:
+        try:
+            frappe.db.sql("""
+                DELETE FROM `tabChat Activity Rollup`
+                WHERE granularity = 'Hour' AND period_start < %(cutoff)s
+            """, {"cutoff": add_days(now_datetime(), -HOURLY_RETENTION_DAYS)})
+            run.rows = frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+            frappe.db.commit()
+
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in prune_hourly_rollups: {str(e)}")
@@ -0,0 +1,64 @@
+# Copyright (c) 2026, Blue Phoenix and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import now_datetime
+
+from f_chat.f_chat.doctype.chat_room.test_chat_room import delete_room, make_room, make_user
+from f_chat.f_chat.retention import soft_delete_where
+
+TEST_USERS = ("chat-rollup-a@example.com", "chat-rollup-b@example.com")
+
+
+def delete_rollups(room_id):
+	frappe.db.delete("Chat Activity Rollup", {"chat_room": room_id})
+	frappe.db.commit()
+
+
+class TestChatActivityRollup(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b])
+		frappe.db.commit()
+		self.addCleanup(delete_rollups, self.room.name)
+		self.addCleanup(delete_room, self.room.name)
+
+		for sender in (self.user_a, self.user_b, self.user_a):
+			frappe.get_doc({
+				"doctype": "Chat Message",
+				"chat_room": self.room.name,
+				"sender": sender,
+				"message_type": "Text",
+				"message_content": "hello",
+				"timestamp": now_datetime(),
+			}).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+	def counts(self, granularity="Day"):
+		# Text only: the room's welcome message is a System one
+		return frappe.db.sql("""
+			SELECT COALESCE(SUM(message_count), 0), COALESCE(SUM(total_length), 0)
+			FROM `tabChat Activity Rollup`
+			WHERE chat_room = %(room)s AND granularity = %(granularity)s AND message_type = 'Text'
+		""", {"room": self.room.name, "granularity": granularity})[0]
+
+	def test_sent_messages_are_counted(self):
+		self.assertEqual(self.counts(), (3, 15))
+		self.assertEqual(self.counts("Hour"), (3, 15))
+
+	def test_bulk_soft_delete_leaves_the_rollups(self):
+		deleted = soft_delete_where(
+			"chat_room = %(room)s AND sender = %(sender)s",
+			{"room": self.room.name, "sender": self.user_a},
+			"gone"
+		)
+
+		self.assertEqual(deleted, 2)
+		self.assertEqual(self.counts(), (1, 5))
+		self.assertEqual(self.counts("Hour"), (1, 5))
@@ -0,0 +1,59 @@
+# Copyright (c) 2026, bluephoenix and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import now_datetime
+
+
+class ChatCallHistory(Document):
+    pass
+
+
+def on_doctype_update():
+    """Indexes for per-user keyset pagination (newest first)"""
+    frappe.db.add_index("Chat Call History", ["user", "start_time", "name"])
+    frappe.db.add_index("Chat Call History", ["user", "chat_room", "start_time"])
+
+
+def history_name(call_session_id, user):
+    """Deterministic row name so writing a call twice is a no-op"""
+    return hashlib.md5(f"{call_session_id}:{user}".encode()).hexdigest()[:16]
+
+
+def record_call_history(call_session):
+    """
+    Write one history row per participant of an ended call
+
+    Args:
+        call_session (Document): Ended Chat Call Session
+    """
+    if not call_session.participants:
+        return
+
+    room_name = frappe.db.get_value("Chat Room", call_session.chat_room, "room_name")
+    initiated_by_name = frappe.db.get_value("User", call_session.initiated_by, "full_name")
+    participant_count = len(call_session.participants)
+
+    now = now_datetime()
+    fields = [
+        "name", "creation", "modified", "owner", "modified_by",
+        "user", "call_session", "chat_room", "room_name", "call_type", "call_status",
+        "participant_status", "initiated_by", "initiated_by_name", "participant_count",
+        "start_time", "end_time", "total_duration", "duration"
+    ]
+    values = [
+        (
+            history_name(call_session.name, participant.user), now, now, "Administrator", "Administrator",
+            participant.user, call_session.name, call_session.chat_room, room_name,
+            call_session.call_type, call_session.call_status, participant.status,
+            call_session.initiated_by, initiated_by_name or call_session.initiated_by,
+            participant_count, call_session.start_time, call_session.end_time,
+            call_session.total_duration or 0, participant.duration or 0
+        )
+        for participant in call_session.participants
+    ]
+
+    frappe.db.bulk_insert("Chat Call History", fields, values, ignore_duplicates=True)
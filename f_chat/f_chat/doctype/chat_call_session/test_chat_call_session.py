@@ -0,0 +1,109 @@
+# Copyright (c) 2026, Blue Phoenix and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from f_chat.APIs.notification_chatroom.chat_apis import call_registry, call_signaling
+from f_chat.f_chat.doctype.chat_room.test_chat_room import delete_room, make_room, make_user
+
+TEST_USERS = ("chat-call-a@example.com", "chat-call-b@example.com", "chat-call-c@example.com")
+
+
+def delete_call(call_session_id):
+	frappe.db.delete("Chat Call History", {"call_session": call_session_id})
+	frappe.db.delete("Chat Call Participant", {"parent": call_session_id})
+	frappe.db.delete("Chat Call Session", {"name": call_session_id})
+	frappe.db.commit()
+
+
+class TestChatCallSession(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.caller, cls.callee, cls.outsider = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Direct Message", [self.caller, self.callee])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+
+		call = call_registry.create_call(self.room.name, "Audio", self.caller, [self.callee], [])
+		self.call_session_id = call["name"]
+		self.addCleanup(delete_call, self.call_session_id)
+		self.addCleanup(call_registry._release, self.call_session_id, self.room.name)
+
+	def test_end_call_has_a_single_winner(self):
+		call_session = call_registry.end_call(self.call_session_id)
+		self.assertIsNotNone(call_session)
+		self.assertEqual(call_session.call_status, "Ended")
+
+		# Any later attempt (a second client, the ring reaper) loses
+		self.assertIsNone(call_registry.end_call(self.call_session_id, "Missed"))
+
+		self.assertEqual(frappe.db.get_value("Chat Call Session", self.call_session_id, "call_status"), "Ended")
+		self.assertEqual(
+			set(frappe.get_all(
+				"Chat Call History", filters={"call_session": self.call_session_id}, pluck="user"
+			)),
+			{self.caller, self.callee}
+		)
+		self.assertIsNone(call_registry.get_call(self.call_session_id))
+		self.assertIsNone(call_registry.get_room_active_call(self.room.name))
+
+	def test_failed_end_call_releases_the_win(self):
+		with patch.object(call_registry, "record_call_history", side_effect=frappe.ValidationError):
+			with self.assertRaises(frappe.ValidationError):
+				call_registry.end_call(self.call_session_id)
+		frappe.db.rollback()
+
+		# The call is still live and still holds the room
+		call = call_registry.get_call(self.call_session_id)
+		self.assertIsNotNone(call)
+		self.assertNotIn("end_time", call)
+		self.assertEqual(call_registry.get_room_active_call(self.room.name)["name"], self.call_session_id)
+		self.assertFalse(frappe.db.exists("Chat Call Session", self.call_session_id))
+
+		# So a retry can still end it
+		call_session = call_registry.end_call(self.call_session_id)
+		self.assertIsNotNone(call_session)
+		self.assertIsNone(call_registry.get_room_active_call(self.room.name))
+
+	def test_reject_only_updates_invitees(self):
+		with self.assertRaises(frappe.ValidationError):
+			call_registry.reject(self.call_session_id, self.outsider)
+
+		users = [row["user"] for row in call_registry.get_call(self.call_session_id)["participants"]]
+		self.assertNotIn(self.outsider, users)
+
+	def test_call_ends_once_every_invitee_rejects(self):
+		self.assertTrue(call_registry.reject(self.call_session_id, self.callee))
+
+		self.assertEqual(
+			frappe.db.get_value("Chat Call Session", self.call_session_id, "call_status"), "Rejected"
+		)
+		self.assertIsNone(call_registry.get_room_active_call(self.room.name))
+
+	def test_signals_reach_the_other_participants(self):
+		with patch.object(call_signaling.frappe, "publish_realtime") as publish_realtime:
+			delivered = call_signaling.relay_signal(
+				self.call_session_id, self.caller, "ice-candidates", '[{"candidate": "a"}]'
+			)
+
+		self.assertEqual(delivered, 1)
+		self.assertEqual(publish_realtime.call_args.kwargs["user"], self.callee)
+		self.assertEqual(publish_realtime.call_args.kwargs["message"]["signal_data"], [{"candidate": "a"}])
+
+	def test_signals_are_checked_against_the_roster(self):
+		with patch.object(call_signaling.frappe, "publish_realtime") as publish_realtime:
+			with self.assertRaises(frappe.ValidationError):
+				call_signaling.relay_signal(self.call_session_id, self.outsider, "offer", {})
+			with self.assertRaises(frappe.ValidationError):
+				call_signaling.relay_signal(self.call_session_id, self.caller, "offer", {}, self.outsider)
+			with self.assertRaises(frappe.ValidationError):
+				call_signaling.relay_signal(self.call_session_id, self.caller, "hangup", {})
+
+		publish_realtime.assert_not_called()
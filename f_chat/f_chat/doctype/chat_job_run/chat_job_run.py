@@ -0,0 +1,282 @@
+# Copyright (c) 2026, bluephoenix and contributors
+# For license information, please see license.txt
+
+import time
+from contextlib import contextmanager
+
+import frappe
+import numpy as np
+from frappe.model.document import Document
+from frappe.utils import add_days, add_to_date, get_datetime, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import (
+    decode,
+    decode_set,
+    make_key,
+    pipeline,
+)
+
+ROLLING_WINDOW = 100  # most recent durations kept per job for p50/p95
+RUN_RETENTION_DAYS = 14
+CREEP_RATIO = 0.5  # flag jobs whose p95 reaches this share of their interval
+
+# Seconds between runs of the named scheduler_events frequencies
+FREQUENCY_SECONDS = {
+    "all": 60,
+    "hourly": 3600,
+    "hourly_long": 3600,
+    "daily": 86400,
+    "daily_long": 86400,
+    "weekly": 604800,
+    "weekly_long": 604800,
+    "monthly": 2592000,
+    "monthly_long": 2592000,
+}
+
+
+class ChatJobRun(Document):
+    pass
+
+
+def on_doctype_update():
+    """Indexes for per-job history and the time-ranged stats and pruning"""
+    frappe.db.add_index("Chat Job Run", ["job", "started_at"])
+    frappe.db.add_index("Chat Job Run", ["started_at"])
+
+
+def _durations_key(job):
+    return make_key("chat_job_durations", job)
+
+
+def _jobs_key():
+    return make_key("chat_job_names")
+
+
+class JobRun:
+    """Outcome of one run, filled in by the job inside track_job_run"""
+
+    def __init__(self, job):
+        self.job = job
+        self.rows = 0
+        self.error = None
+
+    def fail(self, error):
+        """Record the error and roll back the job's uncommitted work"""
+        self.error = str(error)
+        frappe.db.rollback()
+
+
+def _start_run(job, started_at):
+    name = frappe.generate_hash(length=10)
+    frappe.db.sql("""
+        INSERT INTO `tabChat Job Run`
+            (name, creation, modified, owner, modified_by, job, status, started_at)
+        VALUES (%(name)s, %(now)s, %(now)s, 'Administrator', 'Administrator', %(job)s, 'Running', %(now)s)
+    """, {"name": name, "job": job, "now": started_at})
+    # Not committed here: the row goes out with the job's first commit, or with _finish_run
+    return name
+
+
+def _finish_run(run, name, started_at, duration):
+    ended_at = now_datetime()
+    values = {
+        "name": name,
+        "job": run.job,
+        "status": "Error" if run.error else "Success",
+        "started_at": started_at,
+        "ended_at": ended_at,
+        "duration": duration,
+        "rows": run.rows or 0,
+        "error": (run.error or "")[:1000] or None,
+    }
+
+    # The Running row may have been rolled back with the job's own work
+    frappe.db.sql("""
+        INSERT INTO `tabChat Job Run`
+            (name, creation, modified, owner, modified_by, job, status,
+             started_at, ended_at, duration, rows_touched, error)
+        VALUES (%(name)s, %(started_at)s, %(ended_at)s, 'Administrator', 'Administrator', %(job)s, %(status)s,
+             %(started_at)s, %(ended_at)s, %(duration)s, %(rows)s, %(error)s)
+        ON DUPLICATE KEY UPDATE
+            status = VALUES(status),
+            ended_at = VALUES(ended_at),
+            duration = VALUES(duration),
+            rows_touched = VALUES(rows_touched),
+            error = VALUES(error),
+            modified = VALUES(modified)
+    """, values)
+    frappe.db.commit()
+
+    pipe = pipeline()
+    pipe.sadd(_jobs_key(), run.job)
+    pipe.lpush(_durations_key(run.job), round(duration, 3))
+    pipe.ltrim(_durations_key(run.job), 0, ROLLING_WINDOW - 1)
+    pipe.execute()
+
+
+@contextmanager
+def track_job_run(job):
+    """
+    Time a scheduler job and log the run to Chat Job Run
+
+    The job sets `run.rows` and calls `run.fail(e)` for errors it handles
+    itself, before logging them; an exception escaping the block is recorded
+    and re-raised. Either way the job's uncommitted work is rolled back
+    before the run is written. Logging failures never affect the job.
+
+    Args:
+        job (str): Dotted method path, as listed in scheduler_events
+    """
+    run = JobRun(job)
+    started_at = now_datetime()
+    clock = time.monotonic()
+
+    name = None
+    try:
+        name = _start_run(job, started_at)
+    except Exception as e:
+        frappe.log_error(f"Error logging start of job {job}: {str(e)}", "Chat Job Run")
+
+    try:
+        yield run
+    except Exception as e:
+        run.fail(e)
+        raise
+    finally:
+        try:
+            _finish_run(run, name or frappe.generate_hash(length=10), started_at, time.monotonic() - clock)
+        except Exception as e:
+            frappe.log_error(f"Error logging end of job {job}: {str(e)}", "Chat Job Run")
+
+
+def get_job_intervals():
+    """
+    Seconds between scheduled runs of each job in this app's scheduler_events
+
+    Returns:
+        dict: job (dotted method path) -> seconds
+    """
+    from croniter import croniter
+
+    from f_chat import hooks
+
+    intervals = {}
+    base = now_datetime()
+    for frequency, methods in hooks.scheduler_events.items():
+        if frequency == "cron":
+            for expression, cron_methods in methods.items():
+                schedule = croniter(expression, base)
+                first = schedule.get_next(float)
+                seconds = schedule.get_next(float) - first
+                for method in cron_methods:
+                    intervals[method] = seconds
+        elif frequency in FREQUENCY_SECONDS:
+            for method in methods:
+                intervals[method] = FREQUENCY_SECONDS[frequency]
+
+    return intervals
+
+
+def get_job_stats(since_hours=24):
+    """
+    Rolling duration percentiles and recent outcomes per job
+
+    Args:
+        since_hours (int): Window for the run and error counts
+
+    Returns:
+        list: One dict per job, jobs closest to their interval first
+    """
+    pipe = pipeline()
+    pipe.smembers(_jobs_key())
+    jobs = sorted(decode_set(pipe.execute()[0]))
+
+    durations = {}
+    if jobs:
+        pipe = pipeline()
+        for job in jobs:
+            pipe.lrange(_durations_key(job), 0, -1)
+        durations = {
+            job: np.array([float(decode(value)) for value in values], dtype=np.float64)
+            for job, values in zip(jobs, pipe.execute(), strict=True)
+        }
+
+    since = add_to_date(now_datetime(), hours=-since_hours)
+    counts = {
+        row.job: row for row in frappe.db.sql("""
+            SELECT job, COUNT(*) AS runs, SUM(status = 'Error') AS errors
+            FROM `tabChat Job Run`
+            WHERE started_at >= %(since)s
+            GROUP BY job
+        """, {"since": since}, as_dict=True)
+    }
+    latest = {
+        row.job: row for row in frappe.db.sql("""
+            SELECT r.job, r.status, r.started_at, r.duration, r.rows_touched
+            FROM `tabChat Job Run` r
+            INNER JOIN (
+                SELECT job, MAX(started_at) AS started_at
+                FROM `tabChat Job Run`
+                GROUP BY job
+            ) last_run ON last_run.job = r.job AND last_run.started_at = r.started_at
+        """, as_dict=True)
+    }
+    intervals = get_job_intervals()
+
+    stats = []
+    for job in sorted(set(jobs) | set(latest)):
+        window = durations.get(job, np.empty(0))
+        p50, p95 = np.percentile(window, [50, 95]) if len(window) else (None, None)
+        interval = intervals.get(job)
+        last = latest.get(job) or {}
+        recent = counts.get(job) or {}
+
+        stats.append({
+            "job": job,
+            "interval": interval,
+            "samples": len(window),
+            "p50": round(float(p50), 3) if p50 is not None else None,
+            "p95": round(float(p95), 3) if p95 is not None else None,
+            "max": round(float(window.max()), 3) if len(window) else None,
+            "p95_of_interval": round(float(p95) / interval, 4) if p95 is not None and interval else None,
+            "creeping": bool(p95 is not None and interval and p95 >= CREEP_RATIO * interval),
+            "runs": int(recent.get("runs") or 0),
+            "errors": int(recent.get("errors") or 0),
+            "last_status": last.get("status"),
+            "last_started_at": str(get_datetime(last["started_at"])) if last.get("started_at") else None,
+            "last_duration": last.get("duration"),
+            "last_rows": last.get("rows_touched"),
+        })
+
+    stats.sort(key=lambda entry: entry["p95_of_interval"] or 0, reverse=True)
+    return stats
+
+
+# Scheduled job
+
+def prune_job_runs():
+    """Daily job: drop runs older than RUN_RETENTION_DAYS, and the rolling stats of jobs left with none"""
+    with track_job_run("f_chat.f_chat.doctype.chat_job_run.chat_job_run.prune_job_runs") as run:
+        try:
+            frappe.db.sql("""
+                DELETE FROM `tabChat Job Run`
+                WHERE started_at < %(cutoff)s
+            """, {"cutoff": add_days(now_datetime(), -RUN_RETENTION_DAYS)})
+            run.rows = frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+            frappe.db.commit()
+
+            # Jobs that were renamed or removed stop showing in the stats
+            pipe = pipeline()
+            pipe.smembers(_jobs_key())
+            stale = decode_set(pipe.execute()[0]) - set(frappe.db.sql_list(
+                "SELECT DISTINCT job FROM `tabChat Job Run`"
+            ))
+            if stale:
+                pipe = pipeline(transaction=True)
+                pipe.srem(_jobs_key(), *stale)
+                pipe.delete(*[_durations_key(job) for job in stale])
+                pipe.execute()
+
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in prune_job_runs: {str(e)}")
@@ -0,0 +1,85 @@
+# Copyright (c) 2026, Blue Phoenix and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import pipeline
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import (
+	_durations_key,
+	_jobs_key,
+	get_job_intervals,
+	get_job_stats,
+	track_job_run,
+)
+
+TEST_JOB = "f_chat.tests.chat_job_run_test.job"
+MARKER_KEY = "chat_job_run_test_marker"
+
+
+def forget_test_job():
+	frappe.db.delete("Chat Job Run", {"job": TEST_JOB})
+	frappe.db.set_global(MARKER_KEY, None)
+	frappe.db.commit()
+
+	pipe = pipeline()
+	pipe.srem(_jobs_key(), TEST_JOB)
+	pipe.delete(_durations_key(TEST_JOB))
+	pipe.execute()
+
+
+def last_run():
+	return frappe.get_all(
+		"Chat Job Run",
+		filters={"job": TEST_JOB},
+		fields=["status", "rows_touched", "duration", "error"],
+		order_by="started_at desc",
+		limit=1
+	)[0]
+
+
+class TestChatJobRun(FrappeTestCase):
+	def setUp(self):
+		forget_test_job()
+		self.addCleanup(forget_test_job)
+
+	def test_successful_run_is_recorded(self):
+		with track_job_run(TEST_JOB) as run:
+			run.rows = 3
+
+		run = last_run()
+		self.assertEqual(run.status, "Success")
+		self.assertEqual(run.rows_touched, 3)
+		self.assertGreaterEqual(run.duration, 0)
+
+		stats = {entry["job"]: entry for entry in get_job_stats()}
+		self.assertEqual(stats[TEST_JOB]["samples"], 1)
+		self.assertEqual(stats[TEST_JOB]["runs"], 1)
+
+	def test_raised_error_rolls_back_the_job_work(self):
+		with self.assertRaises(frappe.ValidationError):
+			with track_job_run(TEST_JOB):
+				frappe.db.set_global(MARKER_KEY, "partial work")
+				raise frappe.ValidationError("boom")
+
+		self.assertIsNone(frappe.db.get_global(MARKER_KEY))
+		run = last_run()
+		self.assertEqual(run.status, "Error")
+		self.assertIn("boom", run.error)
+
+	def test_handled_error_rolls_back_the_job_work(self):
+		with track_job_run(TEST_JOB) as run:
+			frappe.db.set_global(MARKER_KEY, "partial work")
+			run.fail(frappe.ValidationError("handled"))
+
+		self.assertIsNone(frappe.db.get_global(MARKER_KEY))
+		self.assertEqual(last_run().status, "Error")
+
+	def test_intervals_are_keyed_by_method_path(self):
+		intervals = get_job_intervals()
+
+		self.assertEqual(intervals["f_chat.f_chat.maintenance.cleanup_old_messages"], 3600)
+		self.assertEqual(
+			intervals["f_chat.f_chat.doctype.chat_job_run.chat_job_run.prune_job_runs"], 86400
+		)
+		self.assertNotIn("prune_job_runs", intervals)
@@ -6,6 +6,10 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import now_datetime
 
+from f_chat.APIs.notification_chatroom.chat_apis import typing_indicators
+from f_chat.APIs.notification_chatroom.chat_apis import engagement_sketches, system_counters
+from f_chat.f_chat.doctype.chat_activity_rollup.chat_activity_rollup import forget_message
+
 class ChatMessage(Document):
     def validate(self):
         self.validate_sender_permissions()
@@ -222,6 +226,9 @@ class ChatMessage(Document):
     def on_trash(self):
         """Handle message deletion"""
         try:
+            forget_message(self)
+            system_counters.forget_message(self)
+            
             # Soft delete instead of hard delete
             self.is_deleted = 1
             self.delete_timestamp = now_datetime()
@@ -486,6 +493,7 @@ def mark_room_as_read(room_id):
             "user": current_user,
             "timestamp": now_datetime()
         })
+        engagement_sketches.record_reader(room_id, current_user)
         
         frappe.db.commit()
         
@@ -631,22 +639,9 @@ def handle_typing_indicator(data, is_typing):
         room_id = data.get('room_id')
         user = data.get('user', frappe.session.user)
         
-        if room_id:
-            # Broadcast typing indicator to other room members
-            room = frappe.get_doc("Chat Room", room_id)
-            other_members = [member.user for member in room.members if member.user != user]
-            
-            frappe.publish_realtime(
-                event="typing_indicator",
-                message={
-                    "user": user,
-                    "room_id": room_id,
-                    "is_typing": is_typing,
-                    "timestamp": str(now_datetime())
-                },
-                user=other_members,
-                room=f"chat_room_{room_id}"
-            )
+        if room_id and typing_indicators.is_typing_enabled():
+            # Aggregated `typing_users` events go to the room
+            typing_indicators.set_typing(room_id, user, is_typing)
             
     except Exception as e:
         frappe.log_error(f"Error in handle_typing_indicator: {str(e)}")
@@ -685,4 +680,13 @@ def before_save_hook(self, method=None):
         self.process_message_content()
         
     except Exception as e:
-        frappe.log_error(f"Error in chat message before_save_hook: {str(e)}")
\ No newline at end of file
+        frappe.log_error(f"Error in chat message before_save_hook: {str(e)}")
+
+
+def on_doctype_update():
+    """Indexes that cannot be declared in the doctype JSON"""
+    from f_chat.APIs.notification_chatroom.chat_apis.message_search import ensure_fulltext_index
+    ensure_fulltext_index()
+
+    # Keyset paging / jump-to-message within a room
+    frappe.db.add_index("Chat Message", ["chat_room", "timestamp", "name"])
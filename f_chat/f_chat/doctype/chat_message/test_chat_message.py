@@ -1,9 +1,371 @@
 # Copyright (c) 2025, Blue Phoenix and Contributors
 # See license.txt
 
-# import frappe
+import gzip
+import json
+from unittest.mock import patch
+
+import frappe
+import numpy as np
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis import (
+	compliance_export,
+	message_export,
+	message_search,
+	system_counters,
+)
+from f_chat.APIs.notification_chatroom.chat_apis.chat_api import _seek_messages, get_chat_messages
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import pipeline
+from f_chat.APIs.notification_chatroom.chat_apis.response_analytics import (
+	first_response_times,
+	reply_latencies,
+)
+from f_chat.f_chat.doctype.chat_message_archive.chat_message_archive import archive_messages
+from f_chat.f_chat.doctype.chat_room.test_chat_room import delete_room, leave_room, make_room, make_user
+from f_chat.f_chat.maintenance import update_user_chat_permissions
+from f_chat.f_chat.retention import expire_batch
+
+TEST_USERS = ("chat-message-a@example.com", "chat-message-b@example.com", "chat-message-c@example.com")
 
 
 class TestChatMessage(FrappeTestCase):
-	pass
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b, cls.user_c = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+
+		base = add_to_date(now_datetime(), days=-1).replace(microsecond=0)
+		self.messages = []
+		for offset in range(5):
+			message = frappe.get_doc({
+				"doctype": "Chat Message",
+				"chat_room": self.room.name,
+				"sender": (self.user_a, self.user_b)[offset % 2],
+				"message_type": "Text",
+				"message_content": f"message {offset}",
+				"timestamp": add_to_date(base, minutes=offset),
+			}).insert(ignore_permissions=True)
+			self.messages.append((message.timestamp, message.name))
+		frappe.db.commit()
+
+		# The two oldest move to the archive tier
+		archive_messages([name for _timestamp, name in self.messages[:2]])
+
+	def names(self, messages):
+		return [message.name for message in messages]
+
+	def test_seek_before_falls_through_to_archive(self):
+		messages, has_more = _seek_messages(self.room.name, self.messages[4], "before", 10)
+
+		self.assertEqual(self.names(messages), [name for _timestamp, name in reversed(self.messages[:4])])
+		self.assertEqual([bool(message.get("archived")) for message in messages], [False, False, True, True])
+		self.assertFalse(has_more)
+
+	def test_seek_pages_inside_archive(self):
+		messages, has_more = _seek_messages(self.room.name, self.messages[2], "before", 1)
+		self.assertEqual(self.names(messages), [self.messages[1][1]])
+		self.assertTrue(has_more)
+
+		messages, has_more = _seek_messages(self.room.name, self.messages[1], "before", 1)
+		self.assertEqual(self.names(messages), [self.messages[0][1]])
+		self.assertFalse(has_more)
+
+	def test_seek_after_from_archive_continues_into_hot_table(self):
+		messages, has_more = _seek_messages(self.room.name, self.messages[0], "after", 3)
+
+		self.assertEqual(self.names(messages), [name for _timestamp, name in self.messages[1:4]])
+		self.assertTrue(has_more)
+
+	def test_page_mode_continues_into_archive(self):
+		frappe.set_user(self.user_a)
+		self.addCleanup(frappe.set_user, "Administrator")
+
+		# Newest first: the hot messages (with any system ones), then the archived two
+		hot = frappe.get_all(
+			"Chat Message",
+			filters={"chat_room": self.room.name, "is_deleted": 0},
+			order_by="timestamp desc, name desc",
+			pluck="name"
+		)
+		expected = [*hot, self.messages[1][1], self.messages[0][1]]
+
+		response = get_chat_messages(self.room.name, page=2, page_size=3)
+
+		self.assertTrue(response["success"])
+		self.assertEqual(self.names(response["data"]["messages"]), expected[3:6])
+		self.assertIn(self.messages[0][1], expected[3:6])
+		self.assertEqual(response["data"]["pagination"]["total_count"], len(expected))
+
+	def test_export_chunks_merge_the_archive_in_order(self):
+		chunks = list(message_export.iter_message_chunks(self.room.name, chunk_size=2))
+
+		self.assertTrue(all(len(chunk) <= 2 for chunk in chunks))
+		exported = [message.name for chunk in chunks for message in chunk]
+		self.assertEqual(exported[:5], [name for _timestamp, name in self.messages])
+		self.assertEqual(chunks[0][0].message_content, "message 0")
+		self.assertEqual(chunks[0][0].sender_name, frappe.db.get_value("User", self.user_a, "full_name"))
+
+	def test_export_job_writes_a_gzip_file(self):
+		with patch.object(message_export.frappe, "enqueue"):
+			with patch.object(message_export.frappe, "publish_realtime"):
+				job = message_export.start_export(self.room.name, self.user_a, format_type="ndjson")
+				message_export.run_export(job["job_id"])
+
+		job = message_export.get_job(job["job_id"])
+		self.assertEqual(job["status"], "Completed", job.get("error"))
+		file_doc = frappe.get_doc("File", {"file_url": job["file_url"]})
+		self.addCleanup(frappe.delete_doc, "File", file_doc.name, force=True, ignore_permissions=True)
+
+		with gzip.open(file_doc.get_full_path(), "rt", encoding="utf-8") as stream:
+			rows = [json.loads(line) for line in stream]
+		self.assertEqual(len(rows), job["processed"])
+		self.assertEqual([row["name"] for row in rows[:5]], [name for _timestamp, name in self.messages])
+
+
+class TestResponseAnalytics(FrappeTestCase):
+	def test_first_response_times(self):
+		# Conversations open at 0, 5000, 10000 and 20000 (gap 1800)
+		ts = np.array([0, 10, 20, 5000, 5100, 10000, 20000, 20005], dtype=np.float64)
+		sender = np.array([0, 0, 1, 0, 0, 1, 2, 2], dtype=np.int32)
+
+		latencies, unanswered = first_response_times(ts, sender, gap=1800)
+
+		# Only the first opener is answered inside its conversation; the reply
+		# at 10000 comes after a silence and opens a conversation of its own
+		self.assertEqual(latencies.tolist(), [20.0])
+		self.assertEqual(unanswered, 3)
+
+	def test_first_response_times_empty(self):
+		latencies, unanswered = first_response_times(np.empty(0), np.empty(0, dtype=np.int32))
+		self.assertEqual(len(latencies), 0)
+		self.assertEqual(unanswered, 0)
+
+	def test_reply_latencies_skip_self_replies(self):
+		ts = np.array([0, 5, 30, 40], dtype=np.float64)
+		sender = np.array([0, 1, 0, 0], dtype=np.int32)
+		parent = np.array([-1, 0, 1, 0], dtype=np.int64)
+
+		self.assertEqual(reply_latencies(ts, sender, parent).tolist(), [5.0, 25.0])
+
+
+class TestMessageSearch(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b, cls.user_c = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+
+		for sender, content in (
+			(self.user_a, "shipping the release tonight"),
+			(self.user_b, "release notes are in the wiki"),
+			(self.user_b, "lunch anyone?"),
+		):
+			frappe.get_doc({
+				"doctype": "Chat Message",
+				"chat_room": self.room.name,
+				"sender": sender,
+				"message_type": "Text",
+				"message_content": content,
+				"timestamp": now_datetime(),
+			}).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+	def test_search_is_limited_to_member_rooms(self):
+		rows, has_next, _terms = message_search.search(self.user_a, "release", room_id=self.room.name)
+		self.assertEqual(len(rows), 2)
+		self.assertFalse(has_next)
+
+		rows, _has_next, _terms = message_search.search(self.user_c, "release", room_id=self.room.name)
+		self.assertEqual(rows, [])
+
+	def test_short_words_still_narrow_the_search(self):
+		rows, _has_next, terms = message_search.search(self.user_a, "release no", room_id=self.room.name)
+		self.assertEqual([row.message_content for row in rows], ["release notes are in the wiki"])
+		self.assertEqual(rows[0].highlights, [[0, 7], [8, 13]])
+		self.assertEqual(len(terms), 2)
+
+		rows, _has_next, _terms = message_search.search(self.user_a, "release is", room_id=self.room.name)
+		self.assertEqual(rows, [])
+
+	def test_facets_need_a_term_or_filter(self):
+		self.assertIsNone(message_search.get_facets(self.user_a))
+		self.assertIsNone(message_search.get_facets(self.user_a, "  ", filters={"sender": None}))
+
+	def test_facets_count_the_search(self):
+		facets = message_search.get_facets(self.user_a, "release", room_id=self.room.name)
+
+		self.assertEqual(facets["total"], 2)
+		self.assertEqual(
+			{(entry["value"], entry["count"]) for entry in facets["senders"]},
+			{(self.user_a, 1), (self.user_b, 1)}
+		)
+		self.assertEqual(facets["message_types"], [{"value": "Text", "count": 2}])
+
+		# A selected sender narrows the total but not its own facet
+		facets = message_search.get_facets(
+			self.user_a, "release", room_id=self.room.name, filters={"sender": self.user_b}
+		)
+		self.assertEqual(facets["total"], 1)
+		self.assertEqual(len(facets["senders"]), 2)
+
+	def test_facets_keep_the_top_values(self):
+		facets = message_search.get_facets(self.user_a, room_id=self.room.name, size=1)
+
+		self.assertEqual(facets["total"], 3)
+		self.assertEqual(facets["senders"], [{"value": self.user_b, "count": 2, "label": "chat-message-b"}])
+
+	def test_highlights_match_word_prefixes(self):
+		terms = message_search.parse_search_term('relea "the wiki"')
+		content = "release notes are in the wiki"
+
+		self.assertEqual(message_search.find_highlights(content, terms), [[0, 7], [21, 29]])
+
+
+class TestMessageCounters(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b, cls.user_c = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b, self.user_c])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+
+	def send(self, sender, timestamp=None):
+		name = frappe.get_doc({
+			"doctype": "Chat Message",
+			"chat_room": self.room.name,
+			"sender": sender,
+			"message_type": "Text",
+			"message_content": "count me",
+			"timestamp": timestamp or now_datetime(),
+		}).insert(ignore_permissions=True).name
+		frappe.db.commit()
+		return name
+
+	def stats(self):
+		stats = system_counters.get_system_stats()
+		return stats["total_messages"], stats["messages_today"]
+
+	def test_sending_counts_the_message(self):
+		system_counters.rebuild_system_counters()
+		total, today = self.stats()
+
+		self.send(self.user_a)
+
+		self.assertEqual(self.stats(), (total + 1, today + 1))
+
+	def test_retention_leaves_the_counters(self):
+		frappe.db.set_value("Chat Room", self.room.name, "auto_delete_messages_after_days", 1)
+		self.send(self.user_a, add_to_date(now_datetime(), days=-3))
+		system_counters.rebuild_system_counters()
+		total, today = self.stats()
+
+		self.assertGreaterEqual(expire_batch("", None, None), 1)
+
+		self.assertEqual(self.stats(), (total - 1, today))
+
+	def test_disabling_a_user_leaves_the_counters(self):
+		self.send(self.user_c)
+		system_counters.rebuild_system_counters()
+		total, today = self.stats()
+
+		update_user_chat_permissions(frappe._dict(name=self.user_c, enabled=0))
+
+		self.assertEqual(self.stats(), (total - 1, today - 1))
+
+
+class TestComplianceExport(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b, cls.user_c = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b])
+		self.former = make_room("Group Chat", [self.user_a, self.user_c])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+		self.addCleanup(delete_room, self.former.name)
+
+		# user_c posted in a room they have since left
+		frappe.get_doc({
+			"doctype": "Chat Message",
+			"chat_room": self.former.name,
+			"sender": self.user_c,
+			"message_type": "Text",
+			"message_content": "before I leave",
+			"timestamp": now_datetime(),
+		}).insert(ignore_permissions=True)
+		leave_room(self.former, self.user_c)
+		frappe.db.commit()
+
+		for name in ("enqueue", "publish_realtime"):
+			patcher = patch.object(compliance_export.frappe, name)
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def forget_job(self, job_id):
+		for name in frappe.get_all(
+			"File", filters={"file_url": ["like", f"/private/files/compliance_{job_id[:8]}_%"]}, pluck="name"
+		):
+			frappe.delete_doc("File", name, force=True, ignore_permissions=True)
+		frappe.db.commit()
+
+		pipe = pipeline()
+		for key in (
+			compliance_export._job_key(job_id),
+			compliance_export._shards_key(job_id),
+			compliance_export._manifest_lock_key(job_id),
+		):
+			pipe.delete(key)
+		pipe.execute()
+
+	def test_former_rooms_are_included(self):
+		rooms = compliance_export.get_participated_rooms([self.user_c])
+
+		self.assertIn(self.former.name, rooms)
+		self.assertNotIn(self.room.name, rooms)
+
+	def test_failed_shard_is_rerun_on_restart(self):
+		job_id = compliance_export.start_compliance_export([self.user_c])["job_id"]
+		self.addCleanup(self.forget_job, job_id)
+		rooms = list(compliance_export.get_shards(job_id))
+		self.assertIn(self.former.name, rooms)
+
+		with patch.object(compliance_export, "write_room_export", side_effect=frappe.ValidationError("disk full")):
+			compliance_export.run_shard(job_id, self.former.name)
+		for room_id in rooms:
+			if room_id != self.former.name:
+				compliance_export.run_shard(job_id, room_id)
+
+		status = compliance_export.get_status(job_id)
+		self.assertEqual(status["status"], "Partial")
+		self.assertEqual(status["failed_rooms"], [self.former.name])
+		self.assertTrue(status["manifest_url"])
+
+		compliance_export.restart_compliance_export(job_id)
+		compliance_export.run_shard(job_id, self.former.name)
+
+		status = compliance_export.get_status(job_id)
+		self.assertEqual(status["status"], "Completed")
+		self.assertEqual(status["failed_rooms"], [])
+		shard = compliance_export.get_shards(job_id)[self.former.name]
+		self.assertEqual(shard["status"], compliance_export.SHARD_COMPLETED)
+		self.assertGreaterEqual(shard["processed"], 1)
@@ -0,0 +1,278 @@
+# Copyright (c) 2026, bluephoenix and contributors
+# For license information, please see license.txt
+
+import base64
+import json
+import zlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, now_datetime
+
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import track_job_run
+from f_chat.f_chat.retention import walk_message_ranges
+
+TOMBSTONE_GRACE_DAYS = 30  # cleanup_deleted_files has normally removed their files by then
+CHECKPOINT_KEY = "chat_archive_checkpoint"
+
+ARCHIVE_FIELDS = [
+    "name", "creation", "modified", "owner", "modified_by",
+    "chat_room", "sender", "message_type", "timestamp", "reply_to_message",
+    "is_edited", "edit_timestamp", "is_deleted", "delete_timestamp", "archived_on", "payload"
+]
+
+# Columns read back in the same shape as chat_api.MESSAGE_FIELDS
+READ_FIELDS = "name, sender, message_type, timestamp, reply_to_message, is_edited, edit_timestamp, payload"
+
+
+class ChatMessageArchive(Document):
+    pass
+
+
+def on_doctype_update():
+    """Same seek index as Chat Message, so cursors continue into the archive"""
+    frappe.db.add_index("Chat Message Archive", ["chat_room", "timestamp", "name"])
+
+
+def pack_payload(content, attachments, reactions):
+    """Content, attachments and reactions as one zlib-compressed, base64 string"""
+    data = json.dumps({
+        "message_content": content,
+        "attachments": attachments,
+        "reactions": reactions,
+    }, default=str, separators=(",", ":"))
+    return base64.b64encode(zlib.compress(data.encode(), 9)).decode()
+
+
+def unpack_payload(payload):
+    if not payload:
+        return {"message_content": None, "attachments": [], "reactions": []}
+    return json.loads(zlib.decompress(base64.b64decode(payload)))
+
+
+def get_archive_cutoffs(now=None):
+    """
+    Timestamps before which messages and tombstones are archived
+
+    Returns:
+        tuple: (message cutoff or None when disabled, tombstone cutoff)
+    """
+    now = now or now_datetime()
+    archive_days = cint(frappe.get_single("Chat Settings").get("archive_messages_after_days"))
+    return (
+        add_days(now, -archive_days) if archive_days > 0 else None,
+        add_days(now, -TOMBSTONE_GRACE_DAYS)
+    )
+
+
+def archive_batch(start, end, archive_before, tombstones_before):
+    """
+    Move the archivable messages of one primary-key range into the archive
+
+    A tombstone only moves once file cleanup has deleted the File rows of its
+    attachments (files still attached to a live message are never cleaned up
+    and do not hold it back); archiving drops the attachment rows that
+    cleanup finds those files by.
+
+    Args:
+        start (str): Exclusive lower bound
+        end (str): Inclusive upper bound (None for the rest of the table)
+        archive_before (datetime): Messages older than this move (None: tombstones only)
+        tombstones_before (datetime): Deleted messages deleted before this move
+
+    Returns:
+        int: Messages moved
+    """
+    conditions = ["""(
+        cm.is_deleted = 1
+        AND cm.delete_timestamp < %(tombstones_before)s
+        AND NOT EXISTS (
+            SELECT 1
+            FROM `tabChat Message Attachment` cma
+            INNER JOIN `tabFile` f ON f.file_url = cma.file_url
+            WHERE cma.parent = cm.name
+                AND cma.parenttype = 'Chat Message'
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM `tabChat Message Attachment` shared
+                    INNER JOIN `tabChat Message` live ON live.name = shared.parent
+                    WHERE shared.file_url = cma.file_url
+                        AND shared.parenttype = 'Chat Message'
+                        AND live.is_deleted = 0
+                )
+        )
+    )"""]
+    if archive_before:
+        conditions.append("(cm.is_deleted = 0 AND cm.timestamp < %(archive_before)s)")
+
+    names = frappe.db.sql_list(f"""
+        SELECT cm.name FROM `tabChat Message` cm
+        WHERE cm.name > %(start)s
+            {"AND cm.name <= %(end)s" if end else ""}
+            AND ({" OR ".join(conditions)})
+    """, {"start": start, "end": end, "archive_before": archive_before, "tombstones_before": tombstones_before})
+
+    return archive_messages(names)
+
+
+def archive_messages(names):
+    """
+    Copy messages (with attachments and reactions) into the archive and
+    delete them from the hot tables, committing once
+
+    Args:
+        names (list): Chat Message names
+
+    Returns:
+        int: Messages moved
+    """
+    if not names:
+        return 0
+
+    values = {"names": tuple(names)}
+    messages = frappe.db.sql("""
+        SELECT name, creation, owner, chat_room, sender, message_type, message_content, timestamp,
+            reply_to_message, is_edited, edit_timestamp, is_deleted, delete_timestamp
+        FROM `tabChat Message`
+        WHERE name IN %(names)s
+    """, values, as_dict=True)
+
+    attachments = {}
+    for attachment in frappe.db.sql("""
+        SELECT parent, file_name, file_url, file_type, file_size
+        FROM `tabChat Message Attachment`
+        WHERE parent IN %(names)s AND parenttype = 'Chat Message'
+        ORDER BY idx
+    """, values, as_dict=True):
+        attachments.setdefault(attachment.pop("parent"), []).append(attachment)
+
+    reactions = {}
+    for reaction in frappe.db.sql("""
+        SELECT parent, user, reaction_emoji, timestamp
+        FROM `tabChat Message Reaction`
+        WHERE parent IN %(names)s AND parenttype = 'Chat Message'
+        ORDER BY idx
+    """, values, as_dict=True):
+        reactions.setdefault(reaction.pop("parent"), []).append(reaction)
+
+    now = now_datetime()
+    rows = [
+        [
+            message.name, message.creation, now, message.owner, "Administrator",
+            message.chat_room, message.sender, message.message_type, message.timestamp,
+            message.reply_to_message, message.is_edited, message.edit_timestamp,
+            message.is_deleted, message.delete_timestamp, now,
+            pack_payload(
+                message.message_content,
+                attachments.get(message.name, []),
+                reactions.get(message.name, [])
+            )
+        ]
+        for message in messages
+    ]
+
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(ARCHIVE_FIELDS)) + ")"] * len(rows))
+    frappe.db.sql(f"""
+        INSERT IGNORE INTO `tabChat Message Archive` ({", ".join(ARCHIVE_FIELDS)})
+        VALUES {placeholders}
+    """, [value for row in rows for value in row])
+
+    for child in ("Chat Message Attachment", "Chat Message Reaction"):
+        frappe.db.sql(f"""
+            DELETE FROM `tab{child}`
+            WHERE parent IN %(names)s AND parenttype = 'Chat Message'
+        """, values)
+    frappe.db.sql("DELETE FROM `tabChat Message` WHERE name IN %(names)s", values)
+    frappe.db.commit()
+
+    return len(messages)
+
+
+def _as_message(row):
+    """Archive row in the shape the message APIs return, with raw attachments/reactions"""
+    payload = unpack_payload(row.pop("payload"))
+    row["message_content"] = payload["message_content"]
+    row["archived"] = 1
+    row["archived_attachments"] = payload["attachments"]
+    row["archived_reactions"] = payload["reactions"]
+    return row
+
+
+def seek_archived(room_id, position, direction, limit):
+    """
+    Archived live messages strictly before/after a (timestamp, name) position
+
+    Returns:
+        list: Messages ordered away from the position
+    """
+    timestamp, name = position
+    if direction == "before":
+        condition = "(timestamp < %(timestamp)s OR (timestamp = %(timestamp)s AND name < %(name)s))"
+        order = "timestamp DESC, name DESC"
+    else:
+        condition = "(timestamp > %(timestamp)s OR (timestamp = %(timestamp)s AND name > %(name)s))"
+        order = "timestamp ASC, name ASC"
+
+    rows = frappe.db.sql(f"""
+        SELECT {READ_FIELDS}
+        FROM `tabChat Message Archive`
+        WHERE chat_room = %(room_id)s
+            AND is_deleted = 0
+            AND {condition}
+        ORDER BY {order}
+        LIMIT %(limit)s
+    """, {"room_id": room_id, "timestamp": timestamp, "name": name, "limit": limit}, as_dict=True)
+
+    return [_as_message(row) for row in rows]
+
+
+def newest_archived_timestamp(room_id):
+    """Upper edge of a room's archived range (None when nothing is archived)"""
+    newest = frappe.db.sql("""
+        SELECT timestamp FROM `tabChat Message Archive`
+        WHERE chat_room = %(room_id)s
+        ORDER BY timestamp DESC
+        LIMIT 1
+    """, {"room_id": room_id})
+    return newest[0][0] if newest else None
+
+
+def get_archived_messages(names):
+    """
+    Archived messages by name
+
+    Returns:
+        dict: name -> message
+    """
+    if not names:
+        return {}
+
+    rows = frappe.db.sql(f"""
+        SELECT {READ_FIELDS}, chat_room, is_deleted
+        FROM `tabChat Message Archive`
+        WHERE name IN %(names)s
+    """, {"names": tuple(names)}, as_dict=True)
+    return {row.name: _as_message(row) for row in rows}
+
+
+# Scheduled job
+
+def archive_old_messages():
+    """Daily job: move old messages and tombstones to the archive from the saved checkpoint"""
+    with track_job_run("f_chat.f_chat.doctype.chat_message_archive.chat_message_archive.archive_old_messages") as run:
+        try:
+            archive_before, tombstones_before = get_archive_cutoffs()
+            result = walk_message_ranges(
+                CHECKPOINT_KEY,
+                lambda start, end: archive_batch(start, end, archive_before, tombstones_before)
+            )
+            run.rows = result["affected"]
+
+            if result["affected"]:
+                frappe.logger().info(
+                    f"Archived {result['affected']} chat messages in {result['batches']} batches"
+                )
+
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in archive_old_messages: {str(e)}")
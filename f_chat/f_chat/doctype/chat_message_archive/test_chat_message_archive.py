@@ -0,0 +1,126 @@
+# Copyright (c) 2026, Blue Phoenix and Contributors
+# See license.txt
+
+from itertools import pairwise
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, get_datetime, now_datetime
+
+from f_chat.f_chat.doctype.chat_message_archive.chat_message_archive import (
+	archive_batch,
+	get_archived_messages,
+)
+from f_chat.f_chat.doctype.chat_room.test_chat_room import delete_room, make_room, make_user
+from f_chat.f_chat.retention import get_checkpoint, walk_message_ranges
+
+TEST_USERS = ("chat-archive-a@example.com", "chat-archive-b@example.com")
+CHECKPOINT_KEY = "chat_archive_test_checkpoint"
+
+# Older than anything a test site holds, so a full walk only moves this test's rows
+OLD = get_datetime("2000-01-01 09:00:00")
+ARCHIVE_BEFORE = get_datetime("2001-01-01 00:00:00")
+
+
+class TestChatMessageArchive(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+		self.addCleanup(frappe.db.set_global, CHECKPOINT_KEY, "")
+
+	def make_message(self, timestamp, **fields):
+		return frappe.get_doc({
+			"doctype": "Chat Message",
+			"chat_room": self.room.name,
+			"sender": self.user_a,
+			"message_type": "Text",
+			"message_content": "archive me",
+			"timestamp": timestamp,
+			**fields,
+		}).insert(ignore_permissions=True).name
+
+	def test_walk_covers_the_table_in_contiguous_ranges(self):
+		for offset in range(5):
+			self.make_message(add_to_date(now_datetime(), minutes=-offset))
+		frappe.db.commit()
+
+		ranges = []
+
+		def record(start, end):
+			ranges.append((start, end))
+			return 0
+
+		result = walk_message_ranges(CHECKPOINT_KEY, record, batch_size=2)
+
+		self.assertTrue(result["completed_pass"])
+		self.assertEqual(result["batches"], len(ranges))
+		self.assertEqual(ranges[0][0], "")
+		self.assertIsNone(ranges[-1][1])
+		for (_start, end), (next_start, _next_end) in pairwise(ranges):
+			self.assertEqual(end, next_start)
+
+		# A completed pass starts the next run from the beginning
+		self.assertEqual(get_checkpoint(CHECKPOINT_KEY), "")
+
+	def test_walk_archives_old_messages_and_tombstones(self):
+		old = [self.make_message(add_to_date(OLD, minutes=offset)) for offset in range(3)]
+		tombstone = self.make_message(
+			now_datetime(), is_deleted=1, delete_timestamp=add_to_date(OLD, days=30)
+		)
+		recent = [self.make_message(add_to_date(now_datetime(), minutes=-offset)) for offset in range(2)]
+		frappe.db.commit()
+
+		result = walk_message_ranges(
+			CHECKPOINT_KEY,
+			lambda start, end: archive_batch(start, end, ARCHIVE_BEFORE, ARCHIVE_BEFORE),
+			batch_size=2
+		)
+
+		self.assertTrue(result["completed_pass"])
+		self.assertEqual(result["affected"], 4)
+		self.assertGreater(result["batches"], 1)
+
+		moved = [*old, tombstone]
+		self.assertFalse(frappe.get_all("Chat Message", filters={"name": ["in", moved]}))
+		archived = get_archived_messages(moved)
+		self.assertEqual(set(archived), set(moved))
+		self.assertEqual(archived[old[0]].message_content, "archive me")
+		self.assertEqual(
+			set(frappe.get_all("Chat Message", filters={"chat_room": self.room.name}, pluck="name")),
+			set(recent)
+		)
+
+	def test_tombstone_waits_for_its_files_to_be_cleaned_up(self):
+		file_url = f"https://example.com/chat-archive-{frappe.generate_hash(length=8)}.png"
+		file_doc = frappe.get_doc({
+			"doctype": "File",
+			"file_name": "chat-archive.png",
+			"file_url": file_url,
+		}).insert(ignore_permissions=True)
+		self.addCleanup(frappe.db.commit)
+		self.addCleanup(frappe.db.delete, "File", {"file_url": file_url})
+
+		tombstone = self.make_message(
+			now_datetime(),
+			is_deleted=1,
+			delete_timestamp=add_to_date(OLD, days=30),
+			file_attachments=[{"file_name": "chat-archive.png", "file_url": file_url}]
+		)
+		frappe.db.commit()
+
+		self.assertEqual(archive_batch("", None, None, ARCHIVE_BEFORE), 0)
+		self.assertTrue(frappe.db.exists("Chat Message", tombstone))
+
+		# Once file cleanup has removed the File, the tombstone moves
+		frappe.delete_doc("File", file_doc.name, force=True, ignore_permissions=True)
+		frappe.db.commit()
+
+		self.assertEqual(archive_batch("", None, None, ARCHIVE_BEFORE), 1)
+		self.assertIn(tombstone, get_archived_messages([tombstone]))
@@ -1,9 +1,14 @@
 # Copyright (c) 2025, Blue Phoenix and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class ChatMessageAttachment(Document):
 	pass
+
+
+def on_doctype_update():
+	"""File cleanup and archiving look attachments up by file_url"""
+	frappe.db.add_index("Chat Message Attachment", ["file_url"])
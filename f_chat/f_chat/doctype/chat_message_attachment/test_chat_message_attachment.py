@@ -0,0 +1,80 @@
+# Copyright (c) 2026, Blue Phoenix and Contributors
+# See license.txt
+
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, now_datetime
+
+from f_chat.f_chat.doctype.chat_room.test_chat_room import delete_room, make_room, make_user
+from f_chat.f_chat.file_cleanup import GRACE_DAYS, delete_chunk, find_candidates
+
+TEST_USERS = ("chat-attachment-a@example.com", "chat-attachment-b@example.com")
+
+
+class TestFileCleanup(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+
+	def make_file(self, label):
+		# External URLs, so cleanup never touches the disk
+		file_url = f"https://example.com/chat-cleanup-{label}-{frappe.generate_hash(length=8)}.png"
+		frappe.get_doc({
+			"doctype": "File",
+			"file_name": f"chat-cleanup-{label}.png",
+			"file_url": file_url,
+		}).insert(ignore_permissions=True)
+		self.addCleanup(frappe.db.commit)
+		self.addCleanup(frappe.db.delete, "File", {"file_url": file_url})
+		return file_url
+
+	def make_message(self, file_url, deleted_days_ago=None):
+		fields = {}
+		if deleted_days_ago is not None:
+			fields = {"is_deleted": 1, "delete_timestamp": add_days(now_datetime(), -deleted_days_ago)}
+		frappe.get_doc({
+			"doctype": "Chat Message",
+			"chat_room": self.room.name,
+			"sender": self.user_a,
+			"message_type": "File",
+			"message_content": "attached",
+			"timestamp": now_datetime(),
+			"file_attachments": [{"file_name": "attached.png", "file_url": file_url}],
+			**fields,
+		}).insert(ignore_permissions=True)
+
+	def candidates(self):
+		grace_period = add_days(now_datetime(), -GRACE_DAYS)
+		return {row.file_url: row for row in find_candidates("", grace_period, limit=100000)}
+
+	def test_only_expired_unshared_files_are_removed(self):
+		orphan = self.make_file("orphan")
+		recent = self.make_file("recent")
+		shared = self.make_file("shared")
+
+		self.make_message(orphan, deleted_days_ago=GRACE_DAYS + 1)
+		self.make_message(recent, deleted_days_ago=1)
+		self.make_message(shared, deleted_days_ago=GRACE_DAYS + 1)
+		self.make_message(shared)
+		frappe.db.commit()
+
+		candidates = self.candidates()
+		self.assertIn(orphan, candidates)
+		self.assertNotIn(recent, candidates)
+		self.assertNotIn(shared, candidates)
+
+		with ThreadPoolExecutor(max_workers=1) as executor:
+			self.assertEqual(delete_chunk([candidates[orphan]], executor), (1, 0))
+
+		self.assertFalse(frappe.db.exists("File", {"file_url": orphan}))
+		self.assertTrue(frappe.db.exists("File", {"file_url": shared}))
+		self.assertNotIn(orphan, self.candidates())
@@ -6,6 +6,9 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import now_datetime
 
+from f_chat.APIs.notification_chatroom.chat_apis.engagement_sketches import record_reader
+from f_chat.f_chat.retention import soft_delete_where
+
 class ChatRoom(Document):
     def validate(self):
         self.validate_room_type()
@@ -145,6 +148,7 @@ class ChatRoom(Document):
             if member.user == user_id:
                 member.last_read_timestamp = now_datetime()
                 self.save(ignore_permissions=True)
+                record_reader(self.name, user_id)
                 break
 
     def after_insert_hook(self, method=None):
@@ -179,12 +183,8 @@ class ChatRoom(Document):
     def on_trash(self):
         """Handle room deletion"""
         try:
-            # Archive all messages in the room instead of deleting
-            frappe.db.sql("""
-                UPDATE `tabChat Message` 
-                SET is_deleted = 1, delete_timestamp = %s, message_content = 'Room was deleted'
-                WHERE chat_room = %s AND is_deleted = 0
-            """, [now_datetime(), self.name])
+            # Soft-delete all messages in the room (rollups and counters follow)
+            soft_delete_where("chat_room = %(room)s", {"room": self.name}, "Room was deleted")
             
             # Create final system message
             self.create_system_message("This room has been deleted")
@@ -1,9 +1,269 @@
 # Copyright (c) 2025, Blue Phoenix and Contributors
 # See license.txt
 
-# import frappe
+import time
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, get_datetime, getdate, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis import engagement_sketches, people_index, typing_indicators
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import (
+	get_room_members,
+	get_user_rooms,
+	is_member,
+)
+from f_chat.APIs.notification_chatroom.chat_apis.quick_switcher import _load_user_index
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import pipeline
+from f_chat.f_chat.doctype.chat_message_archive.chat_message_archive import archive_messages
+from f_chat.f_chat.maintenance import refresh_room_statistics
+
+TEST_USERS = ("chat-room-a@example.com", "chat-room-b@example.com", "chat-room-c@example.com")
+
+
+def make_user(email):
+	if not frappe.db.exists("User", email):
+		frappe.get_doc({
+			"doctype": "User",
+			"email": email,
+			"first_name": email.split("@")[0],
+			"send_welcome_email": 0,
+		}).insert(ignore_permissions=True)
+	return email
+
+
+def make_room(room_type, users):
+	return frappe.get_doc({
+		"doctype": "Chat Room",
+		"room_name": f"Test {room_type} {frappe.generate_hash(length=6)}",
+		"room_type": room_type,
+		"room_status": "Active",
+		"max_members": 10,
+		"members": [{"user": user, "role": "Member"} for user in users],
+	}).insert(ignore_permissions=True)
+
+
+def delete_room(room_id):
+	for doctype in ("Chat Message", "Chat Message Archive"):
+		frappe.db.delete(doctype, {"chat_room": room_id})
+	frappe.delete_doc("Chat Room", room_id, force=True, ignore_permissions=True)
+	frappe.db.commit()
+
+
+def leave_room(room, user):
+	room.members = [member for member in room.members if member.user != user]
+	room.save(ignore_permissions=True)
 
 
 class TestChatRoom(FrappeTestCase):
-	pass
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b, cls.user_c = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def make_room(self, room_type, users):
+		room = make_room(room_type, users)
+		frappe.db.commit()
+		self.addCleanup(delete_room, room.name)
+		return room
+
+	def test_membership_index_follows_join_and_leave(self):
+		room = self.make_room("Group Chat", [self.user_a, self.user_b])
+
+		self.assertTrue(is_member(room.name, self.user_b))
+		self.assertIn(room.name, get_user_rooms(self.user_b))
+
+		room.append("members", {"user": self.user_c, "role": "Member"})
+		room.save(ignore_permissions=True)
+		self.assertEqual(get_room_members(room.name), {self.user_a, self.user_b, self.user_c})
+		self.assertIn(room.name, get_user_rooms(self.user_c))
+
+		leave_room(room, self.user_b)
+		self.assertFalse(is_member(room.name, self.user_b))
+		self.assertNotIn(room.name, get_user_rooms(self.user_b))
+		self.assertEqual(get_room_members(room.name), {self.user_a, self.user_c})
+
+	def test_leaving_group_room_keeps_direct_contacts(self):
+		direct = self.make_room("Direct Message", [self.user_a, self.user_b])
+		group = self.make_room("Group Chat", [self.user_a, self.user_b, self.user_c])
+
+		recent, contacts, direct_rooms = _load_user_index(self.user_b)
+		self.assertIn(group.name, [room for room, _score in recent])
+		self.assertIn(self.user_a, [peer for peer, _score in contacts])
+
+		leave_room(group, self.user_b)
+
+		recent, contacts, direct_rooms = _load_user_index(self.user_b)
+		self.assertNotIn(group.name, [room for room, _score in recent])
+		self.assertIn(self.user_a, [peer for peer, _score in contacts])
+		self.assertEqual(direct_rooms.get(self.user_a), direct.name)
+
+	def test_leaving_direct_room_drops_the_contact(self):
+		direct = self.make_room("Direct Message", [self.user_a, self.user_c])
+
+		_recent, contacts, _direct_rooms = _load_user_index(self.user_c)
+		self.assertIn(self.user_a, [peer for peer, _score in contacts])
+
+		leave_room(direct, self.user_c)
+
+		_recent, contacts, direct_rooms = _load_user_index(self.user_c)
+		self.assertNotIn(self.user_a, [peer for peer, _score in contacts])
+		self.assertNotIn(self.user_a, direct_rooms)
+		self.assertNotIn(direct.name, get_user_rooms(self.user_c))
+
+	def test_refresh_room_statistics(self):
+		room = self.make_room("Group Chat", [self.user_a, self.user_b])
+		base = add_to_date(now_datetime(), hours=-1).replace(microsecond=0)
+
+		names = []
+		for offset in range(4):
+			message = frappe.get_doc({
+				"doctype": "Chat Message",
+				"chat_room": room.name,
+				"sender": self.user_a,
+				"message_type": "Text",
+				"message_content": f"message {offset}",
+				"timestamp": add_to_date(base, minutes=offset),
+			}).insert(ignore_permissions=True)
+			names.append(message.name)
+
+		# Oldest archived (still counted), newest deleted (not counted)
+		frappe.db.set_value("Chat Message", names[-1], "is_deleted", 1, update_modified=False)
+		frappe.db.commit()
+		archive_messages(names[:1])
+
+		self.assertGreaterEqual(refresh_room_statistics(), 1)
+
+		stats = frappe.db.get_value(
+			"Chat Room", room.name, ["message_count", "member_count", "last_message_time"], as_dict=True
+		)
+		self.assertEqual(stats.message_count, 3)
+		self.assertEqual(stats.member_count, 2)
+		self.assertEqual(get_datetime(stats.last_message_time), get_datetime(add_to_date(base, minutes=2)))
+
+
+class TestTypingIndicators(FrappeTestCase):
+	def setUp(self):
+		self.room_id = f"typing-test-{frappe.generate_hash(length=8)}"
+		self.addCleanup(self.forget_room)
+
+		publish = patch.object(typing_indicators.frappe, "publish_realtime")
+		self.publish_realtime = publish.start()
+		self.addCleanup(publish.stop)
+
+	def forget_room(self):
+		pipe = pipeline()
+		pipe.delete(typing_indicators._typing_key(self.room_id))
+		pipe.delete(typing_indicators._emit_gate_key(self.room_id))
+		for user in TEST_USERS:
+			pipe.delete(typing_indicators._throttle_key(self.room_id, user))
+		pipe.zrem(typing_indicators._due_key(), self.room_id)
+		pipe.execute()
+
+	def emitted_users(self):
+		message = self.publish_realtime.call_args.kwargs["message"]
+		return [typist["user"] for typist in message["users"]]
+
+	def test_repeat_pings_are_throttled(self):
+		self.assertTrue(typing_indicators.set_typing(self.room_id, TEST_USERS[0]))
+		self.assertFalse(typing_indicators.set_typing(self.room_id, TEST_USERS[0]))
+
+		self.assertEqual(typing_indicators.get_typing_users(self.room_id), [TEST_USERS[0]])
+		self.assertEqual(self.publish_realtime.call_count, 1)
+		self.assertEqual(self.emitted_users(), [TEST_USERS[0]])
+
+		# Stopping is never throttled
+		self.assertTrue(typing_indicators.set_typing(self.room_id, TEST_USERS[0], False))
+		self.assertEqual(typing_indicators.get_typing_users(self.room_id), [])
+
+	def test_closed_gate_queues_one_trailing_emit(self):
+		typing_indicators.set_typing(self.room_id, TEST_USERS[0])
+		typing_indicators.set_typing(self.room_id, TEST_USERS[1])
+		typing_indicators.set_typing(self.room_id, TEST_USERS[0], False)
+
+		# Both later changes landed inside the gate and share one queued emit
+		self.assertEqual(self.publish_realtime.call_count, 1)
+		pipe = pipeline()
+		pipe.zscore(typing_indicators._due_key(), self.room_id)
+		self.assertIsNotNone(pipe.execute()[0])
+
+		time.sleep(typing_indicators.EMIT_INTERVAL_MS / 1000.0 + 0.1)
+		self.assertEqual(typing_indicators.flush_typing_users(), 1)
+
+		self.assertEqual(self.publish_realtime.call_count, 2)
+		self.assertEqual(self.emitted_users(), [TEST_USERS[1]])
+		self.assertEqual(typing_indicators.flush_typing_users(), 0)
+
+	def test_typists_carry_their_expiry(self):
+		typing_indicators.set_typing(self.room_id, TEST_USERS[0])
+
+		typist = self.publish_realtime.call_args.kwargs["message"]["users"][0]
+		self.assertAlmostEqual(typist["expires_at"], time.time() + typing_indicators.TYPING_TTL, delta=2)
+
+
+class TestEngagementSketches(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b, _user_c = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+		self.addCleanup(self.forget_sketches)
+
+	def forget_sketches(self):
+		pipe = pipeline()
+		for kind in (engagement_sketches.SENDERS, engagement_sketches.READERS):
+			pipe.delete(engagement_sketches.sketch_key(kind, self.room.name, getdate()))
+		pipe.execute()
+
+	def senders_today(self):
+		return engagement_sketches.count_distinct(
+			self.room.name, engagement_sketches.SENDERS, getdate(), getdate()
+		)
+
+	def test_senders_are_counted_and_backfilled(self):
+		for sender in (self.user_a, self.user_b, self.user_a):
+			frappe.get_doc({
+				"doctype": "Chat Message",
+				"chat_room": self.room.name,
+				"sender": sender,
+				"message_type": "Text",
+				"message_content": "hello",
+				"timestamp": now_datetime(),
+			}).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+		self.assertGreaterEqual(self.senders_today(), 2)
+
+		self.forget_sketches()
+		self.assertEqual(self.senders_today(), 0)
+
+		engagement_sketches.backfill_sketches(since=getdate())
+		self.assertGreaterEqual(self.senders_today(), 2)
+
+
+class TestPeopleIndex(FrappeTestCase):
+	def test_rebuild_drops_stale_entries(self):
+		user = make_user(TEST_USERS[0])
+		frappe.db.commit()
+
+		ghost = "chat-people-ghost@example.com"
+		pipe = pipeline()
+		pipe.zadd(people_index._prefix_key("chatghost"), {ghost: 0})
+		pipe.zadd(people_index._all_key(), {ghost: 0})
+		pipe.execute()
+
+		people_index.build_people_index()
+
+		pipe = pipeline()
+		pipe.exists(people_index._prefix_key("chatghost"))
+		pipe.zscore(people_index._all_key(), ghost)
+		self.assertEqual(pipe.execute(), [0, None])
+
+		self.assertIn(user, [card["name"] for card in people_index.search("chat-room-a")])
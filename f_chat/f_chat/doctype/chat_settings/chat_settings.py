@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from frappe import _
 
+from f_chat.APIs.notification_chatroom.chat_apis.presence import take_everyone_offline
+
 class ChatSettings(Document):
     def validate(self):
         """Validate chat settings"""
@@ -50,12 +52,8 @@ class ChatSettings(Document):
     def disable_chat_functionality(self):
         """Disable chat functionality system-wide"""
         try:
-            # Update all users' chat status to offline
-            frappe.db.sql("""
-                UPDATE `tabUser` 
-                SET custom_chat_status = 'offline'
-                WHERE custom_chat_status != 'offline'
-            """)
+            # Take every user offline in the presence service and Chat User Activity
+            take_everyone_offline()
             
             # Clear all chat-related caches
             keys_to_clear = frappe.cache().get_keys("chat_*")
@@ -143,7 +141,7 @@ def get_cron_logs():
                 error
             FROM `tabScheduled Job Log`
             WHERE scheduled_job_type LIKE '%chat%'
-                OR scheduled_job_type LIKE '%update_user_activity_status%'
+                OR scheduled_job_type LIKE '%cleanup_stale_users%'
                 OR scheduled_job_type LIKE '%cleanup_old_messages%'
                 OR scheduled_job_type LIKE '%update_room_statistics%'
             ORDER BY creation DESC
@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import now_datetime, time_diff_in_seconds
 
+from f_chat.APIs.notification_chatroom.chat_apis import presence
+
 class ChatUserActivity(Document):
     def before_save(self):
         """Update full name before saving"""
@@ -89,57 +91,16 @@ def update_user_activity_status(user=None, status="online", active_room=None):
 
         current_time = now_datetime()
 
-        # Get or create activity record
-        activity_name = frappe.db.get_value("Chat User Activity", {"user": user})
-
-        if not activity_name:
-            # Create new record
-            get_or_create_user_activity(user)
-            activity_name = frappe.db.get_value("Chat User Activity", {"user": user})
-
-        if activity_name:
-            # Use direct SQL update to avoid locking issues
-            frappe.db.sql("""
-                UPDATE `tabChat User Activity`
-                SET
-                    chat_status = %(status)s,
-                    is_online = %(is_online)s,
-                    last_seen = %(last_seen)s,
-                    last_activity = %(last_activity)s,
-                    active_room = %(active_room)s,
-                    modified = %(modified)s
-                WHERE name = %(name)s
-            """, {
-                "status": status,
-                "is_online": 1 if status == "online" else 0,
-                "last_seen": current_time,
-                "last_activity": current_time,
-                "active_room": active_room,
-                "modified": current_time,
-                "name": activity_name
-            })
-
-            frappe.db.commit()
-
-            # Broadcast status change
-            frappe.publish_realtime(
-                event="user_status_changed",
-                message={
-                    "user": user,
-                    "status": status,
-                    "is_online": 1 if status == "online" else 0,
-                    "timestamp": str(current_time)
-                },
-                room="chat_global"
-            )
+        # Presence lives in Redis; the record is synced by the presence cron.
+        # Transitions are broadcast (coalesced) to users sharing a room.
+        previous_status, status = presence.set_status(user, status)
+        presence.set_active_room(user, active_room)
 
-            return {
-                "success": True,
-                "status": status,
-                "timestamp": str(current_time)
-            }
-
-        return {"success": False, "error": "Could not update activity"}
+        return {
+            "success": True,
+            "status": status,
+            "timestamp": str(current_time)
+        }
 
     except Exception as e:
         frappe.log_error(f"Error updating user activity: {str(e)}")
@@ -164,23 +125,17 @@ def get_user_activity_status(user=None):
         if not user:
             user = frappe.session.user
 
-        activity = frappe.db.get_value(
-            "Chat User Activity",
-            {"user": user},
-            ["chat_status", "is_online", "last_seen", "last_activity", "active_room", "unread_count"],
-            as_dict=True
-        )
-
-        if not activity:
-            # Create and return default
-            get_or_create_user_activity(user)
-            activity = {
-                "chat_status": "online",
-                "is_online": 1,
-                "last_seen": str(now_datetime()),
-                "last_activity": str(now_datetime()),
-                "unread_count": 0
-            }
+        status = presence.get_presence([user])[user]
+        unread_count = frappe.db.get_value("Chat User Activity", {"user": user}, "unread_count")
+
+        activity = {
+            "chat_status": status["status"],
+            "is_online": status["is_online"],
+            "last_seen": status["last_seen"],
+            "last_activity": status["last_activity"],
+            "active_room": status["active_room"],
+            "unread_count": unread_count or 0
+        }
 
         return {
             "success": True,
@@ -200,22 +155,8 @@ def update_user_activities_bulk():
     Cron job to update all user activities and set offline users
     """
     try:
-        from frappe.utils import add_to_date
-
-        current_time = now_datetime()
-        offline_threshold = add_to_date(current_time, minutes=-5)
-
-        # Update users to offline who haven't been active
-        frappe.db.sql("""
-            UPDATE `tabChat User Activity`
-            SET
-                chat_status = 'offline',
-                is_online = 0
-            WHERE last_activity < %(threshold)s
-            AND chat_status != 'offline'
-        """, {"threshold": offline_threshold})
-
-        frappe.db.commit()
+        presence.sweep_stale_presence()
+        presence.persist_presence()
 
         return {"success": True}
 
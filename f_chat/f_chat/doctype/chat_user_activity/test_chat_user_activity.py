@@ -0,0 +1,125 @@
+# Copyright (c) 2026, Blue Phoenix and Contributors
+# See license.txt
+
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis import presence
+from f_chat.APIs.notification_chatroom.chat_apis.redis_store import pipeline
+from f_chat.f_chat.doctype.chat_room.test_chat_room import delete_room, make_room, make_user
+
+TEST_USERS = ("chat-presence-a@example.com", "chat-presence-b@example.com")
+
+
+def forget_presence(users):
+	pipe = pipeline(transaction=True)
+	for name in (presence.STATUS, presence.LAST_SEEN, presence.PENDING_BROADCASTS, presence.LAST_BROADCASTS):
+		pipe.hdel(presence._key(name), *users)
+	pipe.zrem(presence._key(presence.HEARTBEATS), *users)
+	pipe.zrem(presence._key(presence.BROADCASTS_DUE), *users)
+	pipe.srem(presence._key(presence.ONLINE), *users)
+	pipe.srem(presence._key(presence.DIRTY), *users)
+	pipe.delete(presence._key(presence.FLUSH_SCHEDULED))
+	pipe.execute()
+
+
+class TestChatUserActivity(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.user_a, cls.user_b = (make_user(email) for email in TEST_USERS)
+		frappe.db.commit()
+
+	def setUp(self):
+		self.room = make_room("Group Chat", [self.user_a, self.user_b])
+		frappe.db.commit()
+		self.addCleanup(delete_room, self.room.name)
+
+		forget_presence(TEST_USERS)
+		self.addCleanup(forget_presence, TEST_USERS)
+
+		for target, name in ((presence.frappe, "enqueue"), (presence.frappe, "publish_realtime")):
+			patcher = patch.object(target, name)
+			setattr(self, name, patcher.start())
+			self.addCleanup(patcher.stop)
+
+		window = patch.object(presence, "STATUS_COALESCE_WINDOW", 0.2)
+		window.start()
+		self.addCleanup(window.stop)
+
+	def room_events(self):
+		return [
+			call.kwargs["message"]["users"] for call in self.publish_realtime.call_args_list
+			if call.kwargs.get("room") == f"chat_room_{self.room.name}"
+		]
+
+	def test_first_change_of_a_window_queues_one_flush(self):
+		presence.touch(self.user_a, "online")
+		presence.touch(self.user_a, "away")
+
+		self.assertEqual(self.enqueue.call_count, 1)
+		self.assertEqual(
+			self.enqueue.call_args.args[0],
+			"f_chat.APIs.notification_chatroom.chat_apis.presence.flush_status_broadcasts"
+		)
+
+	def test_flap_is_coalesced(self):
+		pipe = pipeline()
+		pipe.hset(presence._key(presence.LAST_BROADCASTS), self.user_a, "online")
+		pipe.execute()
+
+		presence.touch(self.user_a, "online")
+		presence.touch(self.user_a, "away")
+		presence.touch(self.user_a, "online")
+		presence.flush_status_broadcasts()
+
+		# Peers were already told "online", so the flap is not broadcast
+		self.assertEqual(self.room_events(), [])
+
+	def test_changes_go_out_once_per_room(self):
+		presence.touch(self.user_a, "busy")
+		presence.touch(self.user_b, "away")
+		# Let both windows close so one flush sees both changes
+		time.sleep(0.3)
+		presence.flush_status_broadcasts()
+
+		events = self.room_events()
+		self.assertEqual(len(events), 1)
+		self.assertEqual(
+			sorted((change["user"], change["status"]) for change in events[0]),
+			[(self.user_a, "busy"), (self.user_b, "away")]
+		)
+		self.assertEqual(presence.get_status(self.user_a), "busy")
+
+	def test_sending_a_message_counts_as_activity(self):
+		self.assertEqual(presence.get_status(self.user_b), "offline")
+
+		frappe.get_doc({
+			"doctype": "Chat Message",
+			"chat_room": self.room.name,
+			"sender": self.user_b,
+			"message_type": "Text",
+			"message_content": "still here",
+			"timestamp": now_datetime(),
+		}).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+		self.assertEqual(presence.get_status(self.user_b), "online")
+
+	def test_take_everyone_offline(self):
+		presence.touch(self.user_a, "online")
+		presence.persist_presence()
+		self.assertEqual(frappe.db.get_value("Chat User Activity", self.user_a, "chat_status"), "online")
+
+		presence.take_everyone_offline()
+		frappe.db.commit()
+
+		self.assertEqual(presence.get_status(self.user_a), "offline")
+		self.assertEqual(
+			frappe.db.get_value("Chat User Activity", self.user_a, ["chat_status", "is_online"]),
+			("offline", 0)
+		)
@@ -0,0 +1,143 @@
+# f_chat/f_chat/file_cleanup.py
+# Orphaned chat file cleanup in committed chunks
+#
+# Candidates are attachments of messages deleted more than GRACE_DAYS ago
+# (or whose message no longer exists) that still have a File row. They are
+# read in keyset order on the attachment name, CHUNK_SIZE at a time. Each
+# chunk deletes its File rows with one statement and commits. The blobs are
+# then removed from disk on a thread pool, and only when no other File row
+# still points at the same URL. A file that is also attached to a live
+# message is kept. A run stops when its time budget is spent and saves the
+# last attachment it reached, so the next run resumes from there.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.utils import add_days, now_datetime
+
+CHUNK_SIZE = 200
+TIME_BUDGET = 240  # seconds of work per run
+GRACE_DAYS = 7
+IO_WORKERS = 8
+CHECKPOINT_KEY = "chat_file_cleanup_checkpoint"
+
+
+def _file_path(file_url):
+    """Disk path of a local file URL (None for external URLs)"""
+    if file_url.startswith("/private/files/"):
+        return frappe.get_site_path("private", "files", file_url[len("/private/files/"):])
+    if file_url.startswith("/files/"):
+        return frappe.get_site_path("public", "files", file_url[len("/files/"):])
+    return None
+
+
+def _remove_blob(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def find_candidates(after, grace_period, limit=CHUNK_SIZE):
+    """
+    Next chunk of orphaned attachments with their File rows
+
+    Args:
+        after (str): Exclusive lower bound on the attachment name
+        grace_period (datetime): Messages deleted before this qualify
+        limit (int): Chunk size
+
+    Returns:
+        list: dicts with attachment, file_name and file_url
+    """
+    return frappe.db.sql("""
+        SELECT cma.name AS attachment, f.name AS file_name, f.file_url
+        FROM `tabChat Message Attachment` cma
+        INNER JOIN `tabFile` f ON f.file_url = cma.file_url
+        LEFT JOIN `tabChat Message` cm ON cm.name = cma.parent
+        WHERE cma.name > %(after)s
+            AND cma.parenttype = 'Chat Message'
+            AND (cm.name IS NULL OR (cm.is_deleted = 1 AND cm.delete_timestamp < %(grace_period)s))
+            AND NOT EXISTS (
+                SELECT 1
+                FROM `tabChat Message Attachment` shared
+                INNER JOIN `tabChat Message` live ON live.name = shared.parent
+                WHERE shared.file_url = cma.file_url
+                    AND shared.parenttype = 'Chat Message'
+                    AND live.is_deleted = 0
+            )
+        ORDER BY cma.name
+        LIMIT %(limit)s
+    """, {"after": after, "grace_period": grace_period, "limit": limit}, as_dict=True)
+
+
+def delete_chunk(rows, executor):
+    """
+    Delete a chunk's File rows (committed), then their unreferenced blobs
+
+    Returns:
+        tuple: (File rows deleted, blobs removed)
+    """
+    file_names = list({row.file_name for row in rows})
+    file_urls = list({row.file_url for row in rows if row.file_url})
+
+    frappe.db.sql("DELETE FROM `tabFile` WHERE name IN %(names)s", {"names": tuple(file_names)})
+    frappe.db.commit()
+
+    if not file_urls:
+        return len(file_names), 0
+
+    # Deduplicated uploads share one blob between several File rows
+    still_used = set(frappe.db.sql_list("""
+        SELECT DISTINCT file_url FROM `tabFile` WHERE file_url IN %(urls)s
+    """, {"urls": tuple(file_urls)}))
+    paths = [
+        path for path in (_file_path(url) for url in file_urls if url not in still_used)
+        if path
+    ]
+
+    removed = sum(executor.map(_remove_blob, paths))
+    return len(file_names), removed
+
+
+def run_file_cleanup(time_budget=TIME_BUDGET):
+    """
+    Delete orphaned chat files from the saved checkpoint until the budget is spent
+
+    Args:
+        time_budget (int): Seconds of work before stopping
+
+    Returns:
+        dict: files, blobs, chunks, checkpoint and whether a full pass completed
+    """
+    grace_period = add_days(now_datetime(), -GRACE_DAYS)
+    after = frappe.db.get_global(CHECKPOINT_KEY) or ""
+    result = {"files": 0, "blobs": 0, "chunks": 0, "completed_pass": False}
+    deadline = time.monotonic() + time_budget
+
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+        while time.monotonic() < deadline:
+            rows = find_candidates(after, grace_period)
+            if rows:
+                files, blobs = delete_chunk(rows, executor)
+                result["files"] += files
+                result["blobs"] += blobs
+                result["chunks"] += 1
+                after = rows[-1].attachment
+
+            if len(rows) < CHUNK_SIZE:
+                # Reached the end: next run starts a new pass
+                after = ""
+                result["completed_pass"] = True
+                break
+
+            frappe.db.set_global(CHECKPOINT_KEY, after)
+            frappe.db.commit()
+
+    frappe.db.set_global(CHECKPOINT_KEY, after)
+    frappe.db.commit()
+    result["checkpoint"] = after
+    return result
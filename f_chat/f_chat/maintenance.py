@@ -5,201 +5,144 @@ from frappe import _
 from frappe.utils import now_datetime, add_days, add_to_date, cint, get_datetime
 import json
 from datetime import timedelta
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import remove_user as remove_user_from_membership_index
+from f_chat.APIs.notification_chatroom.chat_apis.presence import sweep_stale_presence
+from f_chat.APIs.notification_chatroom.chat_apis.system_counters import get_system_stats
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import get_job_stats, track_job_run
+from f_chat.f_chat.file_cleanup import run_file_cleanup
+from f_chat.f_chat.retention import run_retention, soft_delete_where
 
 def cleanup_old_messages():
     """
-    Clean up old chat messages based on settings
-    This function runs daily via scheduler
+    Soft delete messages past their room's or the site-wide retention
+    This function runs hourly via scheduler, resuming from the last checkpoint
     """
-    try:
-        # Check if chat is enabled
-        settings = frappe.get_single("Chat Settings")
-        if not settings.enable_chat:
-            frappe.logger().info("Chat is disabled, skipping cleanup")
-            return
-            
-        if not settings.auto_delete_old_messages:
-            return
+    with track_job_run("f_chat.f_chat.maintenance.cleanup_old_messages") as run:
+        try:
+            # Check if chat is enabled
+            if not is_chat_enabled():
+                frappe.logger().info("Chat is disabled, skipping cleanup")
+                return
             
-        # Get deletion period (default 30 days)
-        deletion_days = cint(settings.get("message_deletion_days", 30))
-        cutoff_date = add_days(now_datetime(), -deletion_days)
-        
-        # Soft delete old messages
-        deleted_count = frappe.db.sql("""
-            UPDATE `tabChat Message`
-            SET is_deleted = 1, 
-                delete_timestamp = %(now)s,
-                message_content = 'Message deleted due to retention policy'
-            WHERE timestamp < %(cutoff)s 
-                AND is_deleted = 0
-        """, {
-            "now": now_datetime(),
-            "cutoff": cutoff_date
-        })
+            result = run_retention()
+            run.rows = result["deleted"]
         
-        frappe.db.commit()
-        
-        if deleted_count:
-            frappe.logger().info(f"Cleaned up {deleted_count} old chat messages")
+            if result["deleted"]:
+                frappe.logger().info(
+                    f"Cleaned up {result['deleted']} old chat messages in {result['batches']} batches"
+                )
             
-    except Exception as e:
-        frappe.log_error(f"Error in cleanup_old_messages: {str(e)}", "Chat Maintenance")
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in cleanup_old_messages: {str(e)}", "Chat Maintenance")
+
+
+def refresh_room_statistics():
+    """
+    Recompute message_count, member_count and last_message_time of every
+    active room in one grouped UPDATE ... JOIN
+
+    Only rows whose values differ are written, and `modified` is left alone
+    since the stats are not edits. Archived messages stay in message_count.
+
+    Returns:
+        int: Rooms whose statistics changed
+    """
+    frappe.db.sql("""
+        UPDATE `tabChat Room` cr
+        LEFT JOIN (
+            SELECT chat_room, SUM(message_count) AS message_count, MAX(last_message_time) AS last_message_time
+            FROM (
+                SELECT chat_room, COUNT(*) AS message_count, MAX(timestamp) AS last_message_time
+                FROM `tabChat Message`
+                WHERE is_deleted = 0
+                GROUP BY chat_room
+                UNION ALL
+                SELECT chat_room, COUNT(*), MAX(timestamp)
+                FROM `tabChat Message Archive`
+                WHERE is_deleted = 0
+                GROUP BY chat_room
+            ) tiers
+            GROUP BY chat_room
+        ) messages ON messages.chat_room = cr.name
+        LEFT JOIN (
+            SELECT parent, COUNT(*) AS member_count
+            FROM `tabChat Room Member`
+            WHERE parenttype = 'Chat Room'
+            GROUP BY parent
+        ) members ON members.parent = cr.name
+        SET cr.message_count = COALESCE(messages.message_count, 0),
+            cr.member_count = COALESCE(members.member_count, 0),
+            cr.last_message_time = messages.last_message_time
+        WHERE cr.room_status = 'Active'
+            AND (
+                cr.message_count <> COALESCE(messages.message_count, 0)
+                OR cr.member_count <> COALESCE(members.member_count, 0)
+                OR NOT (cr.last_message_time <=> messages.last_message_time)
+            )
+    """)
+    changed = frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+    frappe.db.commit()
 
+    return max(changed, 0)
 
 def update_room_statistics():
     """
     Update room statistics for better performance
     This function runs daily via scheduler
     """
-    try:
-        # Check if chat is enabled
-        if not is_chat_enabled():
-            return
+    with track_job_run("f_chat.f_chat.maintenance.update_room_statistics") as run:
+        try:
+            # Check if chat is enabled
+            if not is_chat_enabled():
+                return
             
-        rooms = frappe.get_all("Chat Room", filters={"room_status": "Active"})
-        
-        for room in rooms:
-            try:
-                # Calculate message statistics with proper error handling
-                stats = frappe.db.sql("""
-                    SELECT 
-                        COUNT(*) as total_messages,
-                        COUNT(DISTINCT sender) as unique_senders,
-                        MAX(timestamp) as last_message_time
-                    FROM `tabChat Message`
-                    WHERE chat_room = %s AND is_deleted = 0
-                """, (room.name,), as_dict=True)[0]
-                
-                # Log statistics
-                frappe.logger().info(
-                    f"Room {room.name}: {stats.total_messages} messages, "
-                    f"{stats.unique_senders} unique senders, "
-                    f"last message: {stats.last_message_time}"
-                )
-                
-                # Update room document with stats if needed
-                room_doc = frappe.get_doc("Chat Room", room.name)
-                if hasattr(room_doc, 'message_count'):
-                    room_doc.message_count = stats.total_messages
-                    room_doc.save(ignore_permissions=True)
-                    
-            except Exception as e:
-                frappe.log_error(f"Error updating stats for room {room.name}: {str(e)}", 
-                               "Room Statistics Update")
-                continue
+            changed = refresh_room_statistics()
+            run.rows = changed
+            frappe.logger().info(f"Updated statistics for {changed} chat rooms")
             
-    except Exception as e:
-        frappe.log_error(f"Error in update_room_statistics: {str(e)}", "Chat Maintenance")
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in update_room_statistics: {str(e)}", "Chat Maintenance")
 
 def cleanup_deleted_files():
     """
     Clean up orphaned chat files
-    This function runs daily at 2 AM via scheduler
+    This function runs daily at 2 AM via scheduler, resuming from the last checkpoint
     """
-    try:
-        if not is_chat_enabled():
-            return
+    with track_job_run("f_chat.f_chat.maintenance.cleanup_deleted_files") as run:
+        try:
+            if not is_chat_enabled():
+                return
             
-        # Find files that are attached to deleted messages (with 7 days grace period)
-        grace_period = add_days(now_datetime(), -7)
-        
-        orphaned_files = frappe.db.sql("""
-            SELECT DISTINCT cma.file_url, f.name as file_name
-            FROM `tabChat Message Attachment` cma
-            LEFT JOIN `tabChat Message` cm ON cma.parent = cm.name
-            LEFT JOIN `tabFile` f ON cma.file_url = f.file_url
-            WHERE cm.is_deleted = 1 
-                AND cm.delete_timestamp < %(grace_period)s
-                AND f.name IS NOT NULL
-        """, {"grace_period": grace_period}, as_dict=True)
-        
-        deleted_files_count = 0
+            # Chunked and resumable; files of messages deleted within 7 days are kept
+            result = run_file_cleanup()
+            run.rows = result["files"]
         
-        for file_info in orphaned_files:
-            try:
-                # Delete file document
-                if frappe.db.exists("File", file_info.file_name):
-                    file_doc = frappe.get_doc("File", file_info.file_name)
-                    file_doc.delete()
-                    deleted_files_count += 1
-                    
-            except Exception as e:
-                frappe.log_error(f"Error deleting file {file_info.file_name}: {str(e)}", 
-                               "File Cleanup")
-                
-        if deleted_files_count > 0:
-            frappe.db.commit()
-            frappe.logger().info(f"Cleaned up {deleted_files_count} orphaned chat files")
+            if result["files"]:
+                frappe.logger().info(
+                    f"Cleaned up {result['files']} orphaned chat files "
+                    f"({result['blobs']} removed from disk) in {result['chunks']} chunks"
+                )
             
-    except Exception as e:
-        frappe.log_error(f"Error in cleanup_deleted_files: {str(e)}", "Chat Maintenance")
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in cleanup_deleted_files: {str(e)}", "Chat Maintenance")
 
 def update_user_online_status():
     """
-    Update user online status based on last activity
-    This function runs every 15 minutes via scheduler
+    Update user online status based on last heartbeat
+    Not scheduled: realtime_events_fixed.cleanup_stale_users is the periodic sweep
     """
     try:
         if not is_chat_enabled():
             return
 
-        # Mark users as offline if they haven't been active in the last 5 minutes
-        # Fix: Use add_to_date() instead of add_days() for minutes
-        offline_threshold = add_to_date(now_datetime(), minutes=-5)
-
-        # Update with proper error handling including deadlock retry
-        max_retries = 3
-        retry_count = 0
-
-        while retry_count < max_retries:
-            try:
-                # Check if custom fields exist first
-                if not frappe.db.exists("Custom Field", {"dt": "User", "fieldname": "custom_chat_status"}):
-                    frappe.logger().warning("custom_chat_status field not found on User doctype")
-                    return
-
-                updated = frappe.db.sql("""
-                    UPDATE `tabUser`
-                    SET custom_chat_status = 'offline'
-                    WHERE custom_chat_status != 'offline'
-                    AND (
-                        custom_last_chat_activity IS NULL
-                        OR custom_last_chat_activity < %(threshold)s
-                    )
-                """, {"threshold": offline_threshold})
-
-                frappe.db.commit()
-
-                if updated:
-                    frappe.logger().info(f"Updated {updated} users to offline status")
-
-                break  # Success, exit retry loop
-
-            except Exception as e:
-                error_msg = str(e)
-
-                # Handle cases where custom fields might not exist
-                if "Unknown column" in error_msg:
-                    frappe.logger().warning("Chat custom fields not found in User doctype")
-                    break
+        # Presence lives in Redis; only users whose heartbeat expired are touched
+        offline_users = sweep_stale_presence()
 
-                # Handle deadlock errors with retry
-                elif "Deadlock" in error_msg or "Record has changed" in error_msg:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        frappe.logger().warning(f"Deadlock detected, retrying ({retry_count}/{max_retries})...")
-                        frappe.db.rollback()
-                        # Brief delay before retry
-                        import time
-                        time.sleep(0.5 * retry_count)  # Exponential backoff: 0.5s, 1s, 1.5s
-                    else:
-                        frappe.logger().error(f"Failed to update user status after {max_retries} retries due to deadlock")
-                        frappe.log_error(f"Deadlock updating user online status: {error_msg}", "Chat Maintenance Deadlock")
-                        break
-                else:
-                    # Other errors, don't retry
-                    raise e
+        if offline_users:
+            frappe.logger().info(f"Updated {len(offline_users)} users to offline status")
 
     except Exception as e:
         frappe.log_error(f"Error updating user online status: {str(e)}", "Chat Maintenance")
@@ -219,18 +162,10 @@ def update_user_chat_permissions(doc, method=None):
                 DELETE FROM `tabChat Room Member` 
                 WHERE user = %s
             """, [doc.name])
-            
-            # Mark their messages as deleted
-            frappe.db.sql("""
-                UPDATE `tabChat Message`
-                SET is_deleted = 1, 
-                    delete_timestamp = %(now)s, 
-                    message_content = 'User account disabled'
-                WHERE sender = %(user)s AND is_deleted = 0
-            """, {
-                "now": now_datetime(),
-                "user": doc.name
-            })
+            remove_user_from_membership_index(doc.name)
+
+            # Mark their messages as deleted (rollups and counters follow)
+            soft_delete_where("sender = %(user)s", {"user": doc.name}, "User account disabled")
             
             frappe.db.commit()
             frappe.logger().info(f"Cleaned up chat data for disabled user: {doc.name}")
@@ -262,19 +197,8 @@ def manual_cleanup_room(room_id):
             
         room = frappe.get_doc("Chat Room", room_id)
         
-        # Delete all messages in the room
-        frappe.db.sql("""
-            UPDATE `tabChat Message`
-            SET is_deleted = 1,
-                delete_timestamp = %(now)s,
-                message_content = 'Room cleaned up by administrator'
-            WHERE chat_room = %(room)s
-        """, {
-            "now": now_datetime(),
-            "room": room_id
-        })
-        
-        frappe.db.commit()
+        # Delete all messages in the room (rollups and counters follow)
+        soft_delete_where("chat_room = %(room)s", {"room": room_id}, "Room cleaned up by administrator")
         
         return {
             "success": True,
@@ -389,26 +313,9 @@ def get_chat_system_stats():
         if not frappe.has_permission("Chat Settings", "read"):
             frappe.throw(_("You don't have permission to view chat statistics"))
             
-        stats = {
-            "total_rooms": frappe.db.count("Chat Room", {"room_status": "Active"}),
-            "total_messages": frappe.db.count("Chat Message", {"is_deleted": 0}),
-            "total_users": frappe.db.sql("""
-                SELECT COUNT(DISTINCT user) 
-                FROM `tabChat Room Member`
-            """)[0][0],
-            "messages_today": frappe.db.sql("""
-                SELECT COUNT(*) 
-                FROM `tabChat Message` 
-                WHERE DATE(timestamp) = CURDATE() 
-                    AND is_deleted = 0
-            """)[0][0],
-            "active_users_today": frappe.db.sql("""
-                SELECT COUNT(DISTINCT sender) 
-                FROM `tabChat Message` 
-                WHERE DATE(timestamp) = CURDATE()
-            """)[0][0]
-        }
-        
+        # Live Redis counters maintained by the Chat Message / Chat Room hooks
+        stats = get_system_stats()
+
         return {
             "success": True,
             "data": stats
@@ -421,6 +328,33 @@ def get_chat_system_stats():
             "error": str(e)
         }
 
+@frappe.whitelist()
+def get_chat_job_stats(since_hours=24):
+    """
+    Rolling p50/p95 durations and recent outcomes of the chat scheduler jobs
+    
+    Args:
+        since_hours (int): Window for the run and error counts
+        
+    Returns:
+        dict: One entry per job, those closest to their schedule interval first
+    """
+    try:
+        if not frappe.has_permission("Chat Job Run", "read"):
+            frappe.throw(_("You don't have permission to view chat job statistics"))
+            
+        return {
+            "success": True,
+            "data": get_job_stats(cint(since_hours) or 24)
+        }
+        
+    except Exception as e:
+        frappe.log_error(f"Error getting chat job stats: {str(e)}", "Chat Statistics")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 @frappe.whitelist()
 def optimize_chat_database():
     """Optimize chat database tables for better performance"""
@@ -0,0 +1,244 @@
+# f_chat/f_chat/partitioning.py
+# Optional monthly RANGE partitioning of `tabChat Message` on timestamp
+#
+# Layout once converted:
+#   pYYYYMM    rows with timestamp before the first day of the next month
+#              (the oldest partition also holds everything earlier)
+#   p_future   VALUES LESS THAN (MAXVALUE), kept empty by maintain_partitions
+#
+# MariaDB requires every unique key to contain the partitioning column, so
+# the primary key becomes (name, timestamp); Frappe still generates unique
+# names. FULLTEXT indexes are not supported on partitioned InnoDB tables:
+# converting drops message_content_fulltext and message search falls back
+# to LIKE (see message_search.has_fulltext_index).
+#
+# The daily job pre-creates FUTURE_MONTHS partitions ahead of the current
+# month and drops partitions that lie entirely before the archive cutoff.
+# DROP PARTITION itself is O(1) and only ever discards an empty partition:
+# rows still in it are first moved to Chat Message Archive in batches of
+# BATCH_SIZE. Archive rows carry a payload packed in Python, so that move
+# cannot be a single INSERT ... SELECT; its cost is linear in the rows left.
+# The daily archive walk moves the same rows earlier, so normally nothing is
+# left by the time a partition expires. When archiving is disabled nothing
+# is dropped.
+#
+# Conversion is a one-off admin command, never part of migrate, because it
+# rebuilds the table and drops the FULLTEXT index:
+#   bench --site <site> execute f_chat.f_chat.partitioning.convert_to_partitions \
+#       --kwargs "{'drop_fulltext': True}"
+# It returns False and does nothing on a table that is already partitioned,
+# so it is safe to re-run.
+
+import time
+from datetime import datetime
+
+import frappe
+from frappe import _
+from frappe.utils import add_months, get_datetime, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis.message_search import FULLTEXT_INDEX
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import track_job_run
+from f_chat.f_chat.doctype.chat_message_archive.chat_message_archive import (
+    archive_messages,
+    get_archive_cutoffs,
+)
+
+FUTURE_MONTHS = 3  # months of empty partitions kept ahead of now
+FUTURE_PARTITION = "p_future"
+BATCH_SIZE = 500
+TIME_BUDGET = 240  # seconds spent moving rows out of expired partitions per run
+
+
+def _month_start(value):
+    value = get_datetime(value)
+    return datetime(value.year, value.month, 1)
+
+
+def _partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def _partition_month(name):
+    """First day of the month a pYYYYMM partition covers (None for p_future)"""
+    try:
+        return datetime.strptime(name[1:], "%Y%m")
+    except ValueError:
+        return None
+
+
+def _partition_clause(month):
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN ('{add_months(month, 1):%Y-%m-%d}')"
+
+
+def _future_clause():
+    return f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)"
+
+
+def get_partitions():
+    """
+    Partitions of the message table in order
+
+    Returns:
+        list: dicts with name, bound and approximate rows
+    """
+    return frappe.db.sql("""
+        SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound, TABLE_ROWS AS `rows`
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'tabChat Message'
+            AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, as_dict=True)
+
+
+def is_partitioned():
+    return bool(get_partitions())
+
+
+def convert_to_partitions(drop_fulltext=False):
+    """
+    Rebuild the message table as monthly partitions (one long ALTER)
+
+    Args:
+        drop_fulltext (bool): Allow dropping the FULLTEXT search index
+
+    Returns:
+        bool: True if the table was converted, False if it already was
+    """
+    if is_partitioned():
+        return False
+
+    if frappe.db.has_index("tabChat Message", FULLTEXT_INDEX):
+        if not drop_fulltext:
+            frappe.throw(_("Partitioning drops the FULLTEXT index used by message search; pass drop_fulltext to proceed"))
+        frappe.db.sql_ddl(f"ALTER TABLE `tabChat Message` DROP INDEX `{FULLTEXT_INDEX}`")
+        frappe.cache().delete_value("chat_message_fulltext_index")
+
+    # The partitioning column joins the primary key, so it cannot be NULL
+    frappe.db.sql("UPDATE `tabChat Message` SET timestamp = creation WHERE timestamp IS NULL")
+    frappe.db.commit()
+
+    oldest = frappe.db.sql("SELECT MIN(timestamp) FROM `tabChat Message`")[0][0]
+    month = _month_start(oldest or now_datetime())
+    last = add_months(_month_start(now_datetime()), FUTURE_MONTHS)
+
+    clauses = []
+    while month <= last:
+        clauses.append(_partition_clause(month))
+        month = add_months(month, 1)
+    clauses.append(_future_clause())
+
+    frappe.db.sql_ddl(f"""
+        ALTER TABLE `tabChat Message`
+        DROP PRIMARY KEY,
+        ADD PRIMARY KEY (name, timestamp)
+        PARTITION BY RANGE COLUMNS(timestamp) (
+            {", ".join(clauses)}
+        )
+    """)
+    return True
+
+
+def add_future_partitions(partitions=None):
+    """
+    Split p_future so partitions exist up to FUTURE_MONTHS ahead
+
+    Returns:
+        list: Partition names created
+    """
+    partitions = partitions if partitions is not None else get_partitions()
+    months = [month for month in (_partition_month(row.name) for row in partitions) if month]
+    if not months:
+        return []
+
+    month = add_months(max(months), 1)
+    last = add_months(_month_start(now_datetime()), FUTURE_MONTHS)
+
+    new_months = []
+    while month <= last:
+        new_months.append(month)
+        month = add_months(month, 1)
+
+    if not new_months:
+        return []
+
+    clauses = [_partition_clause(month) for month in new_months] + [_future_clause()]
+    frappe.db.sql_ddl(f"""
+        ALTER TABLE `tabChat Message`
+        REORGANIZE PARTITION {FUTURE_PARTITION} INTO (
+            {", ".join(clauses)}
+        )
+    """)
+    return [_partition_name(month) for month in new_months]
+
+
+def drop_expired_partitions(partitions=None, time_budget=TIME_BUDGET):
+    """
+    Archive what is left in partitions older than the archive cutoff, then drop them
+
+    Leftover rows move in BATCH_SIZE batches within time_budget, so a run
+    costs O(rows left); an emptied partition is dropped in O(1).
+
+    Args:
+        partitions (list): Current partitions (read when omitted)
+        time_budget (int): Seconds spent moving rows before stopping
+
+    Returns:
+        dict: dropped partition names and messages archived
+    """
+    result = {"dropped": [], "archived": 0}
+
+    archive_before, _tombstones_before = get_archive_cutoffs()
+    if not archive_before:
+        return result
+
+    partitions = partitions if partitions is not None else get_partitions()
+    dated = [row.name for row in partitions if _partition_month(row.name)]
+    deadline = time.monotonic() + time_budget
+
+    # The newest dated partition is never dropped, so the table keeps one
+    for name in dated[:-1]:
+        if add_months(_partition_month(name), 1) > archive_before:
+            break
+
+        while time.monotonic() < deadline:
+            names = frappe.db.sql_list(f"""
+                SELECT name FROM `tabChat Message` PARTITION ({name})
+                LIMIT %(limit)s
+            """, {"limit": BATCH_SIZE})
+            if not names:
+                break
+            result["archived"] += archive_messages(names)
+
+        if frappe.db.sql(f"SELECT 1 FROM `tabChat Message` PARTITION ({name}) LIMIT 1"):
+            break  # out of time; the next run carries on
+
+        frappe.db.sql_ddl(f"ALTER TABLE `tabChat Message` DROP PARTITION {name}")
+        result["dropped"].append(name)
+
+    return result
+
+
+# Scheduled job
+
+def maintain_partitions():
+    """Daily job: keep future partitions ahead of now and drop expired ones"""
+    with track_job_run("f_chat.f_chat.partitioning.maintain_partitions") as run:
+        try:
+            if not is_partitioned():
+                return
+
+            partitions = get_partitions()
+            created = add_future_partitions(partitions)
+            result = drop_expired_partitions(partitions)
+            run.rows = result["archived"]
+
+            if created or result["dropped"]:
+                frappe.logger().info(
+                    f"Chat message partitions: created {created}, dropped {result['dropped']} "
+                    f"after archiving {result['archived']} messages"
+                )
+
+        except Exception as e:
+            run.fail(e)
+            frappe.log_error(f"Error in maintain_partitions: {str(e)}")
@@ -0,0 +1,20 @@
+// Copyright (c) 2026, Blue Phoenix and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Chat Job Performance"] = {
+	filters: [
+		{
+			fieldname: "since_hours",
+			label: __("Runs and Errors Over (Hours)"),
+			fieldtype: "Int",
+			default: 24,
+		},
+	],
+	formatter(value, row, column, data, default_formatter) {
+		value = default_formatter(value, row, column, data);
+		if (column.fieldname === "p95_of_interval" && data && data.creeping) {
+			value = `<span style="color: var(--red-500)">${value}</span>`;
+		}
+		return value;
+	},
+};
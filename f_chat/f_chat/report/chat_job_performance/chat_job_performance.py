@@ -0,0 +1,34 @@
+# Copyright (c) 2026, bluephoenix and contributors
+# For license information, please see license.txt
+
+from frappe import _
+from frappe.utils import cint
+
+from f_chat.f_chat.doctype.chat_job_run.chat_job_run import get_job_stats
+
+
+def execute(filters=None):
+    """Rolling duration percentiles per chat scheduler job, closest to their interval first"""
+    filters = filters or {}
+    columns = [
+        {"fieldname": "job", "label": _("Job"), "fieldtype": "Data", "width": 420},
+        {"fieldname": "interval", "label": _("Interval (s)"), "fieldtype": "Int", "width": 100},
+        {"fieldname": "p50", "label": _("p50 (s)"), "fieldtype": "Float", "precision": 3, "width": 90},
+        {"fieldname": "p95", "label": _("p95 (s)"), "fieldtype": "Float", "precision": 3, "width": 90},
+        {"fieldname": "max", "label": _("Max (s)"), "fieldtype": "Float", "precision": 3, "width": 90},
+        {"fieldname": "p95_of_interval", "label": _("p95 / Interval"), "fieldtype": "Percent", "width": 110},
+        {"fieldname": "creeping", "label": _("Creeping"), "fieldtype": "Check", "width": 80},
+        {"fieldname": "samples", "label": _("Samples"), "fieldtype": "Int", "width": 80},
+        {"fieldname": "runs", "label": _("Runs"), "fieldtype": "Int", "width": 70},
+        {"fieldname": "errors", "label": _("Errors"), "fieldtype": "Int", "width": 70},
+        {"fieldname": "last_status", "label": _("Last Status"), "fieldtype": "Data", "width": 100},
+        {"fieldname": "last_started_at", "label": _("Last Run"), "fieldtype": "Datetime", "width": 160},
+        {"fieldname": "last_rows", "label": _("Last Rows"), "fieldtype": "Int", "width": 90},
+    ]
+
+    data = get_job_stats(cint(filters.get("since_hours")) or 24)
+    for row in data:
+        if row["p95_of_interval"] is not None:
+            row["p95_of_interval"] = row["p95_of_interval"] * 100
+
+    return columns, data
@@ -0,0 +1,223 @@
+# f_chat/f_chat/retention.py
+# Message retention: soft-delete expired messages in small committed batches
+#
+# The engine walks `tabChat Message` in primary-key order, BATCH_SIZE names
+# at a time (walk_message_ranges, also used by the archive tier). Each batch
+# is one bounded range on the primary key, so locks are held only for that
+# range, and every batch is committed on its own. A room's
+# auto_delete_messages_after_days overrides the site-wide retention from
+# Chat Settings. A run stops when its time budget is spent and saves the last
+# name it reached, so the next run resumes from there. Once the walk reaches
+# the end of the table, the checkpoint goes back to the start.
+
+import time
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from f_chat.APIs.notification_chatroom.chat_apis import system_counters
+from f_chat.f_chat.doctype.chat_activity_rollup.chat_activity_rollup import forget_messages
+
+BATCH_SIZE = 500
+TIME_BUDGET = 240  # seconds of work per run
+CHECKPOINT_KEY = "chat_retention_checkpoint"
+LAST_PASS_KEY = "chat_retention_last_pass"
+RETENTION_NOTICE = "Message deleted due to retention policy"
+
+
+def get_retention_policy():
+    """
+    Site-wide retention and rooms that override it
+
+    Returns:
+        tuple: (site-wide days or None when auto delete is off, {room: days})
+    """
+    settings = frappe.get_single("Chat Settings")
+    default_days = None
+    if settings.get("auto_delete_old_messages"):
+        default_days = cint(settings.get("message_deletion_days")) or 30
+
+    overrides = dict(frappe.db.sql("""
+        SELECT name, auto_delete_messages_after_days
+        FROM `tabChat Room`
+        WHERE auto_delete_messages_after_days > 0
+    """))
+    return default_days, overrides
+
+
+def get_checkpoint(checkpoint_key=CHECKPOINT_KEY):
+    return frappe.db.get_global(checkpoint_key) or ""
+
+
+def _save_checkpoint(checkpoint_key, name):
+    frappe.db.set_global(checkpoint_key, name)
+    frappe.db.commit()
+
+
+def _batch_end(start, batch_size):
+    """Last name of the next batch_size-name range (None when fewer remain)"""
+    end = frappe.db.sql("""
+        SELECT name FROM `tabChat Message`
+        WHERE name > %(start)s
+        ORDER BY name
+        LIMIT 1 OFFSET %(offset)s
+    """, {"start": start, "offset": batch_size - 1})
+    return end[0][0] if end else None
+
+
+def walk_message_ranges(checkpoint_key, process, time_budget=TIME_BUDGET, batch_size=BATCH_SIZE):
+    """
+    Feed primary-key ranges of Chat Message to `process` from a saved checkpoint
+
+    Args:
+        checkpoint_key (str): Global default holding the last name reached
+        process (callable): process(start, end) -> rows affected; end is None for the last range
+        time_budget (int): Seconds of work before stopping
+        batch_size (int): Names per range
+
+    Returns:
+        dict: affected, batches, checkpoint and whether a full pass completed
+    """
+    start = get_checkpoint(checkpoint_key)
+    result = {"affected": 0, "batches": 0, "completed_pass": False}
+    deadline = time.monotonic() + time_budget
+
+    while time.monotonic() < deadline:
+        end = _batch_end(start, batch_size)
+        result["affected"] += process(start, end)
+        result["batches"] += 1
+
+        if end is None:
+            # Reached the end of the table: next run starts a new pass
+            start = ""
+            result["completed_pass"] = True
+            break
+
+        start = end
+        _save_checkpoint(checkpoint_key, start)
+
+    _save_checkpoint(checkpoint_key, start)
+    result["checkpoint"] = start
+    return result
+
+
+def expire_batch(start, end, default_days, now=None):
+    """
+    Soft-delete the expired messages in one primary-key range
+
+    Args:
+        start (str): Exclusive lower bound
+        end (str): Inclusive upper bound (None for the rest of the table)
+        default_days (int): Site-wide retention (None: only rooms with overrides)
+        now (datetime): Reference time
+
+    Returns:
+        int: Messages deleted
+    """
+    now = now or now_datetime()
+    values = {"start": start, "end": end, "default_days": default_days, "now": now}
+
+    # With no site-wide retention the CASE yields NULL for rooms without an
+    # override, so their messages never compare as expired
+    expired = frappe.db.sql_list(f"""
+        SELECT cm.name
+        FROM `tabChat Message` cm
+        INNER JOIN `tabChat Room` cr ON cr.name = cm.chat_room
+        WHERE cm.name > %(start)s
+            {"AND cm.name <= %(end)s" if end else ""}
+            AND cm.is_deleted = 0
+            AND cm.timestamp < DATE_SUB(%(now)s, INTERVAL (
+                CASE WHEN cr.auto_delete_messages_after_days > 0
+                    THEN cr.auto_delete_messages_after_days
+                    ELSE %(default_days)s
+                END
+            ) DAY)
+    """, values)
+
+    if not expired:
+        return 0
+
+    return soft_delete(expired, RETENTION_NOTICE, now)
+
+
+def soft_delete(names, notice, now=None):
+    """
+    Soft-delete a batch of live messages with one UPDATE, then commit
+
+    Bulk SQL skips the Chat Message hooks, so the batch is first taken out
+    of the activity rollups and the system counters.
+
+    Args:
+        names (list): Chat Message names
+        notice (str): Content left in place of the message
+        now (datetime): Deletion time
+
+    Returns:
+        int: Messages deleted
+    """
+    if not names:
+        return 0
+
+    forget_messages(names)
+    system_counters.forget_messages(names)
+    frappe.db.sql("""
+        UPDATE `tabChat Message`
+        SET is_deleted = 1,
+            delete_timestamp = %(now)s,
+            message_content = %(notice)s
+        WHERE name IN %(names)s AND is_deleted = 0
+    """, {"names": tuple(names), "now": now or now_datetime(), "notice": notice})
+    frappe.db.commit()
+
+    return len(names)
+
+
+def soft_delete_where(condition, values, notice):
+    """
+    Soft-delete every live message matching an SQL condition, BATCH_SIZE at a time
+
+    Args:
+        condition (str): WHERE condition on `tabChat Message`
+        values (dict): Query parameters of the condition
+        notice (str): Content left in place of each message
+
+    Returns:
+        int: Messages deleted
+    """
+    deleted = 0
+    while True:
+        names = frappe.db.sql_list(f"""
+            SELECT name FROM `tabChat Message`
+            WHERE is_deleted = 0 AND {condition}
+            LIMIT %(batch_size)s
+        """, dict(values, batch_size=BATCH_SIZE))
+        if not names:
+            return deleted
+        deleted += soft_delete(names, notice)
+
+
+def run_retention(time_budget=TIME_BUDGET):
+    """
+    Walk the message table from the saved checkpoint until the budget is spent
+
+    Args:
+        time_budget (int): Seconds of work before stopping
+
+    Returns:
+        dict: deleted, batches, checkpoint and whether a full pass completed
+    """
+    default_days, overrides = get_retention_policy()
+    if not default_days and not overrides:
+        return {"deleted": 0, "batches": 0, "completed_pass": False, "checkpoint": get_checkpoint()}
+
+    now = now_datetime()
+    result = walk_message_ranges(
+        CHECKPOINT_KEY,
+        lambda start, end: expire_batch(start, end, default_days, now),
+        time_budget
+    )
+    if result["completed_pass"]:
+        frappe.db.set_global(LAST_PASS_KEY, str(now))
+
+    result["deleted"] = result.pop("affected")
+    return result
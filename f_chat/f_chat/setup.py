@@ -4,6 +4,7 @@
 import frappe
 from frappe import _
 from frappe.utils import now_datetime
+import json
 
 def setup_chat_application():
     """Setup chat application after installation"""
@@ -430,9 +431,64 @@ def setup_chat_workspace():
     except Exception as e:
         frappe.log_error(f"Error creating Chat workspace: {str(e)}")
 
+def create_chat_dashboard_charts():
+    """Create the dashboard charts; they read the daily activity rollups, not Chat Message"""
+    last_month = json.dumps([["Chat Activity Rollup", "period_start", "Timespan", "last month", False]])
+    daily_rows = json.dumps([["Chat Activity Rollup", "granularity", "=", "Day", False]])
+
+    charts = [
+        {
+            "chart_name": "Messages Per Day",
+            "chart_type": "Sum",
+            "document_type": "Chat Activity Rollup",
+            "based_on": "period_start",
+            "value_based_on": "message_count",
+            "timeseries": 1,
+            "timespan": "Last Month",
+            "time_interval": "Daily",
+            "type": "Line",
+            "filters_json": daily_rows
+        },
+        {
+            "chart_name": "Active Users",
+            "chart_type": "Group By",
+            "document_type": "Chat Activity Rollup",
+            "group_by_type": "Sum",
+            "group_by_based_on": "sender",
+            "aggregate_function_based_on": "message_count",
+            "number_of_groups": 10,
+            "type": "Bar",
+            "filters_json": json.dumps(json.loads(daily_rows) + json.loads(last_month))
+        },
+        {
+            "chart_name": "Room Activity",
+            "chart_type": "Group By",
+            "document_type": "Chat Activity Rollup",
+            "group_by_type": "Sum",
+            "group_by_based_on": "chat_room",
+            "aggregate_function_based_on": "message_count",
+            "number_of_groups": 10,
+            "type": "Bar",
+            "filters_json": json.dumps(json.loads(daily_rows) + json.loads(last_month))
+        }
+    ]
+
+    for chart in charts:
+        if frappe.db.exists("Dashboard Chart", chart["chart_name"]):
+            continue
+
+        doc = frappe.new_doc("Dashboard Chart")
+        doc.update(chart)
+        doc.module = "F Chat"
+        doc.is_public = 1
+        doc.insert(ignore_permissions=True)
+        print(f"Created {chart['chart_name']} chart")
+
 def create_chat_dashboard():
     """Create Chat analytics dashboard"""
     try:
+        create_chat_dashboard_charts()
+        
         # Create dashboard
         if not frappe.db.exists("Dashboard", "Chat Analytics"):
             dashboard = frappe.new_doc("Dashboard")
@@ -6,6 +6,7 @@ import socketio
 import eventlet
 import eventlet.wsgi
 from frappe.utils import get_site_name
+from f_chat.APIs.notification_chatroom.chat_apis.membership_index import get_user_rooms
 
 # Create Socket.IO server instance
 sio = socketio.Server(
@@ -57,11 +58,12 @@ def disconnect(sid):
                 if room in room_sessions:
                     room_sessions[room].discard(sid)
                     
-                    # Notify others in room about user leaving
-                    sio.emit('user_left_room', {
-                        'user': user,
-                        'room': room
-                    }, room=room)
+                    # Notify others only if this was the user's last socket in the room
+                    if not is_user_visible_in_room(user, room):
+                        sio.emit('user_left_room', {
+                            'user': user,
+                            'room': room
+                        }, room=room)
             
             # Remove user session
             del user_sessions[sid]
@@ -152,6 +154,75 @@ def leave_room(sid, data):
         print(f"Leave room error: {e}")
         sio.emit('error', {'message': 'Failed to leave room'}, room=sid)
 
+@sio.event
+def sync_subscriptions(sid, data=None):
+    """
+    Subscribe a socket to all of its user's rooms in one pass
+
+    Rooms are resolved from the membership index on the server. The socket
+    joins rooms it is missing and leaves rooms the user no longer belongs to.
+    Other members are only notified where the user's visible presence changed,
+    i.e. this is the user's first (or last) socket in that room.
+    """
+    try:
+        session = user_sessions.get(sid)
+        if not session:
+            sio.emit('error', {'message': 'Unknown session'}, room=sid)
+            return
+        
+        user = session['user']
+        member_rooms = get_user_rooms(user)
+        current_rooms = set(session['rooms'])
+        
+        joined = []
+        for room_id in member_rooms - current_rooms:
+            was_visible = is_user_visible_in_room(user, room_id)
+            
+            sio.enter_room(sid, room_id)
+            session['rooms'].append(room_id)
+            room_sessions.setdefault(room_id, set()).add(sid)
+            joined.append(room_id)
+            
+            if not was_visible:
+                sio.emit('user_joined_room', {
+                    'user': user,
+                    'room': room_id
+                }, room=room_id, skip_sid=sid)
+        
+        left = []
+        for room_id in current_rooms - member_rooms:
+            sio.leave_room(sid, room_id)
+            session['rooms'].remove(room_id)
+            if room_id in room_sessions:
+                room_sessions[room_id].discard(sid)
+            left.append(room_id)
+            
+            if not is_user_visible_in_room(user, room_id):
+                sio.emit('user_left_room', {
+                    'user': user,
+                    'room': room_id
+                }, room=room_id)
+        
+        # Single confirmation instead of one room_joined per room
+        sio.emit('subscriptions_synced', {
+            'rooms': sorted(member_rooms),
+            'joined': joined,
+            'left': left
+        }, room=sid)
+        
+        print(f"User {user} ({sid}) synced {len(member_rooms)} rooms (+{len(joined)} -{len(left)})")
+        
+    except Exception as e:
+        print(f"Sync subscriptions error: {e}")
+        sio.emit('error', {'message': 'Failed to sync subscriptions'}, room=sid)
+
+def is_user_visible_in_room(user, room_id):
+    """Check whether any socket of the user is currently in the room"""
+    return any(
+        user_sessions.get(other_sid, {}).get('user') == user
+        for other_sid in room_sessions.get(room_id, ())
+    )
+
 @sio.event
 def send_message(sid, data):
     """Handle message sending"""
@@ -175,20 +175,45 @@ websocket_events = {
 doc_events = {
    
     "Chat Message": {
-        "after_insert": "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_new_message_notification",
+        "after_insert": [
+            "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_new_message_notification",
+            "f_chat.APIs.notification_chatroom.chat_apis.quick_switcher.bump_room_activity",
+            "f_chat.f_chat.doctype.chat_activity_rollup.chat_activity_rollup.record_message",
+            "f_chat.APIs.notification_chatroom.chat_apis.system_counters.record_message",
+            "f_chat.APIs.notification_chatroom.chat_apis.engagement_sketches.record_sender",
+            "f_chat.APIs.notification_chatroom.chat_apis.presence.record_sender_activity"
+        ],
         "before_save": "f_chat.f_chat.doctype.chat_message.chat_message.before_save_hook",
-        "on_update": "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_message_update_notification"
+        "on_update": [
+            "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_message_update_notification",
+            "f_chat.f_chat.doctype.chat_activity_rollup.chat_activity_rollup.record_message_update",
+            "f_chat.APIs.notification_chatroom.chat_apis.system_counters.record_message_update"
+        ]
     },
     "Chat Room": {
         "after_insert": "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_new_room_notification",
-        "on_update": "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_room_update_notification"
+        "on_update": [
+            "f_chat.APIs.notification_chatroom.chat_apis.membership_index.update_room_index",
+            "f_chat.APIs.notification_chatroom.chat_apis.quick_switcher.update_room_entries",
+            "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_room_update_notification",
+            "f_chat.APIs.notification_chatroom.chat_apis.system_counters.record_room_update"
+        ],
+        "on_trash": [
+            "f_chat.APIs.notification_chatroom.chat_apis.quick_switcher.remove_room_entries",
+            "f_chat.APIs.notification_chatroom.chat_apis.membership_index.remove_room_index",
+            "f_chat.APIs.notification_chatroom.chat_apis.system_counters.forget_room"
+        ]
     },
     "Chat Room Member": {
         "after_insert": "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_member_added_notification",
         "on_trash": "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.handle_member_removed_notification"
     },
     "User": {
-        "on_update": "f_chat.f_chat.maintenance.update_user_chat_permissions"
+        "on_update": [
+            "f_chat.f_chat.maintenance.update_user_chat_permissions",
+            "f_chat.APIs.notification_chatroom.chat_apis.people_index.update_people_index"
+        ],
+        "on_trash": "f_chat.APIs.notification_chatroom.chat_apis.people_index.remove_people_index"
     }
 }
 # Scheduled Tasks
@@ -198,11 +223,16 @@ scheduler_events = {
     # "all": [
     #     "f_chat.cron_jobs.sent_asa_form_link.sent_asa_form_link"
     # ],
+    "hourly": [  # Retention resumes from its checkpoint with a time budget per run
+        "f_chat.f_chat.maintenance.cleanup_old_messages"
+    ],
     "daily": [
-        "f_chat.f_chat.maintenance.cleanup_old_messages",
         "f_chat.f_chat.maintenance.update_room_statistics",
-        "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.cleanup_user_status_cache"
-        
+        "f_chat.f_chat.doctype.chat_activity_rollup.chat_activity_rollup.prune_hourly_rollups",
+        "f_chat.APIs.notification_chatroom.chat_apis.system_counters.reconcile_system_counters",
+        "f_chat.f_chat.doctype.chat_message_archive.chat_message_archive.archive_old_messages",
+        "f_chat.f_chat.partitioning.maintain_partitions",
+        "f_chat.f_chat.doctype.chat_job_run.chat_job_run.prune_job_runs"
     ],
     "cron": {
         # "0 0 * * *": [
@@ -213,18 +243,15 @@ scheduler_events = {
         #     "f_chat.APIs.sap.send_sap_error_email.uncheck_sap_error_email",
         #     "f_chat.APIs.req_for_quotation.rfq_reminder.quotation_count_reminder_mail"
         # ],
-        "*/5 * * * *": [
+        "*/5 * * * *": [  # The only presence sweep: expire stale users and persist changes
             "f_chat.APIs.notification_chatroom.chat_apis.realtime_events_fixed.cleanup_stale_users"
         ],
         "0 2 * * *": [  # Run at 2 AM daily
             "f_chat.f_chat.maintenance.cleanup_deleted_files"
         ],
-        
-        "*/15 * * * *": [  # Every 15 minutes
-            "f_chat.f_chat.maintenance.update_user_online_status"      
-        ],
-        "*/1 * * * *": [  # Every minute - for real-time status updates
-            "f_chat.APIs.notification_chatroom.chat_apis.realtime_enhanced.update_user_activity_status", 
+        "*/1 * * * *": [  # Every minute - expire unanswered calls, send status changes left waiting
+            "f_chat.APIs.notification_chatroom.chat_apis.call_registry.reap_ringing_calls",
+            "f_chat.APIs.notification_chatroom.chat_apis.presence.broadcast_due_status_changes"
         ]
     }    
 	# "hourly": [
@@ -302,11 +329,19 @@ override_whitelisted_methods = {
     "f_chat.get_chat_analytics": "f_chat.APIs.notification_chatroom.chat_apis.search_analytics.get_chat_analytics",
     "f_chat.get_global_chat_search": "f_chat.APIs.notification_chatroom.chat_apis.search_analytics.get_global_chat_search",
     "f_chat.export_chat_messages": "f_chat.APIs.notification_chatroom.chat_apis.search_analytics.export_chat_messages",
+    "f_chat.get_export_status": "f_chat.APIs.notification_chatroom.chat_apis.search_analytics.get_export_status",
+    "f_chat.get_room_engagement": "f_chat.APIs.notification_chatroom.chat_apis.search_analytics.get_room_engagement",
+    "f_chat.get_response_analytics": "f_chat.APIs.notification_chatroom.chat_apis.search_analytics.get_response_analytics",
+    "f_chat.export_user_conversations": "f_chat.APIs.notification_chatroom.chat_apis.compliance_export.export_user_conversations",
+    "f_chat.get_compliance_export_status": "f_chat.APIs.notification_chatroom.chat_apis.compliance_export.get_compliance_export_status",
+    "f_chat.retry_compliance_export": "f_chat.APIs.notification_chatroom.chat_apis.compliance_export.retry_compliance_export",
+    "f_chat.quick_switch": "f_chat.APIs.notification_chatroom.chat_apis.quick_switcher.quick_switch",
     
     # Maintenance APIs (from f_chat/maintenance.py)
     "f_chat.manual_cleanup_room": "f_chat.f_chat.maintenance.manual_cleanup_room",
     "f_chat.get_room_storage_usage": "f_chat.f_chat.maintenance.get_room_storage_usage",
     "f_chat.get_chat_system_stats": "f_chat.f_chat.maintenance.get_chat_system_stats",
+    "f_chat.get_chat_job_stats": "f_chat.f_chat.maintenance.get_chat_job_stats",
     "f_chat.optimize_chat_database": "f_chat.f_chat.maintenance.optimize_chat_database",
     
     # Chat Utility APIs (from f_chat DocType controllers)
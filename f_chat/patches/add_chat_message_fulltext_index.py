@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Patch to add the FULLTEXT index used by message search
+
+import frappe
+
+from f_chat.APIs.notification_chatroom.chat_apis.message_search import ensure_fulltext_index
+
+
+def execute():
+    """
+    Index Chat Message.message_content for full-text search
+    Building the index on a large table takes a while; it runs once
+    """
+    print("=" * 80)
+    print("ADDING CHAT MESSAGE FULLTEXT INDEX")
+    print("=" * 80)
+
+    if ensure_fulltext_index():
+        print("✅ FULLTEXT index created on Chat Message.message_content")
+    else:
+        print("✅ FULLTEXT index already present")
+
+    print("=" * 80)
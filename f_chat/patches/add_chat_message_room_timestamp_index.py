@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Patch to add the (chat_room, timestamp, name) index used for keyset paging
+
+import frappe
+
+
+def execute():
+    """
+    Index Chat Message by room and time so messages around a given one
+    can be reached with an index seek instead of OFFSET paging
+    """
+    print("=" * 80)
+    print("ADDING CHAT MESSAGE ROOM/TIMESTAMP INDEX")
+    print("=" * 80)
+
+    frappe.db.add_index("Chat Message", ["chat_room", "timestamp", "name"])
+
+    print("✅ Index on Chat Message (chat_room, timestamp, name) is in place")
+    print("=" * 80)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Patch to build the Chat Activity Rollup buckets from existing messages
+
+import frappe
+from frappe.utils import add_days, now_datetime
+
+from f_chat.f_chat.doctype.chat_activity_rollup.chat_activity_rollup import (
+    HOURLY_RETENTION_DAYS,
+    rebuild_rollups,
+)
+from f_chat.f_chat.setup import create_chat_dashboard_charts
+
+
+def execute():
+    """
+    Daily buckets for all history, hourly buckets for the retention window,
+    then point the dashboard charts at the rollups
+    """
+    print("=" * 80)
+    print("BACKFILLING CHAT ACTIVITY ROLLUPS")
+    print("=" * 80)
+
+    rebuild_rollups("Day")
+    rebuild_rollups("Hour", since=add_days(now_datetime(), -HOURLY_RETENTION_DAYS))
+    frappe.db.commit()
+
+    create_chat_dashboard_charts()
+    frappe.db.commit()
+
+    total = frappe.db.count("Chat Activity Rollup")
+    print(f"✅ Chat Activity Rollup now has {total} rows")
+    print("=" * 80)
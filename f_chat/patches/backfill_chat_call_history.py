@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# Patch to backfill the per-user Chat Call History projection from past calls
+
+import frappe
+
+
+def execute():
+    """
+    Build Chat Call History rows for every ended call
+    Row names are derived from (call, user), so re-running is harmless
+    """
+    print("=" * 80)
+    print("BACKFILLING CHAT CALL HISTORY")
+    print("=" * 80)
+
+    frappe.db.sql("""
+        INSERT IGNORE INTO `tabChat Call History`
+            (name, creation, modified, owner, modified_by,
+             user, call_session, chat_room, room_name, call_type, call_status,
+             participant_status, initiated_by, initiated_by_name, participant_count,
+             start_time, end_time, total_duration, duration)
+        SELECT
+            LEFT(MD5(CONCAT(cs.name, ':', ccp.user)), 16), NOW(), NOW(), 'Administrator', 'Administrator',
+            ccp.user, cs.name, cs.chat_room, cr.room_name, cs.call_type, cs.call_status,
+            ccp.status, cs.initiated_by, COALESCE(u.full_name, cs.initiated_by), counts.participant_count,
+            cs.start_time, cs.end_time, COALESCE(cs.total_duration, 0), COALESCE(ccp.duration, 0)
+        FROM `tabChat Call Session` cs
+        INNER JOIN `tabChat Call Participant` ccp
+            ON ccp.parent = cs.name AND ccp.parenttype = 'Chat Call Session'
+        INNER JOIN (
+            SELECT parent, COUNT(*) AS participant_count
+            FROM `tabChat Call Participant`
+            WHERE parenttype = 'Chat Call Session'
+            GROUP BY parent
+        ) counts ON counts.parent = cs.name
+        LEFT JOIN `tabChat Room` cr ON cr.name = cs.chat_room
+        LEFT JOIN `tabUser` u ON u.name = cs.initiated_by
+        WHERE cs.call_status NOT IN ('Initiated', 'Ringing', 'Connected')
+    """)
+
+    frappe.db.commit()
+
+    total = frappe.db.count("Chat Call History")
+    print(f"✅ Chat Call History now has {total} rows")
+    print("=" * 80)
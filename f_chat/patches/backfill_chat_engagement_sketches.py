@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Patch to build the per-room engagement sketches from existing activity
+
+from f_chat.APIs.notification_chatroom.chat_apis.engagement_sketches import backfill_sketches
+
+
+def execute():
+    """
+    Sender sketches for the retention window; reader sketches can only be
+    seeded from each member's last read
+    """
+    print("=" * 80)
+    print("BACKFILLING CHAT ENGAGEMENT SKETCHES")
+    print("=" * 80)
+
+    senders, readers = backfill_sketches()
+
+    print(f"✅ Added {senders} room/day senders and {readers} last reads")
+    print("=" * 80)
@@ -194,6 +194,9 @@ async function setup_webrtc_connection(callData) {
             if (event.candidate) {
                 console.log('📡 Sending ICE candidate');
                 send_ice_candidate(callData.call_session_id, event.candidate);
+            } else {
+                // Gathering finished - send whatever is still queued
+                flush_ice_candidates(callData.call_session_id);
             }
         };
 
@@ -340,21 +343,46 @@ async function create_and_send_offer(callSessionId) {
 }
 
 /**
- * Send ICE candidate
+ * Queue an ICE candidate for sending
+ * Candidates gathered within ICE_BATCH_DELAY ms go out in one request
  * @param {string} callSessionId - Call session ID
  * @param {RTCIceCandidate} candidate - ICE candidate
  */
+const ICE_BATCH_DELAY = 50;
+let pendingIceCandidates = [];
+let iceBatchTimer = null;
+
 function send_ice_candidate(callSessionId, candidate) {
+    pendingIceCandidates.push({
+        candidate: candidate.candidate,
+        sdpMLineIndex: candidate.sdpMLineIndex,
+        sdpMid: candidate.sdpMid
+    });
+
+    if (!iceBatchTimer) {
+        iceBatchTimer = setTimeout(() => flush_ice_candidates(callSessionId), ICE_BATCH_DELAY);
+    }
+}
+
+/**
+ * Send all queued ICE candidates
+ * @param {string} callSessionId - Call session ID
+ */
+function flush_ice_candidates(callSessionId) {
+    clearTimeout(iceBatchTimer);
+    iceBatchTimer = null;
+
+    if (!pendingIceCandidates.length) return;
+
+    const candidates = pendingIceCandidates;
+    pendingIceCandidates = [];
+
     frappe.call({
         method: 'f_chat.send_webrtc_signal',
         args: {
             call_session_id: callSessionId,
-            signal_type: 'ice-candidate',
-            signal_data: JSON.stringify({
-                candidate: candidate.candidate,
-                sdpMLineIndex: candidate.sdpMLineIndex,
-                sdpMid: candidate.sdpMid
-            })
+            signal_type: 'ice-candidates',
+            signal_data: JSON.stringify(candidates)
         }
     });
 }
@@ -404,6 +432,13 @@ function setup_webrtc_listeners(callSessionId) {
                 // Received ICE candidate
                 await peerConnection.addIceCandidate(new RTCIceCandidate(signalData));
                 console.log('✅ ICE candidate added');
+
+            } else if (data.signal_type === 'ice-candidates') {
+                // Received a batch of ICE candidates
+                for (const candidate of signalData) {
+                    await peerConnection.addIceCandidate(new RTCIceCandidate(candidate));
+                }
+                console.log(`✅ ${signalData.length} ICE candidates added`);
             }
 
         } catch (error) {